@@ -0,0 +1,97 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from benchmarks.harness import CASES, make_cases, report, summarize
+
+def run_job(base_url: str, path: str, poll_interval: float, timeout: float) -> dict:
+    """Upload one file and poll until the job finishes; returns latencies or the rejection"""
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        response = requests.post(f"{base_url}/upload", files={'file': (os.path.basename(path), f)}, timeout=timeout)
+    upload_seconds = time.perf_counter() - start
+
+    if response.status_code != 200:
+        return {'status': response.status_code, 'upload_seconds': upload_seconds}
+
+    job_id = response.json()['job_id']
+    deadline = start + timeout
+    while time.perf_counter() < deadline:
+        status = requests.get(f"{base_url}/status/{job_id}", timeout=timeout).json()
+        if status['status'] in ('completed', 'failed'):
+            return {
+                'status': status['status'],
+                'upload_seconds': upload_seconds,
+                'end_to_end_seconds': time.perf_counter() - start
+            }
+        time.sleep(poll_interval)
+    return {'status': 'timeout', 'upload_seconds': upload_seconds}
+
+def load_test(base_url: str, path: str, concurrency: int, requests_per_level: int,
+              poll_interval: float, timeout: float) -> dict:
+    """Fire `requests_per_level` uploads with `concurrency` clients in flight"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(
+            lambda _: run_job(base_url, path, poll_interval, timeout),
+            range(requests_per_level)
+        ))
+    wall = time.perf_counter() - start
+
+    completed = [o for o in outcomes if o['status'] == 'completed']
+    results = {
+        f"c{concurrency}/upload": summarize(np.array([o['upload_seconds'] for o in outcomes]))
+    }
+    if completed:
+        end_to_end = summarize(np.array([o['end_to_end_seconds'] for o in completed]))
+        # Throughput is jobs finished per wall-clock second across all clients
+        end_to_end['throughput_per_s'] = len(completed) / wall
+        results[f"c{concurrency}/end_to_end"] = end_to_end
+
+    rejected = sum(1 for o in outcomes if o['status'] in (429, 503))
+    failed = len(outcomes) - len(completed) - rejected
+    print(f"⏱️ concurrency {concurrency}: {len(completed)}/{len(outcomes)} completed, "
+          f"{rejected} rejected (429/503), {failed} failed/timed out, {wall:.1f}s")
+    for stats in results.values():
+        stats['rejected'] = rejected
+        stats['failed'] = failed
+    return results
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Load-test POST /upload on a running API at several concurrency levels. "
+                    "Every request uploads the same file, so start the API with RADIOLOGY_RESULT_CACHE=0 "
+                    "to measure uncached processing."
+    )
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--case', default='cr_mono2', choices=list(CASES), help="Synthetic DICOM to upload")
+    parser.add_argument('--file', help="Upload this file instead of a synthetic case")
+    parser.add_argument('--concurrency', default='1,2,4,8', help="Comma-separated client counts")
+    parser.add_argument('--requests', type=int, default=16, help="Uploads per concurrency level")
+    parser.add_argument('--poll-interval', type=float, default=0.25)
+    parser.add_argument('--timeout', type=float, default=300.0)
+    parser.add_argument('--data-dir', default='benchmarks/data')
+    parser.add_argument('--json', help="Write results to this JSON file")
+    parser.add_argument('--baseline', help="Earlier --json output to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="Relative slowdown flagged as a regression")
+    args = parser.parse_args(argv)
+
+    base_url = args.url.rstrip('/')
+    requests.get(f"{base_url}/health", timeout=10).raise_for_status()
+    path = args.file or make_cases(args.data_dir, [args.case])[args.case]
+
+    results = {}
+    for concurrency in (int(c) for c in args.concurrency.split(',') if c.strip()):
+        results.update(load_test(base_url, path, concurrency, args.requests, args.poll_interval, args.timeout))
+
+    return report('api', results, args.json, args.baseline, args.tolerance)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import time
+import tracemalloc
+
+import numpy as np
+
+from src.dicom.dicom_handler import DICOMHandler
+
+def legacy_extract(image: np.ndarray, invert: bool) -> np.ndarray:
+    """Pre-LUT normalization: float64 stretch plus a separate inversion pass"""
+    img_min = np.min(image)
+    img_max = np.max(image)
+    if img_max > img_min:
+        image = ((image - img_min) / (img_max - img_min) * 255).astype(np.uint8)
+    if invert:
+        image = np.max(image) - image
+    return image
+
+def measure(fn, repeats: int) -> dict:
+    """Median wall time and peak traced allocation of fn()"""
+    fn()  # warm up
+
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'seconds': float(np.median(times)), 'peak_bytes': peak}
+
+def run(rows: int, columns: int, repeats: int, invert: bool) -> dict:
+    handler = DICOMHandler()
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 4096, size=(rows, columns), dtype=np.uint16)
+    megapixels = rows * columns / 1e6
+
+    legacy = measure(lambda: legacy_extract(frame, invert), repeats)
+    fused = measure(lambda: handler.normalize_image(frame, invert=invert), repeats)
+
+    max_diff = int(np.abs(
+        legacy_extract(frame, invert).astype(np.int16) - handler.normalize_image(frame, invert=invert)
+    ).max())
+
+    def per_mp(stats):
+        return {
+            'ms_per_megapixel': stats['seconds'] * 1000 / megapixels,
+            'peak_mb_per_megapixel': stats['peak_bytes'] / 1e6 / megapixels
+        }
+
+    return {
+        'frame': f"{rows}x{columns} uint16",
+        'invert': invert,
+        'megapixels': megapixels,
+        'legacy': per_mp(legacy),
+        'fused_lut': per_mp(fused),
+        'speedup': legacy['seconds'] / fused['seconds'],
+        'memory_saved_mb_per_megapixel': (legacy['peak_bytes'] - fused['peak_bytes']) / 1e6 / megapixels,
+        'max_abs_pixel_difference': max_diff
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark DICOM frame normalization")
+    parser.add_argument('--rows', type=int, default=3000)
+    parser.add_argument('--columns', type=int, default=3000)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--json', help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = [run(args.rows, args.columns, args.repeats, invert) for invert in (False, True)]
+
+    for r in results:
+        print(f"\n{r['frame']} ({'MONOCHROME1' if r['invert'] else 'MONOCHROME2'})")
+        print(f"  legacy : {r['legacy']['ms_per_megapixel']:.2f} ms/MP, {r['legacy']['peak_mb_per_megapixel']:.2f} MB/MP peak")
+        print(f"  fused  : {r['fused_lut']['ms_per_megapixel']:.2f} ms/MP, {r['fused_lut']['peak_mb_per_megapixel']:.2f} MB/MP peak")
+        print(f"  speedup {r['speedup']:.1f}x, saves {r['memory_saved_mb_per_megapixel']:.2f} MB/MP, max pixel diff {r['max_abs_pixel_difference']}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,84 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import contextlib
+import shutil
+import tempfile
+
+import pydicom
+
+from benchmarks.harness import CASES, make_cases, measure, report
+from src.rag.simple_rag import SimpleRAG
+
+# Stand-in detections so report generation is measured on a non-empty finding list
+SAMPLE_DETECTIONS = [
+    {'finding': 'abnormality', 'confidence': c, 'bbox': {'x1': 100.0 * i, 'y1': 200.0, 'x2': 100.0 * i + 300, 'y2': 600.0},
+     'urgency': 'high' if c > 0.7 else 'moderate' if c > 0.4 else 'low'}
+    for i, c in enumerate((0.82, 0.55, 0.35), 1)
+]
+
+@contextlib.contextmanager
+def quiet():
+    """Hide the pipeline's progress output while timing"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+def bench_case(name: str, path: str, repeats: int, pipeline, output_root: str) -> dict:
+    handler = pipeline.dicom_handler
+    results = {}
+
+    results[f"{name}/read_dicom"] = measure(lambda: handler.read_dicom(path), repeats)
+
+    dcm = pydicom.dcmread(path)
+    raw = dcm.pixel_array[0] if handler.get_frame_count(dcm) > 1 else dcm.pixel_array
+    slope = float(dcm.get('RescaleSlope', 1) or 1)
+    intercept = float(dcm.get('RescaleIntercept', 0) or 0)
+    window = handler.get_voi_window(dcm)
+    invert = dcm.get('PhotometricInterpretation') == 'MONOCHROME1'
+    results[f"{name}/normalize_image"] = measure(
+        lambda: handler.normalize_image(raw, slope, intercept, window, invert), repeats
+    )
+
+    image = handler.read_dicom(path)['image']
+    results[f"{name}/detect"] = measure(lambda: pipeline.detector.detect(image), repeats)
+
+    output_dir = f"{output_root}/{name}"
+    with quiet():
+        results[f"{name}/process_dicom"] = measure(lambda: pipeline.process_dicom(path, output_dir), repeats)
+
+    return results
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages and end-to-end process_dicom on synthetic DICOMs")
+    parser.add_argument('--cases', default=','.join(CASES), help=f"Comma-separated subset of: {', '.join(CASES)}")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--data-dir', default='benchmarks/data', help="Where synthetic DICOMs are generated (reused between runs)")
+    parser.add_argument('--json', help="Write results to this JSON file")
+    parser.add_argument('--baseline', help="Earlier --json output to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="Relative slowdown flagged as a regression")
+    args = parser.parse_args(argv)
+
+    from src.pipeline.simple_pipeline import SimplePipeline
+
+    paths = make_cases(args.data_dir, [name.strip() for name in args.cases.split(',') if name.strip()])
+    with quiet():
+        pipeline = SimplePipeline()
+
+    results = {}
+    rag = SimpleRAG()
+    results['generate_report'] = measure(lambda: rag.generate_report(SAMPLE_DETECTIONS, {'age': 50, 'sex': 'F'}), args.repeats * 20)
+
+    output_root = tempfile.mkdtemp(prefix='bench_pipeline_')
+    try:
+        for name, path in paths.items():
+            print(f"⏱️ {name}: {os.path.basename(path)}")
+            results.update(bench_case(name, path, args.repeats, pipeline, output_root))
+    finally:
+        shutil.rmtree(output_root, ignore_errors=True)
+
+    return report('pipeline', results, args.json, args.baseline, args.tolerance)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+import json
+import os
+import platform
+import resource
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pydicom
+from pydicom.dataset import FileDataset, FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian, generate_uid
+
+# Realistic sizes: a 2500x3000 CR chest film and a short multi-frame clip
+CASES = {
+    'cr_mono2': {'rows': 3000, 'columns': 2500, 'photometric': 'MONOCHROME2', 'frames': 1},
+    'cr_mono1': {'rows': 3000, 'columns': 2500, 'photometric': 'MONOCHROME1', 'frames': 1},
+    'multiframe': {'rows': 512, 'columns': 512, 'photometric': 'MONOCHROME2', 'frames': 30}
+}
+
+# Metrics compared against a baseline, and whether lower is better
+COMPARED_METRICS = {'median_ms': True, 'p95_ms': True, 'peak_rss_mb': True, 'throughput_per_s': False}
+
+def synthetic_chest(rows: int, columns: int, seed: int = 0) -> np.ndarray:
+    """12-bit chest-like frame: bright mediastinum, two darker lung fields, quantum noise"""
+    rng = np.random.default_rng(seed)
+    y, x = np.ogrid[-1:1:rows * 1j, -1:1:columns * 1j]
+
+    image = np.full((rows, columns), 2600.0, dtype=np.float32)
+    for cx in (-0.45, 0.45):
+        lung = ((x - cx) / 0.32) ** 2 + ((y + 0.05) / 0.7) ** 2 <= 1.0
+        image[lung] = 1200.0
+    image += 500.0 * np.exp(-(x ** 2) / 0.02)
+    image += rng.normal(0.0, 60.0, size=image.shape).astype(np.float32)
+    return np.clip(image, 0, 4095).astype(np.uint16)
+
+def make_dicom(path: str, rows: int, columns: int, photometric: str = 'MONOCHROME2',
+               frames: int = 1, seed: int = 0) -> str:
+    """Write a synthetic uncompressed 16-bit (12 stored) CR/XA-style DICOM file"""
+    meta = FileMetaDataset()
+    meta.MediaStorageSOPClassUID = '1.2.840.10008.5.1.4.1.1.1'
+    meta.MediaStorageSOPInstanceUID = generate_uid()
+    meta.TransferSyntaxUID = ExplicitVRLittleEndian
+
+    ds = FileDataset(path, {}, file_meta=meta, preamble=b'\0' * 128)
+    ds.SOPClassUID = meta.MediaStorageSOPClassUID
+    ds.SOPInstanceUID = meta.MediaStorageSOPInstanceUID
+    ds.StudyInstanceUID = generate_uid()
+    ds.SeriesInstanceUID = generate_uid()
+    ds.PatientID = f"BENCH{seed:04d}"
+    ds.PatientName = 'Benchmark^Synthetic'
+    ds.PatientBirthDate = '19700101'
+    ds.PatientSex = 'O'
+    ds.StudyDate = '20240101'
+    ds.Modality = 'CR'
+    ds.InstanceNumber = 1
+
+    ds.Rows = rows
+    ds.Columns = columns
+    ds.SamplesPerPixel = 1
+    ds.PhotometricInterpretation = photometric
+    ds.BitsAllocated = 16
+    ds.BitsStored = 12
+    ds.HighBit = 11
+    ds.PixelRepresentation = 0
+    ds.WindowCenter = 2048
+    ds.WindowWidth = 4096
+
+    frame = synthetic_chest(rows, columns, seed)
+    if photometric == 'MONOCHROME1':
+        frame = 4095 - frame
+    if frames > 1:
+        ds.NumberOfFrames = frames
+        # Shift each frame slightly so frames are not byte-identical
+        pixels = np.stack([np.roll(frame, i * 4, axis=1) for i in range(frames)])
+    else:
+        pixels = frame
+    ds.PixelData = pixels.tobytes()
+
+    ds.save_as(path, enforce_file_format=True)
+    return path
+
+def make_cases(directory: str, names: Optional[List[str]] = None) -> Dict[str, str]:
+    """Generate (or reuse) one synthetic file per case"""
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for index, name in enumerate(names or CASES):
+        spec = CASES[name]
+        path = f"{directory}/{name}_{spec['rows']}x{spec['columns']}x{spec['frames']}.dcm"
+        if not os.path.exists(path):
+            make_dicom(path, spec['rows'], spec['columns'], spec['photometric'], spec['frames'], seed=index)
+        paths[name] = path
+    return paths
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process (Linux /proc, else the peak from getrusage)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if platform.system() == 'Darwin' else peak * 1024
+
+class PeakRSS:
+    """Samples RSS on a background thread while a benchmark runs"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.start_bytes = 0
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start_bytes = self.peak_bytes = current_rss_bytes()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, current_rss_bytes())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_bytes = max(self.peak_bytes, current_rss_bytes())
+
+def measure(fn: Callable, repeats: int, warmup: int = 1, items_per_call: int = 1) -> Dict:
+    """Latency percentiles, throughput and peak RSS of repeated fn() calls"""
+    for _ in range(warmup):
+        fn()
+
+    times = []
+    with PeakRSS() as rss:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+
+    times = np.array(times)
+    return summarize(times, items_per_call, rss)
+
+def summarize(seconds: np.ndarray, items_per_call: int = 1, rss: Optional[PeakRSS] = None) -> Dict:
+    stats = {
+        'repeats': int(len(seconds)),
+        'median_ms': float(np.median(seconds) * 1000),
+        'p95_ms': float(np.percentile(seconds, 95) * 1000),
+        'throughput_per_s': float(items_per_call * len(seconds) / seconds.sum()) if seconds.sum() else 0.0
+    }
+    if rss is not None:
+        stats['peak_rss_mb'] = rss.peak_bytes / 1e6
+        stats['rss_growth_mb'] = (rss.peak_bytes - rss.start_bytes) / 1e6
+    return stats
+
+def environment() -> Dict:
+    """Host details stored with every run so results are only compared like for like"""
+    env = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pydicom': pydicom.__version__
+    }
+    try:
+        import torch
+        env['torch'] = torch.__version__
+        env['torch_threads'] = torch.get_num_threads()
+    except ImportError:
+        pass
+    return env
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[Dict]:
+    """Metrics that got worse than the baseline by more than `tolerance` (relative)"""
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric, lower_is_better in COMPARED_METRICS.items():
+            if metric not in stats or not base.get(metric):
+                continue
+            change = (stats[metric] - base[metric]) / base[metric]
+            if (change if lower_is_better else -change) > tolerance:
+                regressions.append({
+                    'benchmark': name,
+                    'metric': metric,
+                    'baseline': base[metric],
+                    'current': stats[metric],
+                    'change': change
+                })
+    return regressions
+
+def report(kind: str, results: Dict[str, Dict], json_path: Optional[str] = None,
+           baseline_path: Optional[str] = None, tolerance: float = 0.10) -> int:
+    """Print results, write the JSON record and flag regressions; returns an exit code"""
+    print(f"\n{'benchmark':<42} {'median ms':>10} {'p95 ms':>10} {'per s':>10} {'peak RSS MB':>12}")
+    for name, stats in results.items():
+        print(f"{name:<42} {stats['median_ms']:>10.2f} {stats['p95_ms']:>10.2f} "
+              f"{stats['throughput_per_s']:>10.2f} {stats.get('peak_rss_mb', float('nan')):>12.1f}")
+
+    regressions = []
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        if baseline.get('environment', {}).get('machine') != platform.machine():
+            print("⚠️ Baseline was recorded on a different machine type; comparison is indicative only")
+        regressions = compare(results, baseline.get('results', {}), tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {tolerance:.0%} vs {baseline_path}:")
+            for r in regressions:
+                print(f"  {r['benchmark']} {r['metric']}: {r['baseline']:.2f} -> {r['current']:.2f} ({r['change']:+.1%})")
+        else:
+            print(f"\n✅ No regressions beyond {tolerance:.0%} vs {baseline_path}")
+
+    if json_path:
+        os.makedirs(os.path.dirname(os.path.abspath(json_path)), exist_ok=True)
+        with open(json_path, 'w') as f:
+            json.dump({
+                'kind': kind,
+                'created_at': datetime.now().isoformat(),
+                'environment': environment(),
+                'results': results,
+                'regressions': regressions
+            }, f, indent=2)
+        print(f"✅ Results written to {json_path}")
+
+    return 1 if regressions else 0
@@ -0,0 +1,557 @@
+import heapq
+import itertools
+import multiprocessing as mp
+import queue
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from src.api.priority import PRIORITIES, TRIAGE_PROMOTIONS
+from src.utils.metrics import Histogram
+
+# Aging allowance in seconds per priority: a job's deadline is its queue time plus the
+# allowance, and jobs run earliest deadline first. Waiting ages a job upwards: once it
+# has waited the difference between two allowances, newly queued jobs of the higher
+# priority no longer overtake it (a routine job after 480 s ahead of new urgent jobs,
+# after 600 s ahead of new stat jobs).
+DEFAULT_AGING = {'stat': 0.0, 'urgent': 120.0, 'routine': 600.0}
+
+URGENCIES = ('high', 'moderate', 'low', 'none')
+
+def check_priority(priority: str) -> str:
+    """The priority itself, or ValueError if it is not one of PRIORITIES"""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority '{priority}' (expected one of {', '.join(PRIORITIES)})")
+    return priority
+
+class QueueFullError(Exception):
+    """Raised when the pending job queue is at capacity"""
+
+class WorkersUnavailableError(Exception):
+    """Raised when no worker process is available to take jobs"""
+
+def _worker_main(worker_id: int, task_queue, event_queue, threads: int = 1):
+    """Worker process entry point - loads the pipeline once, then serves jobs"""
+    from src.pipeline.simple_pipeline import SimplePipeline
+    from src.pipeline.result_cache import ResultCache
+    from src.dicom.decoders import DecodePool
+    from src.dicom.frame_store import FrameStore
+    from src.detection.tiling import TileConfig
+    from src.utils import config
+
+    result_cache = None
+    if config.RESULT_CACHE_ENABLED:
+        result_cache = ResultCache(config.RESULT_CACHE_ENTRIES, config.RESULT_CACHE_DIR)
+
+    tile_config = None
+    if config.TILE_SIZE > 0:
+        tile_config = TileConfig(
+            tile_size=config.TILE_SIZE,
+            overlap=config.TILE_OVERLAP,
+            max_tiles_per_batch=config.TILE_BATCH,
+            min_foreground=config.TILE_MIN_FOREGROUND
+        )
+
+    # With several job threads the detector batches their images together
+    pipeline = SimplePipeline(
+        batch_size=config.BATCH_MAX_SIZE if threads > 1 else 1,
+        batch_wait_ms=config.BATCH_WAIT_MS,
+        result_cache=result_cache,
+        output_policy=config.OUTPUT_POLICY,
+        tile_config=tile_config,
+        # Shared by the job threads, so several studies decompress at once
+        decode_pool=DecodePool(workers=config.DECODE_WORKERS, mode=config.DECODE_POOL),
+        decode_max_size=config.DECODE_MAX_SIZE,
+        frame_store=FrameStore(config.FRAME_STORE_DIR) if config.FRAME_STORE_DIR else None
+    )
+    event_queue.put({'type': 'ready', 'worker_id': worker_id})
+
+    profiler = None
+    if config.PROFILE_SLOW_SECONDS > 0:
+        from src.utils.profiling import SlowRequestProfiler
+        profiler = SlowRequestProfiler(config.PROFILE_SLOW_SECONDS, config.PROFILE_INTERVAL_MS, config.PROFILE_DIR)
+
+    job_threads = [
+        threading.Thread(target=_serve_jobs, args=(worker_id, pipeline, task_queue, event_queue, profiler), daemon=True)
+        for _ in range(max(1, threads))
+    ]
+    for thread in job_threads:
+        thread.start()
+    for thread in job_threads:
+        thread.join()
+
+def _serve_jobs(worker_id: int, pipeline, task_queue, event_queue, profiler=None):
+    from src.utils import config
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+
+        job_id = task['job_id']
+        if task['kind'] == 'triage':
+            _triage_job(worker_id, pipeline, task, event_queue)
+            continue
+        event_queue.put({'type': 'started', 'job_id': job_id, 'worker_id': worker_id})
+
+        # Stage transitions go to the parent for /events subscribers
+        def progress(phase, stage, seconds, job_id=job_id):
+            event_queue.put({'type': 'stage', 'job_id': job_id, 'worker_id': worker_id,
+                             'phase': phase, 'stage': stage,
+                             'seconds': None if seconds is None else round(seconds, 6)})
+
+        try:
+            with profiler.track(f"job_{job_id}") if profiler else nullcontext():
+                output_policy = task.get('output_policy')
+                if task['kind'] == 'image':
+                    result = pipeline.process_image(task['file_path'], task['output_dir'],
+                                                    output_policy=output_policy, progress=progress)
+                elif task['kind'] == 'series':
+                    result = pipeline.process_series(
+                        task['file_path'],
+                        task['output_dir'],
+                        decode_workers=config.SERIES_DECODE_WORKERS,
+                        prefetch=config.SERIES_PREFETCH,
+                        output_policy=output_policy,
+                        progress=progress
+                    )
+                else:
+                    result = pipeline.process_dicom(task['file_path'], task['output_dir'],
+                                                    output_policy=output_policy, progress=progress)
+
+            event = {'job_id': job_id, 'worker_id': worker_id, 'result': result, 'file_path': task['file_path']}
+            if result.get('success', True):
+                event['type'] = 'completed'
+            else:
+                event['type'] = 'failed'
+                event['error'] = result.get('error', 'Processing failed')
+        except Exception as e:
+            event = {'type': 'failed', 'job_id': job_id, 'worker_id': worker_id, 'error': str(e)}
+
+        event['worker_stats'] = pipeline.stats()
+        event_queue.put(event)
+
+def _triage_job(worker_id: int, pipeline, task, event_queue):
+    """Low-resolution first pass over a queued job; the parent may promote it"""
+    job_id = task['job_id']
+    event_queue.put({'type': 'triage_started', 'job_id': job_id, 'worker_id': worker_id})
+    try:
+        triage = pipeline.triage(task['file_path'], task['job_kind'], task['image_size'])
+    except Exception as e:
+        triage = {'urgency': None, 'error': str(e)}
+    event_queue.put({'type': 'triaged', 'job_id': job_id, 'worker_id': worker_id, 'triage': triage})
+
+class JobQueue:
+    """Bounded priority queue feeding a pool of pipeline worker processes
+
+    Jobs run in deadline order: the time they were queued plus the aging
+    allowance of their priority, so stat studies go first but a routine study
+    that has waited out its allowance is not overtaken indefinitely. With
+    `triage_size`, jobs queued behind a backlog of at least `triage_min_queue`
+    first get a cheap detection pass at that input size, and studies it finds
+    likely urgent are promoted (see TRIAGE_PROMOTIONS).
+    """
+
+    def __init__(self, store, num_workers: int = 2, max_queue_size: int = 32, threads_per_worker: int = 1,
+                 catalog=None, aging: Optional[Dict[str, float]] = None, triage_size: int = 0,
+                 triage_min_queue: int = 2):
+        self.store = store
+        # Optional StudyCatalog that completed DICOM jobs are recorded in
+        self.catalog = catalog
+        self.num_workers = max(1, num_workers)
+        self.threads_per_worker = max(1, threads_per_worker)
+        self.max_queue_size = max_queue_size
+        self.aging = dict(DEFAULT_AGING, **(aging or {}))
+        self.triage_size = triage_size
+        self.triage_min_queue = triage_min_queue
+
+        self._ctx = mp.get_context('spawn')
+        self._task_queue = None
+        self._event_queue = None
+        self._workers: Dict[int, mp.Process] = {}
+        self._ready_workers = set()
+        self._running: Dict[int, set] = {}
+        self.worker_stats: Dict[int, Dict] = {}
+
+        # Aggregated in the parent from the timings each worker reports per job
+        self.stage_latency: Dict[str, Histogram] = {}
+        self.queue_wait = Histogram()
+        self.job_counts = {'completed': 0, 'failed': 0}
+        # Submit-to-result time by requested priority and by the urgency of the findings
+        self.time_to_result = {priority: Histogram() for priority in PRIORITIES}
+        self.time_to_result_by_urgency = {urgency: Histogram() for urgency in URGENCIES}
+        self.triage_counts = {'triaged': 0, 'promoted': 0, 'skipped': 0}
+
+        # Live progress for /events: callbacks per job and the stage events seen so far
+        self._subscribers: Dict[str, List[Callable]] = {}
+        self._stage_log: Dict[str, List[Dict]] = {}
+        self._subscriber_lock = threading.Lock()
+
+        # Heap of [deadline, seq, task]; a superseded entry has its task set to None
+        self._pending: List[list] = []
+        self._entries: Dict[str, list] = {}
+        self._seq = itertools.count()
+        self._pending_jobs = 0
+        # Queued and running jobs, until their result arrives
+        self._tasks: Dict[str, Dict] = {}
+        self._triaging: Dict[int, set] = {}
+        self._lock = threading.Condition()
+        self._slots = threading.Semaphore(self.num_workers * self.threads_per_worker)
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+
+    def start(self):
+        """Start worker processes and the dispatch/event threads"""
+        self._task_queue = self._ctx.Queue()
+        self._event_queue = self._ctx.Queue()
+
+        for worker_id in range(self.num_workers):
+            self._start_worker(worker_id)
+
+        for target in (self._dispatch_loop, self._event_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _start_worker(self, worker_id: int):
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self._task_queue, self._event_queue, self.threads_per_worker),
+            daemon=True
+        )
+        process.start()
+        self._workers[worker_id] = process
+
+    def stop(self, timeout: float = 10.0):
+        """Stop accepting jobs and shut down the worker processes"""
+        with self._lock:
+            self._stopping = True
+            self._lock.notify_all()
+
+        for _ in range(self.num_workers * self.threads_per_worker):
+            self._task_queue.put(None)
+        for process in self._workers.values():
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+
+    def submit(self, job_id: str, kind: str, file_path: str, output_dir: str, output_policy: str = None,
+               priority: str = 'routine'):
+        """Queue a job, raising if the queue is full or no workers are running"""
+        check_priority(priority)
+        if self._stopping or not self.alive_workers():
+            raise WorkersUnavailableError("No pipeline workers are running")
+
+        with self._lock:
+            if self._pending_jobs >= self.max_queue_size:
+                raise QueueFullError(f"Job queue is full ({self.max_queue_size} pending)")
+
+            self._enqueue({
+                'job_id': job_id,
+                'kind': kind,
+                'file_path': file_path,
+                'output_dir': output_dir,
+                'output_policy': output_policy,
+                'priority': priority
+            }, time.monotonic())
+            self.store.update(job_id, status='queued')
+            self._lock.notify_all()
+
+    def submit_many(self, tasks: List[Dict]):
+        """Queue several jobs back to back, all or none
+
+        Each task has the `submit` arguments as keys. Jobs of the same
+        priority share a deadline and keep their order, so idle worker threads
+        pick them up together and the worker's batching detector can run
+        their images in shared batches.
+        """
+        # Validate the whole batch before anything is pushed
+        tasks = [{
+            'job_id': task['job_id'],
+            'kind': task['kind'],
+            'file_path': task['file_path'],
+            'output_dir': task['output_dir'],
+            'output_policy': task.get('output_policy'),
+            'priority': check_priority(task.get('priority') or 'routine')
+        } for task in tasks]
+        if self._stopping or not self.alive_workers():
+            raise WorkersUnavailableError("No pipeline workers are running")
+
+        with self._lock:
+            if self._pending_jobs + len(tasks) > self.max_queue_size:
+                raise QueueFullError(
+                    f"Job queue cannot take {len(tasks)} jobs "
+                    f"({self._pending_jobs}/{self.max_queue_size} pending)"
+                )
+
+            now = time.monotonic()
+            for task in tasks:
+                self._enqueue(task, now)
+            self.store.update_many([task['job_id'] for task in tasks], status='queued')
+            self._lock.notify_all()
+
+    def _enqueue(self, task: Dict, now: float):
+        """Push a job (and its triage pass, behind a backlog); caller holds the lock and checked the priority"""
+        task.update(queued_at=now, requested_priority=task['priority'])
+        self._tasks[task['job_id']] = task
+        self._push(task['job_id'], task, now + self.aging[task['priority']])
+        self._pending_jobs += 1
+
+        if self.triage_size and task['priority'] != 'stat' and self._pending_jobs > self.triage_min_queue:
+            # Triage is cheap, so it runs at stat priority ahead of full processing
+            self._push(f"triage:{task['job_id']}", {
+                'job_id': task['job_id'],
+                'kind': 'triage',
+                'job_kind': task['kind'],
+                'file_path': task['file_path'],
+                'image_size': self.triage_size
+            }, now + self.aging['stat'])
+
+    def _push(self, key: str, task: Dict, deadline: float):
+        entry = [deadline, next(self._seq), task]
+        self._entries[key] = entry
+        heapq.heappush(self._pending, entry)
+
+    def _drop(self, key: str) -> Optional[Dict]:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        task, entry[2] = entry[2], None
+        return task
+
+    def _pop(self) -> Dict:
+        """Next live task in deadline order; caller holds the lock and has checked _entries"""
+        while True:
+            _, _, task = heapq.heappop(self._pending)
+            if task is None:
+                continue
+            if task['kind'] == 'triage':
+                self._entries.pop(f"triage:{task['job_id']}", None)
+                return task
+
+            self._entries.pop(task['job_id'], None)
+            self._pending_jobs -= 1
+            # Reached before its triage pass ran, which could no longer change anything
+            if self._drop(f"triage:{task['job_id']}") is not None:
+                self.triage_counts['skipped'] += 1
+            return task
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """1-based position in dispatch order, or None if the job is not queued here"""
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is None:
+                return None
+            return 1 + sum(
+                1 for key, other in self._entries.items()
+                if not key.startswith('triage:') and other[:2] < entry[:2]
+            )
+
+    def subscribe(self, job_id: str, callback: Callable[[Dict], None]) -> List[Dict]:
+        """Call `callback(event)` (from the event thread) for each further event of a job
+
+        Returns the stage events already seen, so a late subscriber can
+        replay them without missing any in between.
+        """
+        with self._subscriber_lock:
+            self._subscribers.setdefault(job_id, []).append(callback)
+            return list(self._stage_log.get(job_id, []))
+
+    def unsubscribe(self, job_id: str, callback: Callable[[Dict], None]):
+        with self._subscriber_lock:
+            callbacks = self._subscribers.get(job_id, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+            if not callbacks:
+                self._subscribers.pop(job_id, None)
+
+    def _publish(self, job_id: str, event: Dict):
+        with self._subscriber_lock:
+            if event['type'] == 'stage':
+                self._stage_log.setdefault(job_id, []).append(event)
+            elif event['type'] in ('completed', 'failed'):
+                self._stage_log.pop(job_id, None)
+            callbacks = list(self._subscribers.get(job_id, []))
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"⚠️ Event subscriber for job {job_id} failed: {e}")
+
+    def alive_workers(self) -> int:
+        return sum(1 for process in self._workers.values() if process.is_alive())
+
+    def stats(self) -> Dict:
+        with self._lock:
+            pending = self._pending_jobs
+            by_priority = {priority: 0 for priority in PRIORITIES}
+            triage_pending = 0
+            for key, entry in self._entries.items():
+                if key.startswith('triage:'):
+                    triage_pending += 1
+                else:
+                    by_priority[entry[2]['priority']] += 1
+            triage = dict(self.triage_counts, pending=triage_pending,
+                          running=sum(len(job_ids) for job_ids in self._triaging.values()))
+        return {
+            'workers': self.num_workers,
+            'threads_per_worker': self.threads_per_worker,
+            'workers_alive': self.alive_workers(),
+            'workers_ready': len(self._ready_workers),
+            'queued': pending,
+            'queued_by_priority': by_priority,
+            'processing': sum(len(job_ids) for job_ids in self._running.values()),
+            'max_queue_size': self.max_queue_size,
+            'triage': triage
+        }
+
+    def observe_timings(self, timings: Dict[str, float]):
+        """Fold one job's per-stage timings into the latency histograms"""
+        for stage, seconds in timings.items():
+            histogram = self.stage_latency.get(stage)
+            if histogram is None:
+                histogram = self.stage_latency.setdefault(stage, Histogram())
+            histogram.observe(seconds)
+
+    def latency_stats(self) -> Dict:
+        """p50/p95/p99 per pipeline stage, for time spent queued and for submit-to-result time"""
+        return {
+            'queue_wait_seconds': self.queue_wait.snapshot(),
+            'stages': {stage: histogram.snapshot() for stage, histogram in sorted(self.stage_latency.items())},
+            'time_to_result_seconds': {
+                'by_priority': {priority: histogram.snapshot() for priority, histogram in self.time_to_result.items()},
+                'by_urgency': {urgency: histogram.snapshot()
+                               for urgency, histogram in self.time_to_result_by_urgency.items()}
+            }
+        }
+
+    def observe_result(self, task: Dict, result: Optional[Dict]):
+        """Record a finished job's submit-to-result time by requested priority and finding urgency"""
+        elapsed = time.monotonic() - task['queued_at']
+        self.time_to_result[task['requested_priority']].observe(elapsed)
+        if result is None:
+            return
+        urgencies = {detection.get('urgency') for detection in result.get('detections') or []}
+        urgency = next((level for level in URGENCIES[:-1] if level in urgencies), 'none')
+        self.time_to_result_by_urgency[urgency].observe(elapsed)
+
+    def _dispatch_loop(self):
+        """Hand pending jobs to workers, one per idle worker thread"""
+        while True:
+            self._slots.acquire()
+            with self._lock:
+                while not self._entries and not self._stopping:
+                    self._lock.wait()
+                if self._stopping:
+                    return
+                task = self._pop()
+            self._task_queue.put(task)
+
+    def _event_loop(self):
+        """Apply worker events to the job table and watch for dead workers"""
+        while not self._stopping:
+            try:
+                event = self._event_queue.get(timeout=1.0)
+            except queue.Empty:
+                self._reap_dead_workers()
+                continue
+
+            event_type = event['type']
+            worker_id = event.get('worker_id')
+
+            if event_type == 'ready':
+                self._ready_workers.add(worker_id)
+                continue
+
+            job_id = event['job_id']
+
+            if event_type == 'stage':
+                self._publish(job_id, event)
+            elif event_type == 'triage_started':
+                self._triaging.setdefault(worker_id, set()).add(job_id)
+            elif event_type == 'triaged':
+                self._triaging.get(worker_id, set()).discard(job_id)
+                self._slots.release()
+                self._apply_triage(job_id, event.get('triage') or {})
+            elif event_type == 'started':
+                self._running.setdefault(worker_id, set()).add(job_id)
+                task = self._tasks.get(job_id)
+                if task is not None:
+                    self.queue_wait.observe(time.monotonic() - task['queued_at'])
+                self.store.update(
+                    job_id,
+                    status='processing',
+                    started_at=datetime.now().isoformat(),
+                    worker_id=worker_id
+                )
+                self._publish(job_id, event)
+            elif event_type in ('completed', 'failed'):
+                self._running.get(worker_id, set()).discard(job_id)
+                if 'worker_stats' in event:
+                    self.worker_stats[worker_id] = event['worker_stats']
+                self.job_counts[event_type] += 1
+                self.observe_timings((event.get('result') or {}).get('timings') or {})
+                task = self._tasks.pop(job_id, None)
+                if task is not None:
+                    self.observe_result(task, event.get('result') if event_type == 'completed' else None)
+                self.store.update(
+                    job_id,
+                    status=event_type,
+                    completed_at=datetime.now().isoformat(),
+                    result=event.get('result'),
+                    error=event.get('error')
+                )
+                self._slots.release()
+                if event_type == 'completed' and self.catalog is not None:
+                    self._record_in_catalog(job_id, event)
+                self._publish(job_id, event)
+
+    def _apply_triage(self, job_id: str, triage: Dict):
+        """Promote a still-queued job when its triage pass found likely-urgent findings"""
+        promoted_to = TRIAGE_PROMOTIONS.get(triage.get('urgency'))
+        with self._lock:
+            self.triage_counts['triaged'] += 1
+            entry = self._entries.get(job_id)
+            task = entry[2] if entry is not None else None
+            if task is None or promoted_to is None or PRIORITIES.index(promoted_to) >= PRIORITIES.index(task['priority']):
+                return
+            self._drop(job_id)
+            task['priority'] = promoted_to
+            self._push(job_id, task, task['queued_at'] + self.aging[promoted_to])
+            self.triage_counts['promoted'] += 1
+
+        self.store.update(job_id, priority=promoted_to)
+        print(f"⚡ Job {job_id} promoted to {promoted_to} by triage ({triage['urgency']} finding)")
+
+    def _record_in_catalog(self, job_id: str, event: Dict):
+        try:
+            self.catalog.record_result(event.get('result') or {}, job_id, event.get('file_path'))
+        except Exception as e:
+            print(f"⚠️ Could not record job {job_id} in the study catalog: {e}")
+
+    def _reap_dead_workers(self):
+        """Fail the job of any crashed worker and start a replacement"""
+        for worker_id, process in list(self._workers.items()):
+            if process.is_alive() or self._stopping:
+                continue
+
+            print(f"⚠️ Worker {worker_id} exited (code {process.exitcode}), restarting")
+            self._ready_workers.discard(worker_id)
+            # An interrupted triage pass only gives up its slot; the job stays queued
+            for _ in self._triaging.pop(worker_id, set()):
+                self._slots.release()
+            for job_id in self._running.pop(worker_id, set()):
+                self._tasks.pop(job_id, None)
+                self.store.update(
+                    job_id,
+                    status='failed',
+                    error='Worker process crashed',
+                    completed_at=datetime.now().isoformat()
+                )
+                self.job_counts['failed'] += 1
+                self._slots.release()
+                self._publish(job_id, {'type': 'failed', 'job_id': job_id, 'worker_id': worker_id,
+                                       'error': 'Worker process crashed'})
+            self._start_worker(worker_id)
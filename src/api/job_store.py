@@ -0,0 +1,299 @@
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+# Columns persisted for every job; 'result' is stored as JSON text
+JOB_FIELDS = (
+    'job_id', 'filename', 'kind', 'status', 'created_at', 'started_at', 'completed_at',
+    'file_path', 'upload_dir', 'output_dir', 'worker_id', 'error', 'result', 'batch_id', 'priority'
+)
+
+# Statuses a worker never touches again; only these jobs may expire
+TERMINAL_STATUSES = ('completed', 'failed')
+
+class JobStore(ABC):
+    """Interface for job persistence backends; a backend missing any method fails at construction"""
+
+    @abstractmethod
+    def create(self, job: Dict):
+        raise NotImplementedError
+
+    @abstractmethod
+    def create_many(self, jobs: List[Dict]):
+        """Insert several jobs at once (all or none)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def update(self, job_id: str, **fields):
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_many(self, job_ids: List[str], **fields):
+        """Apply the same field values to several jobs at once"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_batch(self, batch_id: str, include_results: bool = False) -> List[Dict]:
+        """Jobs of one batch upload, oldest first"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, job_id: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def list(self, status: Optional[str] = None, limit: int = 50, offset: int = 0) -> Tuple[int, List[Dict]]:
+        """(total matching, page of job summaries without results), newest first"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """1-based position among queued jobs, or None if the job is not queued"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def evict_expired(self, ttl_seconds: float) -> List[Dict]:
+        """Delete finished jobs that completed more than ttl_seconds ago and return them"""
+        raise NotImplementedError
+
+class MemoryJobStore(JobStore):
+    """Process-local store - jobs are lost on restart and invisible to other workers"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def create(self, job: Dict):
+        with self._lock:
+            self._jobs[job['job_id']] = dict(job)
+
+    def create_many(self, jobs: List[Dict]):
+        with self._lock:
+            for job in jobs:
+                self._jobs[job['job_id']] = dict(job)
+
+    def update(self, job_id: str, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def update_many(self, job_ids: List[str], **fields):
+        with self._lock:
+            for job_id in job_ids:
+                if job_id in self._jobs:
+                    self._jobs[job_id].update(fields)
+
+    def list_batch(self, batch_id: str, include_results: bool = False) -> List[Dict]:
+        with self._lock:
+            jobs = [dict(j) for j in self._jobs.values() if j.get('batch_id') == batch_id]
+        jobs.sort(key=lambda j: (j['created_at'], j['job_id']))
+        if not include_results:
+            for job in jobs:
+                job.pop('result', None)
+        return jobs
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def delete(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def list(self, status: Optional[str] = None, limit: int = 50, offset: int = 0) -> Tuple[int, List[Dict]]:
+        with self._lock:
+            matching = [j for j in self._jobs.values() if status is None or j['status'] == status]
+        matching.sort(key=lambda j: j['created_at'], reverse=True)
+        page = [{k: v for k, v in j.items() if k != 'result'} for j in matching[offset:offset + limit]]
+        return len(matching), page
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['status'] != 'queued':
+                return None
+            return 1 + sum(
+                1 for j in self._jobs.values()
+                if j['status'] == 'queued' and j['created_at'] < job['created_at']
+            )
+
+    def evict_expired(self, ttl_seconds: float) -> List[Dict]:
+        cutoff = (datetime.now() - timedelta(seconds=ttl_seconds)).isoformat()
+        with self._lock:
+            expired = [
+                j for j in self._jobs.values()
+                if j['status'] in TERMINAL_STATUSES and (j.get('completed_at') or j['created_at']) < cutoff
+            ]
+            for job in expired:
+                del self._jobs[job['job_id']]
+        return expired
+
+class SQLiteJobStore(JobStore):
+    """Embedded SQLite store in WAL mode, shared by every API worker on the host"""
+
+    def __init__(self, db_path: str = 'data/jobs.db'):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id       TEXT PRIMARY KEY,
+                filename     TEXT,
+                kind         TEXT,
+                status       TEXT NOT NULL,
+                created_at   TEXT NOT NULL,
+                started_at   TEXT,
+                completed_at TEXT,
+                file_path    TEXT,
+                upload_dir   TEXT,
+                output_dir   TEXT,
+                worker_id    INTEGER,
+                error        TEXT,
+                result       TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at);
+            CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs (created_at);
+            CREATE INDEX IF NOT EXISTS idx_jobs_status_completed ON jobs (status, completed_at);
+        """)
+
+        # Databases created before batch uploads / priority scheduling lack these columns
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for column in ('batch_id', 'priority'):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_batch ON jobs (batch_id)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; WAL lets readers proceed while a writer commits
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _row_to_job(self, row: sqlite3.Row) -> Dict:
+        job = dict(row)
+        if job.get('result') is not None:
+            job['result'] = json.loads(job['result'])
+        return job
+
+    def _row_values(self, job: Dict) -> List:
+        values = {field: job.get(field) for field in JOB_FIELDS}
+        if values['result'] is not None:
+            values['result'] = json.dumps(values['result'], default=str)
+        return [values[field] for field in JOB_FIELDS]
+
+    def create(self, job: Dict):
+        self.create_many([job])
+
+    def create_many(self, jobs: List[Dict]):
+        placeholders = ', '.join('?' for _ in JOB_FIELDS)
+        conn = self._conn()
+        # One transaction: a batch is either fully recorded or not at all
+        with conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                f"INSERT INTO jobs ({', '.join(JOB_FIELDS)}) VALUES ({placeholders})",
+                [self._row_values(job) for job in jobs]
+            )
+
+    def update(self, job_id: str, **fields):
+        unknown = set(fields) - set(JOB_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown job fields: {sorted(unknown)}")
+        if 'result' in fields and fields['result'] is not None:
+            fields['result'] = json.dumps(fields['result'], default=str)
+
+        assignments = ', '.join(f"{field} = ?" for field in fields)
+        self._conn().execute(
+            f"UPDATE jobs SET {assignments} WHERE job_id = ?",
+            list(fields.values()) + [job_id]
+        )
+
+    def update_many(self, job_ids: List[str], **fields):
+        unknown = set(fields) - set(JOB_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown job fields: {sorted(unknown)}")
+        if not job_ids:
+            return
+
+        assignments = ', '.join(f"{field} = ?" for field in fields)
+        placeholders = ', '.join('?' for _ in job_ids)
+        self._conn().execute(
+            f"UPDATE jobs SET {assignments} WHERE job_id IN ({placeholders})",
+            list(fields.values()) + list(job_ids)
+        )
+
+    def list_batch(self, batch_id: str, include_results: bool = False) -> List[Dict]:
+        fields = ', '.join(field for field in JOB_FIELDS if include_results or field != 'result')
+        rows = self._conn().execute(
+            f"SELECT {fields} FROM jobs WHERE batch_id = ? ORDER BY created_at, job_id",
+            (batch_id,)
+        ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        row = self._conn().execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def delete(self, job_id: str):
+        self._conn().execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def list(self, status: Optional[str] = None, limit: int = 50, offset: int = 0) -> Tuple[int, List[Dict]]:
+        summary_fields = ', '.join(field for field in JOB_FIELDS if field != 'result')
+        where, params = ("WHERE status = ?", [status]) if status else ("", [])
+
+        conn = self._conn()
+        total = conn.execute(f"SELECT COUNT(*) FROM jobs {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT {summary_fields} FROM jobs {where} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+            params + [limit, offset]
+        ).fetchall()
+        return total, [dict(row) for row in rows]
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        conn = self._conn()
+        row = conn.execute("SELECT status, created_at FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None or row['status'] != 'queued':
+            return None
+        ahead = conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created_at < ?",
+            (row['created_at'],)
+        ).fetchone()[0]
+        return ahead + 1
+
+    def evict_expired(self, ttl_seconds: float) -> List[Dict]:
+        cutoff = (datetime.now() - timedelta(seconds=ttl_seconds)).isoformat()
+        # Queued and processing jobs are never evicted: a worker may still be using their files
+        where = (f"status IN ({', '.join('?' for _ in TERMINAL_STATUSES)}) "
+                 f"AND COALESCE(completed_at, created_at) < ?")
+        params = list(TERMINAL_STATUSES) + [cutoff]
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")
+            rows = conn.execute(f"SELECT job_id, upload_dir, output_dir FROM jobs WHERE {where}", params).fetchall()
+            if rows:
+                conn.executemany("DELETE FROM jobs WHERE job_id = ?", [(row['job_id'],) for row in rows])
+        return [dict(row) for row in rows]
+
+def create_job_store(backend: str = 'sqlite', db_path: str = 'data/jobs.db') -> JobStore:
+    """Build the configured job store backend"""
+    if backend == 'memory':
+        return MemoryJobStore()
+    if backend == 'sqlite':
+        return SQLiteJobStore(db_path)
+    raise ValueError(f"Unknown job store backend: {backend}")
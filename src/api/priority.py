@@ -0,0 +1,79 @@
+import os
+from typing import Iterable, Optional
+
+import pydicom
+
+# Scheduling priorities, most urgent first
+PRIORITIES = ('stat', 'urgent', 'routine')
+
+# X-Priority header values and DICOM priority codes -> scheduling priority
+PRIORITY_ALIASES = {
+    'stat': 'stat', 'ed': 'stat', 'emergency': 'stat', 'asap': 'stat',
+    'urgent': 'urgent', 'high': 'urgent', 'inpatient': 'urgent',
+    'routine': 'routine', 'medium': 'routine', 'low': 'routine', 'outpatient': 'routine'
+}
+
+# Order attributes carrying the requested priority, most specific first
+PRIORITY_TAGS = ('RequestedProcedurePriority', 'ScheduledProcedureStepPriority', 'ReportingPriority')
+
+# Worklist-derived objects nest the order attributes in these sequences
+PRIORITY_SEQUENCES = ('RequestAttributesSequence', 'ScheduledProcedureStepSequence')
+
+# Triage urgency -> priority a queued job is promoted to
+TRIAGE_PROMOTIONS = {'high': 'stat', 'moderate': 'urgent'}
+
+def normalize_priority(value) -> Optional[str]:
+    """Scheduling priority for a header value or DICOM code, None if unrecognised"""
+    if value is None:
+        return None
+    return PRIORITY_ALIASES.get(str(value).strip().lower())
+
+def dicom_priority(dataset) -> Optional[str]:
+    """Priority from a dataset's order attributes (STAT/HIGH/MEDIUM/ROUTINE/LOW)
+
+    Top-level attributes win; otherwise the first item of each request or
+    scheduled-step sequence is checked.
+    """
+    datasets = [dataset]
+    for keyword in PRIORITY_SEQUENCES:
+        sequence = dataset.get(keyword)
+        if sequence:
+            datasets.append(sequence[0])
+
+    for item in datasets:
+        for tag in PRIORITY_TAGS:
+            priority = normalize_priority(item.get(tag))
+            if priority:
+                return priority
+    return None
+
+def read_priority(paths: Iterable[str]) -> Optional[str]:
+    """Priority from the first DICOM header that carries one (pixel data is never read)"""
+    for path in paths:
+        try:
+            dataset = pydicom.dcmread(path, stop_before_pixels=True, specific_tags=list(PRIORITY_TAGS + PRIORITY_SEQUENCES))
+        except Exception:
+            continue
+        priority = dicom_priority(dataset)
+        if priority:
+            return priority
+    return None
+
+def resolve_priority(header: Optional[str], kind: str, file_path: str) -> str:
+    """Job priority: an X-Priority header wins, then the DICOM order priority, else routine
+
+    A series is one order, so only its first file is read.
+    """
+    priority = normalize_priority(header)
+    if priority:
+        return priority
+
+    paths = []
+    if kind == 'dicom':
+        paths = [file_path]
+    elif kind == 'series':
+        paths = sorted(
+            os.path.join(file_path, name) for name in os.listdir(file_path)
+            if name.lower().endswith('.dcm')
+        )[:1]
+    return read_priority(paths) or 'routine'
@@ -2,16 +2,29 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, File, UploadFile, HTTPException, Header, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel
 import uvicorn
 import shutil
 from datetime import datetime
 import uuid
+import io
 import json
+import zipfile
+import asyncio
+from typing import List, Optional
 
-from src.pipeline.simple_pipeline import SimplePipeline
+from src.api.job_queue import JobQueue, QueueFullError, WorkersUnavailableError
+from src.api.job_store import create_job_store
+from src.api.priority import PRIORITIES, normalize_priority, resolve_priority
+from src.api.uploads import UploadSizeLimitMiddleware, group_studies, iter_upload_file, save_upload_stream
+from src.dicom.catalog import URGENCY_RANK, StudyCatalog
+from src.detection.model_registry import get_registry
+from src.pipeline.simple_pipeline import OUTPUT_POLICIES, format_report_text, render_visualization
+from src.utils import config
+from src.utils.metrics import PrometheusText
 
 # Initialize FastAPI
 app = FastAPI(
@@ -29,13 +42,71 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize pipeline
-print("🚀 Initializing pipeline...")
-pipeline = SimplePipeline()
-print("✅ Pipeline ready!")
+# Refuse oversized upload bodies before the form parser spools them
+app.add_middleware(UploadSizeLimitMiddleware, max_bytes=config.MAX_UPLOAD_BYTES)
 
-# Simple in-memory job storage
-jobs = {}
+# Persistent job storage (SQLite by default, shared by all API workers)
+job_store = create_job_store(config.JOB_STORE_BACKEND, config.JOB_DB_PATH)
+
+# Study metadata for /studies, updated as DICOM jobs complete
+study_catalog = StudyCatalog(config.CATALOG_DB_PATH)
+
+# Worker pool - each worker process loads its own pipeline
+job_queue = JobQueue(
+    job_store,
+    num_workers=config.WORKER_COUNT,
+    max_queue_size=config.MAX_QUEUE_SIZE,
+    threads_per_worker=config.WORKER_THREADS,
+    catalog=study_catalog,
+    aging={'urgent': config.PRIORITY_AGING_URGENT_SECONDS, 'routine': config.PRIORITY_AGING_ROUTINE_SECONDS},
+    triage_size=config.TRIAGE_IMAGE_SIZE,
+    triage_min_queue=config.TRIAGE_MIN_QUEUE
+)
+
+# Per-upload override of RADIOLOGY_OUTPUT_POLICY
+OUTPUT_POLICY_QUERY = Query(
+    None,
+    pattern=f"^({'|'.join(OUTPUT_POLICIES)})$",
+    description="Artifacts to write: results (JSON only), lazy (visualization rendered on first request) or full"
+)
+
+# Requested priority; without it DICOM uploads use their order priority (RequestedProcedurePriority)
+PRIORITY_HEADER = Header(
+    None,
+    description="Scheduling priority: stat (also ed, emergency), urgent (also high) or routine (also outpatient)"
+)
+
+def check_priority_header(x_priority: Optional[str]):
+    """Reject an unrecognised X-Priority before the upload body is read"""
+    if x_priority is not None and normalize_priority(x_priority) is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown X-Priority '{x_priority}' (expected one of {', '.join(PRIORITIES)})"
+        )
+
+@app.on_event("startup")
+async def start_workers():
+    """Start pipeline worker processes"""
+    print(f"🚀 Starting {job_queue.num_workers} pipeline worker(s)...")
+    job_queue.start()
+    asyncio.create_task(evict_expired_jobs())
+
+@app.on_event("shutdown")
+async def stop_workers():
+    """Stop pipeline worker processes"""
+    job_queue.stop()
+
+async def evict_expired_jobs():
+    """Periodically drop finished jobs past the TTL together with their files"""
+    while True:
+        expired = await asyncio.to_thread(job_store.evict_expired, config.JOB_TTL_HOURS * 3600)
+        for job in expired:
+            for directory in (job['upload_dir'], job['output_dir']):
+                if directory:
+                    shutil.rmtree(directory, ignore_errors=True)
+        if expired:
+            print(f"🧹 Evicted {len(expired)} expired job(s)")
+        await asyncio.sleep(config.JOB_CLEANUP_INTERVAL_SECONDS)
 
 @app.get("/")
 async def root():
@@ -48,131 +119,516 @@ async def root():
         "endpoints": {
             "health": "/health",
             "upload": "/upload (POST)",
+            "upload_stream": "/upload/stream?filename=... (POST, raw body)",
+            "upload_series": "/upload/series (POST)",
+            "upload_batch": "/upload/batch (POST)",
+            "batch": "/batch/{batch_id}",
+            "batch_results": "/batch/{batch_id}/results (zip)",
             "status": "/status/{job_id}",
+            "events": "/events/{job_id} (server-sent events)",
             "result": "/result/{job_id}",
-            "report": "/report/{job_id}"
+            "report": "/report/{job_id}",
+            "studies": "/studies?modality=&date_from=&date_to=&patient_id=&urgency=",
+            "stats": "/stats",
+            "metrics": "/metrics",
+            "models": "/models"
         }
     }
 
 @app.get("/health")
 async def health():
     """Health check"""
+    queue_stats = job_queue.stats()
+    workers_ready = queue_stats['workers_ready'] > 0
     return {
-        "status": "healthy",
+        "status": "healthy" if queue_stats['workers_alive'] > 0 else "degraded",
         "timestamp": datetime.now().isoformat(),
         "components": {
-            "pipeline": "ready",
-            "detector": "ready",
-            "rag": "ready"
-        }
+            "pipeline": "ready" if workers_ready else "starting",
+            "detector": "ready" if workers_ready else "starting",
+            "rag": "ready" if workers_ready else "starting"
+        },
+        "queue": queue_stats
     }
 
 @app.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(file: UploadFile = File(...), output: Optional[str] = OUTPUT_POLICY_QUERY,
+                      x_priority: Optional[str] = PRIORITY_HEADER):
     """Upload file for processing"""
     if not file.filename.lower().endswith(('.dcm', '.png', '.jpg', '.jpeg')):
         raise HTTPException(
             status_code=400, 
             detail="File must be DICOM (.dcm) or image (.png, .jpg)"
         )
+    check_priority_header(x_priority)
     
-    job_id = str(uuid.uuid4())[:8]
+    job_id, upload_dir, output_dir = create_job_dirs()
+    filename = os.path.basename(file.filename)
     
-    upload_dir = f"uploads/{job_id}"
-    output_dir = f"outputs/{job_id}"
-    os.makedirs(upload_dir, exist_ok=True)
-    os.makedirs(output_dir, exist_ok=True)
+    upload = await receive_upload(
+        iter_upload_file(file, config.UPLOAD_CHUNK_BYTES),
+        f"{upload_dir}/{filename}",
+        upload_dir,
+        output_dir
+    )
     
-    file_path = f"{upload_dir}/{file.filename}"
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    kind = 'image' if filename.lower().endswith(('.png', '.jpg', '.jpeg')) else 'dicom'
+    priority = await asyncio.to_thread(resolve_priority, x_priority, kind, upload['path'])
     
-    jobs[job_id] = {
-        'job_id': job_id,
-        'filename': file.filename,
-        'status': 'uploaded',
-        'created_at': datetime.now().isoformat(),
-        'file_path': file_path,
-        'output_dir': output_dir
-    }
+    response = await asyncio.to_thread(enqueue_job, job_id, filename, kind, upload['path'], upload_dir, output_dir,
+                                       output, priority)
+    response.update(size_bytes=upload['size_bytes'], sha256=upload['sha256'])
+    return response
+
+@app.post("/upload/stream")
+async def upload_stream(request: Request, filename: str = Query(..., description="Original file name (.dcm, .png, .jpg)"),
+                        output: Optional[str] = OUTPUT_POLICY_QUERY, x_priority: Optional[str] = PRIORITY_HEADER):
+    """Upload a single file as the raw request body (no multipart)
     
-    try:
-        jobs[job_id]['status'] = 'processing'
+    The body is consumed as it arrives, so an oversized or non-DICOM upload
+    is rejected from its first chunks instead of after the full transfer.
+    """
+    filename = os.path.basename(filename)
+    if not filename.lower().endswith(('.dcm', '.png', '.jpg', '.jpeg')):
+        raise HTTPException(
+            status_code=400, 
+            detail="File must be DICOM (.dcm) or image (.png, .jpg)"
+        )
+    check_priority_header(x_priority)
+    
+    job_id, upload_dir, output_dir = create_job_dirs()
+    upload = await receive_upload(request.stream(), f"{upload_dir}/{filename}", upload_dir, output_dir)
+    
+    kind = 'image' if filename.lower().endswith(('.png', '.jpg', '.jpeg')) else 'dicom'
+    priority = await asyncio.to_thread(resolve_priority, x_priority, kind, upload['path'])
+    
+    response = await asyncio.to_thread(enqueue_job, job_id, filename, kind, upload['path'], upload_dir, output_dir,
+                                       output, priority)
+    response.update(size_bytes=upload['size_bytes'], sha256=upload['sha256'])
+    return response
+
+@app.post("/upload/series")
+async def upload_series(files: List[UploadFile] = File(...), output: Optional[str] = OUTPUT_POLICY_QUERY,
+                        x_priority: Optional[str] = PRIORITY_HEADER):
+    """Upload the DICOM files (or one .zip) of a single study for series processing"""
+    if not all(f.filename.lower().endswith(('.dcm', '.zip')) for f in files):
+        raise HTTPException(
+            status_code=400,
+            detail="Series uploads must be DICOM (.dcm) files or a .zip archive"
+        )
+    check_priority_header(x_priority)
+    
+    job_id, upload_dir, output_dir = create_job_dirs()
+    
+    total_bytes = 0
+    for index, file in enumerate(files):
+        file_path = f"{upload_dir}/{index:05d}_{os.path.basename(file.filename)}"
+        upload = await receive_upload(
+            iter_upload_file(file, config.UPLOAD_CHUNK_BYTES),
+            file_path,
+            upload_dir,
+            output_dir,
+            max_bytes=config.MAX_UPLOAD_BYTES - total_bytes
+        )
+        total_bytes += upload['size_bytes']
         
-        if file.filename.lower().endswith(('.png', '.jpg', '.jpeg')):
-            result = process_image(file_path, output_dir)
-        else:
-            result = pipeline.process_dicom(file_path, output_dir)
+        if file_path.lower().endswith('.zip'):
+            try:
+                await asyncio.to_thread(extract_zip, file_path, upload_dir)
+            except zipfile.BadZipFile:
+                shutil.rmtree(upload_dir, ignore_errors=True)
+                shutil.rmtree(output_dir, ignore_errors=True)
+                raise HTTPException(status_code=400, detail=f"Invalid zip archive: {file.filename}")
+            os.remove(file_path)
+    
+    filename = files[0].filename if len(files) == 1 else f"{len(files)} files"
+    priority = await asyncio.to_thread(resolve_priority, x_priority, 'series', upload_dir)
+    response = await asyncio.to_thread(enqueue_job, job_id, filename, 'series', upload_dir, upload_dir, output_dir,
+                                       output, priority)
+    response.update(size_bytes=total_bytes)
+    return response
+
+@app.post("/upload/batch")
+async def upload_batch(files: List[UploadFile] = File(...), output: Optional[str] = OUTPUT_POLICY_QUERY,
+                       x_priority: Optional[str] = PRIORITY_HEADER):
+    """Upload several studies at once (files and/or .zip archives), one job per study
+    
+    DICOM files are grouped into studies by StudyInstanceUID. All jobs are
+    queued together, so workers pick them up side by side and batch their
+    detection. X-Priority applies to every study; without it each study
+    uses its own DICOM order priority.
+    """
+    if not all(f.filename.lower().endswith(('.dcm', '.png', '.jpg', '.jpeg', '.zip')) for f in files):
+        raise HTTPException(
+            status_code=400,
+            detail="Batch uploads must be DICOM (.dcm), image (.png, .jpg) or .zip files"
+        )
+    check_priority_header(x_priority)
+    
+    batch_id = str(uuid.uuid4())[:8]
+    staging_dir = f"uploads/batch_{batch_id}"
+    os.makedirs(staging_dir, exist_ok=True)
+    
+    try:
+        total_bytes = 0
+        for index, file in enumerate(files):
+            file_path = f"{staging_dir}/{index:05d}_{os.path.basename(file.filename)}"
+            upload = await receive_upload(
+                iter_upload_file(file, config.UPLOAD_CHUNK_BYTES),
+                file_path,
+                staging_dir,
+                staging_dir,
+                max_bytes=config.MAX_UPLOAD_BYTES - total_bytes
+            )
+            total_bytes += upload['size_bytes']
+            
+            if file_path.lower().endswith('.zip'):
+                try:
+                    await asyncio.to_thread(extract_zip, file_path, staging_dir)
+                except zipfile.BadZipFile:
+                    raise HTTPException(status_code=400, detail=f"Invalid zip archive: {file.filename}")
+                os.remove(file_path)
         
-        jobs[job_id]['status'] = 'completed'
-        jobs[job_id]['result'] = result
-        jobs[job_id]['completed_at'] = datetime.now().isoformat()
+        paths = [os.path.join(staging_dir, name) for name in os.listdir(staging_dir)]
+        studies, skipped = await asyncio.to_thread(group_studies, paths)
+        if not studies:
+            raise HTTPException(status_code=400, detail="No readable studies in the upload")
+        if len(studies) > job_queue.max_queue_size:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch has {len(studies)} studies; at most {job_queue.max_queue_size} can be queued"
+            )
         
-    except Exception as e:
-        jobs[job_id]['status'] = 'failed'
-        jobs[job_id]['error'] = str(e)
+        jobs = await asyncio.to_thread(stage_batch_jobs, batch_id, studies, normalize_priority(x_priority))
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    
+    enqueue_batch(jobs, output)
     
     return {
-        "job_id": job_id,
-        "status": jobs[job_id]['status'],
-        "message": "Processing started" if jobs[job_id]['status'] != 'failed' else f"Error: {jobs[job_id].get('error')}"
+        "batch_id": batch_id,
+        "status": "queued",
+        "jobs": [
+            {"job_id": job['job_id'], "filename": job['filename'], "kind": job['kind'], "files": job['files'],
+             "priority": job['priority']}
+            for job in jobs
+        ],
+        "skipped": skipped,
+        "size_bytes": total_bytes,
+        "message": f"{len(jobs)} job(s) queued for processing"
     }
 
-def process_image(image_path: str, output_dir: str):
-    """Process regular image file"""
-    from src.detection.simple_detector import SimpleDetector
-    from src.rag.simple_rag import SimpleRAG
-    
-    detector = SimpleDetector()
-    rag = SimpleRAG()
+def stage_batch_jobs(batch_id: str, studies: List[dict], priority: Optional[str] = None) -> List[dict]:
+    """Move each study's files into its own job directory and build the job records"""
+    jobs = []
+    for study in studies:
+        job_id, upload_dir, output_dir = create_job_dirs()
+        for path in study['paths']:
+            shutil.move(path, f"{upload_dir}/{os.path.basename(path)}")
+        
+        file_path = upload_dir if study['kind'] == 'series' else f"{upload_dir}/{os.path.basename(study['paths'][0])}"
+        jobs.append({
+            'job_id': job_id,
+            # Drop the staging index prefix ('00003_')
+            'filename': study['name'].split('_', 1)[1],
+            'kind': study['kind'],
+            'status': 'uploaded',
+            'created_at': datetime.now().isoformat(),
+            'file_path': file_path,
+            'upload_dir': upload_dir,
+            'output_dir': output_dir,
+            'batch_id': batch_id,
+            'priority': priority or study['priority'] or 'routine',
+            'files': len(study['paths'])
+        })
+    return jobs
+
+def enqueue_batch(jobs: List[dict], output_policy: Optional[str] = None):
+    """Record a batch's jobs and queue them all together, or none of them"""
+    job_store.create_many([{key: value for key, value in job.items() if key != 'files'} for job in jobs])
     
-    detections = detector.detect(image_path)
+    try:
+        job_queue.submit_many([dict(job, output_policy=output_policy) for job in jobs])
+    except ValueError as e:
+        # An unknown priority rejects the whole batch before any job is queued
+        for job in jobs:
+            discard_job(job['job_id'])
+        raise HTTPException(status_code=400, detail=str(e))
+    except (QueueFullError, WorkersUnavailableError) as e:
+        for job in jobs:
+            discard_job(job['job_id'])
+        raise HTTPException(
+            status_code=429 if isinstance(e, QueueFullError) else 503,
+            detail=str(e),
+            headers={"Retry-After": str(config.QUEUE_RETRY_AFTER_SECONDS)}
+        )
+
+def create_job_dirs():
+    """New job id with its upload and output directories"""
+    job_id = str(uuid.uuid4())[:8]
     
-    detector.visualize_detections(
-        image_path,
-        detections,
-        f"{output_dir}/detections_visualized.png"
-    )
+    upload_dir = f"uploads/{job_id}"
+    output_dir = f"outputs/{job_id}"
+    os.makedirs(upload_dir, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
     
-    report = rag.generate_report(detections, {})
+    return job_id, upload_dir, output_dir
+
+async def receive_upload(chunks, file_path: str, upload_dir: str, output_dir: str, max_bytes: int = None) -> dict:
+    """Stream an upload to disk, removing the job directories if it is rejected"""
+    try:
+        return await save_upload_stream(
+            chunks,
+            file_path,
+            max_bytes if max_bytes is not None else config.MAX_UPLOAD_BYTES,
+            is_dicom=file_path.lower().endswith('.dcm')
+        )
+    except BaseException:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        shutil.rmtree(output_dir, ignore_errors=True)
+        raise
+
+def extract_zip(zip_path: str, target_dir: str):
+    """Extract archive members flat into target_dir (member paths are never trusted)"""
+    prefix = os.path.splitext(os.path.basename(zip_path))[0]
+    with zipfile.ZipFile(zip_path) as archive:
+        for index, member in enumerate(archive.infolist()):
+            name = os.path.basename(member.filename)
+            if member.is_dir() or not name or name.startswith('.'):
+                continue
+            with archive.open(member) as source, open(f"{target_dir}/{prefix}_{index:05d}_{name}", "wb") as target:
+                shutil.copyfileobj(source, target)
+
+def enqueue_job(job_id: str, filename: str, kind: str, file_path: str, upload_dir: str, output_dir: str,
+                output_policy: Optional[str] = None, priority: str = 'routine') -> dict:
+    """Record a job and hand it to the worker pool, translating back-pressure to HTTP errors"""
+    job_store.create({
+        'job_id': job_id,
+        'filename': filename,
+        'kind': kind,
+        'status': 'uploaded',
+        'created_at': datetime.now().isoformat(),
+        'file_path': file_path,
+        'upload_dir': upload_dir,
+        'output_dir': output_dir,
+        'priority': priority
+    })
     
-    with open(f"{output_dir}/report.txt", 'w') as f:
-        f.write(report['full_text'])
+    try:
+        job_queue.submit(job_id, kind, file_path, output_dir, output_policy, priority)
+    except ValueError as e:
+        discard_job(job_id)
+        raise HTTPException(status_code=400, detail=str(e))
+    except QueueFullError as e:
+        discard_job(job_id)
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(config.QUEUE_RETRY_AFTER_SECONDS)}
+        )
+    except WorkersUnavailableError as e:
+        discard_job(job_id)
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(config.QUEUE_RETRY_AFTER_SECONDS)}
+        )
     
     return {
-        'success': True,
-        'detections': detections,
-        'report': report,
-        'processing_time_seconds': 0,
-        'output_files': {
-            'visualization': f"{output_dir}/detections_visualized.png",
-            'report': f"{output_dir}/report.txt"
-        }
+        "job_id": job_id,
+        "status": "queued",
+        "priority": priority,
+        "queue_position": queue_position(job_id),
+        "message": "Job queued for processing"
     }
 
+def queue_position(job_id: str) -> Optional[int]:
+    """Position in this worker pool's dispatch order, else by creation time across the store"""
+    position = job_queue.queue_position(job_id)
+    return position if position is not None else job_store.queue_position(job_id)
+
+def discard_job(job_id: str):
+    """Remove a rejected job and its directories"""
+    job = job_store.get(job_id)
+    if job:
+        job_store.delete(job_id)
+        shutil.rmtree(job['upload_dir'], ignore_errors=True)
+        shutil.rmtree(job['output_dir'], ignore_errors=True)
+
 @app.get("/status/{job_id}")
 async def get_status(job_id: str):
     """Get job status"""
-    if job_id not in jobs:
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job = jobs[job_id]
     return {
         "job_id": job_id,
         "status": job['status'],
+        "priority": job.get('priority'),
+        "queue_position": await asyncio.to_thread(queue_position, job_id),
         "created_at": job['created_at'],
+        "started_at": job.get('started_at'),
         "completed_at": job.get('completed_at'),
         "error": job.get('error')
     }
 
+def sse(event: str, data: dict) -> str:
+    """One server-sent event frame"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def status_payload(job: dict) -> dict:
+    return {
+        "job_id": job['job_id'],
+        "status": job['status'],
+        "queue_position": queue_position(job['job_id']),
+        "started_at": job.get('started_at'),
+        "completed_at": job.get('completed_at')
+    }
+
+@app.get("/events/{job_id}")
+async def job_events(job_id: str, request: Request):
+    """Server-sent events for one job until it finishes
+    
+    Emits `status` on each status change, `stage` as pipeline stages start
+    and end (with seconds), then `result` (the full result) or `error`.
+    Jobs run by another API process are followed through the job store.
+    """
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    callback = lambda event: loop.call_soon_threadsafe(events.put_nowait, event)
+    
+    # Subscribe before reading the job so no transition falls in between
+    history = job_queue.subscribe(job_id, callback)
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        job_queue.unsubscribe(job_id, callback)
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def stream():
+        status = job['status']
+        final = job
+        try:
+            yield sse('status', await asyncio.to_thread(status_payload, job))
+            for event in history:
+                yield sse('stage', {k: event[k] for k in ('stage', 'phase', 'seconds')})
+            
+            while status not in ('completed', 'failed'):
+                if await request.is_disconnected():
+                    return
+                try:
+                    event = await asyncio.wait_for(events.get(), timeout=config.EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    current = await asyncio.to_thread(job_store.get, job_id)
+                    if current is None:
+                        yield sse('error', {"job_id": job_id, "error": "Job expired"})
+                        return
+                    if current['status'] != status:
+                        status, final = current['status'], current
+                        yield sse('status', await asyncio.to_thread(status_payload, current))
+                    else:
+                        yield ": keep-alive\n\n"
+                    continue
+                
+                if event['type'] == 'stage':
+                    yield sse('stage', {k: event[k] for k in ('stage', 'phase', 'seconds')})
+                else:
+                    status = 'processing' if event['type'] == 'started' else event['type']
+                    final = await asyncio.to_thread(job_store.get, job_id) or final
+                    yield sse('status', await asyncio.to_thread(status_payload, final))
+            
+            if status == 'completed':
+                yield sse('result', final.get('result') or {})
+            else:
+                yield sse('error', {"job_id": job_id, "error": final.get('error')})
+        finally:
+            job_queue.unsubscribe(job_id, callback)
+    
+    return StreamingResponse(
+        stream(),
+        media_type='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/batch/{batch_id}")
+async def get_batch_status(batch_id: str):
+    """Aggregated status of a batch upload and the status of each of its jobs"""
+    jobs = await asyncio.to_thread(job_store.list_batch, batch_id)
+    if not jobs:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    return batch_summary(batch_id, jobs)
+
+@app.get("/batch/{batch_id}/results")
+async def get_batch_results(batch_id: str):
+    """Zip of every finished job's result JSON and report text, plus a batch summary"""
+    jobs = await asyncio.to_thread(job_store.list_batch, batch_id, True)
+    if not jobs:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    archive = await asyncio.to_thread(build_batch_archive, batch_id, jobs)
+    return Response(
+        archive,
+        media_type='application/zip',
+        headers={"Content-Disposition": f'attachment; filename="batch_{batch_id}.zip"'}
+    )
+
+def batch_summary(batch_id: str, jobs: List[dict]) -> dict:
+    """Counts by status, overall state and per-job entries for a batch"""
+    counts = {}
+    for job in jobs:
+        counts[job['status']] = counts.get(job['status'], 0) + 1
+    
+    pending = sum(counts.get(status, 0) for status in ('uploaded', 'queued', 'processing'))
+    if pending:
+        status = 'processing' if pending < len(jobs) or counts.get('processing') else 'queued'
+    elif counts.get('failed'):
+        status = 'failed' if counts['failed'] == len(jobs) else 'partial'
+    else:
+        status = 'completed'
+    
+    return {
+        "batch_id": batch_id,
+        "status": status,
+        "done": pending == 0,
+        "total": len(jobs),
+        "counts": counts,
+        "jobs": [
+            {
+                "job_id": job['job_id'],
+                "filename": job['filename'],
+                "kind": job['kind'],
+                "status": job['status'],
+                "completed_at": job.get('completed_at'),
+                "error": job.get('error')
+            }
+            for job in jobs
+        ]
+    }
+
+def build_batch_archive(batch_id: str, jobs: List[dict]) -> bytes:
+    """In-memory zip with <job_id>/complete_result.json and report.txt per completed job"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for job in jobs:
+            result = job.get('result')
+            if job['status'] != 'completed' or not result:
+                continue
+            archive.writestr(f"{job['job_id']}/complete_result.json", json.dumps(result, default=str))
+            if result.get('report'):
+                archive.writestr(f"{job['job_id']}/report.txt", format_report_text(result))
+        
+        summary = batch_summary(batch_id, [{k: v for k, v in job.items() if k != 'result'} for job in jobs])
+        archive.writestr("batch_summary.json", json.dumps(summary, indent=2, default=str))
+    return buffer.getvalue()
+
 @app.get("/result/{job_id}")
 async def get_result(job_id: str):
     """Get complete result"""
-    if job_id not in jobs:
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job = jobs[job_id]
-    
     if job['status'] != 'completed':
         raise HTTPException(
             status_code=400,
@@ -184,13 +640,21 @@ async def get_result(job_id: str):
 @app.get("/report/{job_id}")
 async def get_report_text(job_id: str):
     """Download report as text file"""
-    if job_id not in jobs or jobs[job_id]['status'] != 'completed':
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None or job['status'] != 'completed':
         raise HTTPException(status_code=404, detail="Report not available")
     
     report_path = f"outputs/{job_id}/report.txt"
     
     if not os.path.exists(report_path):
-        raise HTTPException(status_code=404, detail="Report file not found")
+        # 'results' jobs write no files; the text is rebuilt from the stored result
+        if not job.get('result') or not job['result'].get('report'):
+            raise HTTPException(status_code=404, detail="Report file not found")
+        return Response(
+            format_report_text(job['result']),
+            media_type='text/plain',
+            headers={"Content-Disposition": f'attachment; filename="report_{job_id}.txt"'}
+        )
     
     return FileResponse(
         report_path,
@@ -201,22 +665,162 @@ async def get_report_text(job_id: str):
 @app.get("/visualization/{job_id}")
 async def get_visualization(job_id: str):
     """Get detection visualization"""
-    if job_id not in jobs or jobs[job_id]['status'] != 'completed':
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None or job['status'] != 'completed':
         raise HTTPException(status_code=404, detail="Visualization not available")
     
+    result = job['result'] or {}
+    if result.get('output_policy') == 'results':
+        # 'results' jobs promise no image artifacts
+        raise HTTPException(status_code=404, detail="Visualization not available for 'results' output")
+    
     viz_path = f"outputs/{job_id}/detections_visualized.png"
     
     if not os.path.exists(viz_path):
-        raise HTTPException(status_code=404, detail="Visualization not found")
+        # Deferred (lazy) outputs: render once from the saved frame, then serve the cached file
+        source_path = job.get('file_path')
+        # Series (and multi-frame) results have per-slice key images instead
+        if 'series' in result or not source_path or not os.path.exists(source_path):
+            raise HTTPException(status_code=404, detail="Visualization not found")
+        
+        metadata = result.get('dicom_metadata') or {}
+        os.makedirs(os.path.dirname(viz_path), exist_ok=True)
+        await asyncio.to_thread(
+            render_visualization, source_path, result['detections'], viz_path,
+            frame_path=(result.get('output_files') or {}).get('frame'),
+            native_shape=(metadata.get('rows'), metadata.get('columns'))
+        )
     
     return FileResponse(viz_path, media_type='image/png')
 
+@app.get("/stats")
+async def get_stats():
+    """Queue state, per-stage latency percentiles, and per-worker inference/cache counters"""
+    return {
+        "queue": job_queue.stats(),
+        "latency": job_queue.latency_stats(),
+        "workers": {
+            str(worker_id): stats
+            for worker_id, stats in job_queue.worker_stats.items()
+        }
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of queue, stage latency, batching and cache metrics"""
+    queue_stats = job_queue.stats()
+    latency = job_queue.latency_stats()
+    out = PrometheusText()
+    
+    out.metric("radiology_jobs_total", "counter", "Jobs finished, by outcome",
+               [({"status": status}, count) for status, count in job_queue.job_counts.items()])
+    out.metric("radiology_queue_jobs", "gauge", "Jobs waiting or being processed",
+               [({"state": "queued"}, queue_stats['queued']), ({"state": "processing"}, queue_stats['processing'])])
+    out.metric("radiology_queued_jobs_by_priority", "gauge", "Jobs waiting, by current scheduling priority",
+               [({"priority": priority}, count) for priority, count in queue_stats['queued_by_priority'].items()])
+    out.metric("radiology_triage_total", "counter", "Low-resolution triage passes, by outcome",
+               [({"outcome": outcome}, queue_stats['triage'][outcome]) for outcome in ('triaged', 'promoted', 'skipped')])
+    out.metric("radiology_workers", "gauge", "Pipeline worker processes",
+               [({"state": "alive"}, queue_stats['workers_alive']), ({"state": "ready"}, queue_stats['workers_ready'])])
+    out.histogram("radiology_queue_wait_seconds", "Time jobs spent queued before a worker picked them up",
+                  [({}, latency['queue_wait_seconds'])])
+    out.histogram("radiology_stage_seconds", "Pipeline time per stage (read, validate, decode, detect, ...)",
+                  [({"stage": stage}, snapshot) for stage, snapshot in latency['stages'].items()])
+    time_to_result = latency['time_to_result_seconds']
+    out.histogram("radiology_time_to_result_seconds", "Submit-to-result time, by requested priority",
+                  [({"priority": priority}, snapshot) for priority, snapshot in time_to_result['by_priority'].items()])
+    out.histogram("radiology_time_to_result_by_urgency_seconds", "Submit-to-result time, by highest finding urgency",
+                  [({"urgency": urgency}, snapshot) for urgency, snapshot in time_to_result['by_urgency'].items()])
+    
+    workers = sorted(job_queue.worker_stats.items())
+    detectors = [(str(worker_id), stats['detector']) for worker_id, stats in workers if stats.get('detector')]
+    out.histogram("radiology_detector_batch_size", "Images per batched predict call",
+                  [({"worker": worker_id}, detector['batch_size']) for worker_id, detector in detectors])
+    out.histogram("radiology_detector_inference_seconds", "Batched predict call duration",
+                  [({"worker": worker_id}, detector['inference_seconds']) for worker_id, detector in detectors])
+    
+    caches = [(str(worker_id), stats['result_cache']) for worker_id, stats in workers if stats.get('result_cache')]
+    out.metric("radiology_result_cache_lookups_total", "counter", "Result cache lookups, by outcome", [
+        ({"worker": worker_id, "outcome": outcome}, cache[key])
+        for worker_id, cache in caches
+        for outcome, key in (("memory_hit", 'memory_hits'), ("disk_hit", 'disk_hits'), ("miss", 'misses'))
+    ])
+    
+    return PlainTextResponse(out.render(), media_type="text/plain; version=0.0.4")
+
+class ModelActivation(BaseModel):
+    weights: str
+
+@app.get("/models")
+async def list_models():
+    """Active detector weights and the weight files available under models/"""
+    registry = get_registry()
+    available = []
+    if os.path.isdir(registry.models_dir):
+        available = sorted(
+            name for name in os.listdir(registry.models_dir)
+            if name.endswith(('.pt', '.onnx')) or name.endswith('_model')
+        )
+    return {
+        "active": registry.active_weights(),
+        "default": registry.default_weights,
+        "available": available
+    }
+
+@app.post("/models/activate")
+async def activate_model(request: ModelActivation):
+    """Hot-swap detector weights; workers switch on their next job"""
+    registry = get_registry()
+    weights = request.weights
+    if weights != registry.default_weights:
+        weights = os.path.join(registry.models_dir, os.path.basename(weights))
+    
+    try:
+        registry.activate(weights)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    return {"active": weights, "message": "Workers will load the new weights on their next job"}
+
 @app.get("/jobs")
-async def list_jobs():
-    """List all jobs"""
+async def list_jobs(
+    status: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0)
+):
+    """List jobs, newest first (paginated, results not included)"""
+    total, page = await asyncio.to_thread(job_store.list, status, limit, offset)
     return {
-        "total": len(jobs),
-        "jobs": list(jobs.values())
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "jobs": page
+    }
+
+@app.get("/studies")
+async def list_studies(
+    modality: Optional[str] = None,
+    date_from: Optional[str] = Query(None, description="Earliest study date, YYYYMMDD or YYYY-MM-DD"),
+    date_to: Optional[str] = Query(None, description="Latest study date, YYYYMMDD or YYYY-MM-DD"),
+    patient_id: Optional[str] = None,
+    urgency: Optional[List[str]] = Query(None, description="Highest finding urgency: none, low, moderate or high (repeatable)"),
+    analyzed: Optional[bool] = Query(None, description="Only analysed (true) or only scanned, not yet analysed (false) studies"),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0)
+):
+    """Worklist from the study catalog, most urgent then newest first (paginated)"""
+    unknown = [value for value in urgency or [] if value not in URGENCY_RANK]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown urgency: {', '.join(unknown)}")
+    
+    total, studies = await asyncio.to_thread(
+        study_catalog.query, modality, date_from, date_to, patient_id, urgency, analyzed, limit, offset
+    )
+    return {
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "studies": studies
     }
 
 if __name__ == "__main__":
@@ -0,0 +1,193 @@
+import asyncio
+import hashlib
+import os
+import struct
+from io import BytesIO
+from typing import AsyncIterator, Dict, List, Tuple
+
+import aiofiles
+import pydicom
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+from src.api.priority import PRIORITY_SEQUENCES, PRIORITY_TAGS, dicom_priority
+
+# Preamble (128) + 'DICM' (4) + (0002,0000) group length element (12)
+DICOM_META_OFFSET = 144
+
+class UploadRejected(HTTPException):
+    """Upload refused while streaming (size limit or not a DICOM file)"""
+
+class DicomPrefixChecker:
+    """Validates the DICOM preamble and file meta group from the first chunks of a stream"""
+
+    def __init__(self):
+        self.head = bytearray()
+        self.done = False
+
+    def feed(self, chunk: bytes):
+        """Buffer the start of the file until the meta group can be checked"""
+        if self.done:
+            return
+        self.head += chunk
+        self._check(final=False)
+
+    def finish(self):
+        """Check whatever arrived if the stream ended before the meta group was complete"""
+        if not self.done:
+            self._check(final=True)
+
+    def _check(self, final: bool):
+        if len(self.head) < DICOM_META_OFFSET:
+            if final:
+                raise UploadRejected(400, "File is too short to be DICOM")
+            return
+
+        if bytes(self.head[128:132]) != b'DICM':
+            raise UploadRejected(400, "Missing DICOM preamble ('DICM' prefix)")
+
+        # (0002,0000) UL holds the byte length of the rest of the meta group
+        group, element, vr = struct.unpack('<HH2s', self.head[132:138])
+        if (group, element, vr) != (0x0002, 0x0000, b'UL'):
+            raise UploadRejected(400, "Malformed DICOM file meta information")
+        meta_end = DICOM_META_OFFSET + struct.unpack('<I', self.head[140:144])[0]
+
+        if len(self.head) < meta_end:
+            if final:
+                raise UploadRejected(400, "Truncated DICOM file meta information")
+            return
+
+        try:
+            dataset = pydicom.dcmread(BytesIO(bytes(self.head[:meta_end])), stop_before_pixels=True)
+            transfer_syntax = dataset.file_meta.TransferSyntaxUID
+        except Exception as e:
+            raise UploadRejected(400, f"Invalid DICOM file meta information: {str(e)}")
+
+        if not transfer_syntax:
+            raise UploadRejected(400, "DICOM file meta has no TransferSyntaxUID")
+
+        self.done = True
+        self.head = bytearray()
+
+async def iter_upload_file(upload: UploadFile, chunk_size: int) -> AsyncIterator[bytes]:
+    """Read a multipart UploadFile in chunks"""
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+async def save_upload_stream(chunks: AsyncIterator[bytes], target_path: str, max_bytes: int,
+                             is_dicom: bool = False) -> Dict:
+    """Write chunks to disk without blocking the event loop, hashing and size-checking as they arrive
+
+    DICOM uploads are rejected as soon as the preamble/meta group is seen to
+    be invalid, before the rest of the body is read.
+    """
+    digest = hashlib.sha256()
+    checker = DicomPrefixChecker() if is_dicom else None
+    size = 0
+
+    try:
+        async with aiofiles.open(target_path, 'wb') as out:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadRejected(413, f"Upload exceeds the {max_bytes // (1024 * 1024)} MB limit")
+                if checker is not None:
+                    checker.feed(chunk)
+
+                # hashlib releases the GIL on large buffers, so hashing overlaps the write
+                await asyncio.to_thread(digest.update, chunk)
+                await out.write(chunk)
+
+        if checker is not None:
+            checker.finish()
+    except BaseException:
+        if os.path.exists(target_path):
+            os.remove(target_path)
+        raise
+
+    return {
+        'path': target_path,
+        'size_bytes': size,
+        'sha256': digest.hexdigest()
+    }
+
+def group_studies(paths: List[str]) -> Tuple[List[Dict], List[Dict]]:
+    """Split the files of a batch upload into studies
+
+    Images are one study each; DICOM files are grouped by StudyInstanceUID
+    from their headers alone (pixel data is never read). Returns the studies
+    as {'kind', 'name', 'paths', 'priority'} and the files that could not be
+    read; 'priority' is the DICOM order priority, or None.
+    """
+    studies, skipped, by_uid = [], [], {}
+    for path in sorted(paths):
+        name = os.path.basename(path)
+        if name.lower().endswith(('.png', '.jpg', '.jpeg')):
+            studies.append({'kind': 'image', 'name': name, 'paths': [path], 'priority': None})
+            continue
+
+        try:
+            dataset = pydicom.dcmread(path, stop_before_pixels=True,
+                                      specific_tags=['StudyInstanceUID', *PRIORITY_TAGS, *PRIORITY_SEQUENCES])
+            uid = str(dataset.get('StudyInstanceUID', '') or '')
+        except Exception as e:
+            skipped.append({'filename': name, 'reason': f"Not a readable DICOM file: {str(e)}"})
+            continue
+
+        # Files without a study UID cannot be grouped safely; treat each as its own study
+        key = uid or path
+        if key not in by_uid:
+            by_uid[key] = {'kind': 'dicom', 'name': name, 'paths': [], 'priority': None}
+            studies.append(by_uid[key])
+        by_uid[key]['paths'].append(path)
+        by_uid[key]['priority'] = by_uid[key]['priority'] or dicom_priority(dataset)
+
+    for study in by_uid.values():
+        if len(study['paths']) > 1:
+            study['kind'] = 'series'
+            study['name'] = f"{study['name']} (+{len(study['paths']) - 1} files)"
+    return studies, skipped
+
+class UploadSizeLimitMiddleware:
+    """Reject oversized upload bodies before they are buffered by the form parser
+
+    A declared Content-Length above the limit is refused immediately; bodies
+    without one (chunked encoding) are counted as they arrive and the request
+    fails with 413 as soon as the limit is crossed.
+    """
+
+    def __init__(self, app, max_bytes: int, path_prefix: str = '/upload'):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_prefix = path_prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not scope['path'].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"Upload exceeds the {self.max_bytes // (1024 * 1024)} MB limit"
+
+        headers = dict(scope.get('headers') or [])
+        content_length = headers.get(b'content-length')
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            response = JSONResponse(status_code=413, content={"detail": detail})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                if received > self.max_bytes:
+                    # Handled by FastAPI like any HTTPException raised while reading the body
+                    raise UploadRejected(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,291 @@
+import os
+import shutil
+import sys
+from typing import Dict, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from src.detection.detections import Detections
+from src.detection.simple_detector import SimpleDetector, as_three_channel
+from src.detection.tiling import nms
+
+BACKENDS = ('torch', 'onnx', 'onnx-int8', 'openvino')
+
+def set_torch_threads(threads: int):
+    """Cap PyTorch intra-op threads (0 keeps the library default of one per core)"""
+    if threads > 0:
+        import torch
+        torch.set_num_threads(threads)
+
+def letterbox(image: np.ndarray, size: int = 640) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """Resize keeping aspect ratio and pad to size x size, as YOLO was trained
+
+    Returns the (3, size, size) float32 RGB input plus the scale and (x, y)
+    padding needed to map boxes back to the original image.
+    """
+    image = as_three_channel(image)
+    height, width = image.shape[:2]
+    scale = min(size / height, size / width)
+    new_w, new_h = int(round(width * scale)), int(round(height * scale))
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(
+        np.ascontiguousarray(image), (new_w, new_h), interpolation=cv2.INTER_LINEAR
+    )
+    # BGR (OpenCV/ultralytics convention) -> RGB, HWC -> CHW, 0..1
+    return canvas[..., ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0, scale, (pad_x, pad_y)
+
+def decode_output(output: np.ndarray, conf_threshold: float, iou_threshold: float, scale: float,
+                  pad: Tuple[int, int], shape: Tuple[int, ...],
+                  max_detections: int = 300) -> Detections:
+    """Detections (xyxy boxes in original pixels) from one raw (4 + classes, anchors) YOLO output"""
+    predictions = output.T
+    class_scores = predictions[:, 4:]
+    classes = class_scores.argmax(axis=1)
+    scores = class_scores.max(axis=1)
+    keep = scores > conf_threshold
+    predictions, classes, scores = predictions[keep], classes[keep], scores[keep]
+    if not len(scores):
+        return Detections()
+
+    cx, cy, w, h = predictions[:, :4].T
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+
+    # Per-class NMS in one pass: shift each class into its own coordinate range
+    keep = nms(boxes + classes[:, None] * 7680.0, scores, iou_threshold)[:max_detections]
+    boxes, scores, classes = boxes[keep], scores[keep], classes[keep]
+
+    boxes[:, [0, 2]] = ((boxes[:, [0, 2]] - pad[0]) / scale).clip(0, shape[1])
+    boxes[:, [1, 3]] = ((boxes[:, [1, 3]] - pad[1]) / scale).clip(0, shape[0])
+    return Detections(boxes, scores, classes)
+
+class OnnxRuntimeSession:
+    """ONNX Runtime CPU session with a bounded intra-op thread pool"""
+
+    def __init__(self, model_path: str, threads: int = 0):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("The onnx backends need onnxruntime (pip install onnxruntime)") from e
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1
+        if threads > 0:
+            options.intra_op_num_threads = threads
+
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def run(self, batch: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: batch})[0]
+
+class OpenVINOSession:
+    """OpenVINO CPU model compiled for latency with a bounded thread count"""
+
+    def __init__(self, model_path: str, threads: int = 0):
+        try:
+            import openvino as ov
+        except ImportError as e:
+            raise RuntimeError("The openvino backend needs openvino (pip install openvino)") from e
+
+        # f32 explicitly: CPUs with AMX/AVX512-BF16 otherwise default to bf16 and drift from PyTorch
+        properties = {'PERFORMANCE_HINT': 'LATENCY', 'NUM_STREAMS': '1', 'INFERENCE_PRECISION_HINT': 'f32'}
+        if threads > 0:
+            properties['INFERENCE_NUM_THREADS'] = str(threads)
+        self.model = ov.Core().compile_model(model_path, 'CPU', properties)
+
+    def run(self, batch: np.ndarray) -> np.ndarray:
+        return self.model(batch)[0]
+
+class ExportedDetector(SimpleDetector):
+    """SimpleDetector interface over an exported model (ONNX Runtime, INT8 ONNX or OpenVINO)
+
+    Pre- and post-processing (letterbox, NMS) are done in NumPy so the
+    runtime only sees one fixed-size batch per call.
+    """
+
+    def __init__(self, model_path: str, backend: str = 'onnx', threads: int = 0,
+                 image_size: int = 640, iou_threshold: float = 0.7):
+        print(f"Loading {backend} model {model_path}...")
+        self.weights = model_path
+        self.backend = backend
+        self.image_size = image_size
+        self.iou_threshold = iou_threshold
+        if backend == 'openvino':
+            self.model = OpenVINOSession(model_path, threads)
+        else:
+            self.model = OnnxRuntimeSession(model_path, threads)
+        self.model_version = self.describe_weights(model_path)
+        print("✅ Model loaded!")
+
+    def detect(self, image: Union[str, np.ndarray], conf_threshold: float = 0.3,
+               image_size: Optional[int] = None) -> Detections:
+        """Detect objects in an image file or in-memory array"""
+        if isinstance(image, str):
+            path, image = image, cv2.imread(image)
+            if image is None:
+                raise ValueError(f"Could not read image: {path}")
+        return self.detect_batch([image], conf_threshold, image_size)[0]
+
+    def detect_batch(self, images: List[np.ndarray], conf_threshold: float = 0.3,
+                     image_size: Optional[int] = None) -> List[Detections]:
+        """Detect objects in several in-memory images with one runtime call (exports have dynamic input sizes)"""
+        if not images:
+            return []
+
+        inputs = [letterbox(image, image_size or self.image_size) for image in images]
+        outputs = self.model.run(np.stack([tensor for tensor, _, _ in inputs]))
+
+        return [
+            decode_output(output, conf_threshold, self.iou_threshold, scale, pad, image.shape)
+            for image, (_, scale, pad), output in zip(images, inputs, outputs)
+        ]
+
+def export_path(weights: str, backend: str, models_dir: str = 'models') -> str:
+    """Where the converted model for `backend` is cached"""
+    stem = os.path.splitext(os.path.basename(weights))[0]
+    return {
+        'onnx': f"{models_dir}/{stem}.onnx",
+        'onnx-int8': f"{models_dir}/{stem}_int8.onnx",
+        'openvino': f"{models_dir}/{stem}_openvino/{stem}.xml"
+    }[backend]
+
+def export_model(weights: str, backend: str, models_dir: str = 'models', image_size: int = 640) -> str:
+    """Convert weights for `backend` once and cache the result under models/
+
+    Every backend derives from one dynamic-batch ONNX export; an export older
+    than its weight file is rebuilt.
+    """
+    if backend not in BACKENDS or backend == 'torch':
+        raise ValueError(f"Nothing to export for backend '{backend}' (choose from {', '.join(BACKENDS[1:])})")
+
+    target = export_path(weights, backend, models_dir)
+    if os.path.exists(target) and (not os.path.exists(weights) or os.path.getmtime(target) >= os.path.getmtime(weights)):
+        return target
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    onnx_path = export_path(weights, 'onnx', models_dir)
+    if backend == 'onnx' or not os.path.exists(onnx_path) or os.path.getmtime(onnx_path) < os.path.getmtime(weights):
+        print(f"Exporting {weights} to ONNX...")
+        exported = SimpleDetector(weights).model.export(format='onnx', dynamic=True, imgsz=image_size)
+        if os.path.abspath(exported) != os.path.abspath(onnx_path):
+            shutil.move(exported, onnx_path)
+
+    if backend == 'onnx-int8':
+        try:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+        except ImportError as e:
+            raise RuntimeError("INT8 quantization needs onnxruntime (pip install onnxruntime)") from e
+        print(f"Quantizing {onnx_path} to INT8...")
+        quantize_dynamic(onnx_path, target, weight_type=QuantType.QInt8)
+    elif backend == 'openvino':
+        try:
+            import openvino as ov
+        except ImportError as e:
+            raise RuntimeError("The openvino backend needs openvino (pip install openvino)") from e
+        print(f"Converting {onnx_path} to OpenVINO IR...")
+        # Keep f32 weights (save_model compresses to fp16 by default)
+        ov.save_model(ov.convert_model(onnx_path), target, compress_to_fp16=False)
+
+    print(f"✅ Cached {backend} model at {target}")
+    return target
+
+def _box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of (N, 4) and (M, 4) xyxy boxes"""
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return intersection / np.maximum(area_a[:, None] + area_b[None, :] - intersection, 1e-9)
+
+def parity_check(reference: SimpleDetector, candidate: SimpleDetector, images: List[np.ndarray],
+                 conf_threshold: float = 0.25, iou_match: float = 0.9,
+                 conf_tolerance: float = 0.05) -> Dict:
+    """Check that `candidate` reproduces `reference` detections within tolerance
+
+    Detections are matched greedily by IoU (best-scoring first). A pair
+    matches when IoU >= iou_match and confidences differ by at most
+    conf_tolerance. Unmatched detections close to the confidence threshold
+    are ignored, since a small score shift can move them across it.
+    """
+    summary = {'images': len(images), 'reference': 0, 'matched': 0, 'missing': 0, 'extra': 0,
+               'max_conf_diff': 0.0, 'min_iou': 1.0}
+
+    for image in images:
+        expected = reference.detect(image, conf_threshold)
+        actual = candidate.detect(image, conf_threshold)
+        summary['reference'] += len(expected)
+
+        unmatched = list(range(len(actual)))
+        ious = _box_iou(expected.boxes, actual.boxes)
+
+        for i in np.argsort(-expected.confidences):
+            confidence = float(expected.confidences[i])
+            best = max(unmatched, key=lambda j: ious[i, j], default=None)
+            if best is not None and ious[i, best] >= iou_match:
+                conf_diff = abs(confidence - float(actual.confidences[best]))
+                if conf_diff <= conf_tolerance:
+                    unmatched.remove(best)
+                    summary['matched'] += 1
+                    summary['max_conf_diff'] = max(summary['max_conf_diff'], conf_diff)
+                    summary['min_iou'] = min(summary['min_iou'], float(ious[i, best]))
+                    continue
+            if confidence > conf_threshold + conf_tolerance:
+                summary['missing'] += 1
+
+        summary['extra'] += int((actual.confidences[unmatched] > conf_threshold + conf_tolerance).sum())
+
+    summary['passed'] = summary['missing'] == 0 and summary['extra'] == 0
+    return summary
+
+def load_images(paths: List[str]) -> List[np.ndarray]:
+    """Parity inputs: image files, DICOMs, or synthetic frames when none are given"""
+    if not paths:
+        rng = np.random.default_rng(0)
+        y, x = np.mgrid[0:1024, 0:896]
+        base = ((np.sin(x / 60.0) + np.cos(y / 45.0)) * 60 + 128).astype(np.uint8)
+        return [np.clip(base + rng.normal(0, 20, base.shape), 0, 255).astype(np.uint8) for _ in range(4)]
+
+    from src.dicom.dicom_handler import DICOMHandler
+    handler = DICOMHandler()
+    return [handler.read_dicom(path)['image'] if path.lower().endswith('.dcm') else cv2.imread(path)
+            for path in paths]
+
+def main(argv=None) -> int:
+    import argparse
+    from src.utils import config
+
+    parser = argparse.ArgumentParser(
+        description="Export weights for a CPU inference backend (cached under models/) and check that "
+                    "its detections match the PyTorch model"
+    )
+    parser.add_argument('images', nargs='*', help="Images or DICOMs to compare on (default: synthetic frames)")
+    parser.add_argument('--weights', default=config.MODEL_WEIGHTS)
+    parser.add_argument('--backend', default='onnx', choices=BACKENDS[1:])
+    parser.add_argument('--models-dir', default=config.MODELS_DIR)
+    parser.add_argument('--threads', type=int, default=config.INFERENCE_THREADS)
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--iou', type=float, default=0.9, help="Minimum IoU for two detections to match")
+    parser.add_argument('--tolerance', type=float, default=0.05, help="Maximum confidence difference")
+    args = parser.parse_args(argv)
+
+    set_torch_threads(args.threads)
+    model_path = export_model(args.weights, args.backend, args.models_dir)
+    summary = parity_check(
+        SimpleDetector(args.weights), ExportedDetector(model_path, args.backend, args.threads),
+        load_images(args.images), args.conf, args.iou, args.tolerance
+    )
+
+    print(f"📋 {args.backend} vs torch on {summary['images']} image(s): {summary['matched']}/{summary['reference']} matched, "
+          f"{summary['missing']} missing, {summary['extra']} extra, max confidence diff {summary['max_conf_diff']:.4f}, "
+          f"min IoU {summary['min_iou']:.3f}")
+    print("✅ Parity check passed" if summary['passed'] else "❌ Parity check failed")
+    return 0 if summary['passed'] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Union
+
+import cv2
+import numpy as np
+
+from src.detection.detections import Detections
+from src.detection.simple_detector import SimpleDetector, as_three_channel
+from src.utils.metrics import Histogram, BATCH_SIZE_BUCKETS
+
+class BatchingDetector:
+    """Micro-batching front end for SimpleDetector shared by concurrent callers
+
+    Requests arriving within `max_wait_ms` of the first one in a batch (up to
+    `max_batch_size`) are run through a single batched `predict` call and the
+    per-image detections are handed back to each caller.
+    """
+
+    def __init__(self, detector: SimpleDetector, max_batch_size: int = 8, max_wait_ms: float = 10.0):
+        self.detector = detector
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self.batch_size_hist = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_hist = Histogram()
+        self.inference_hist = Histogram()
+        self.latency_hist = Histogram()
+
+        self._requests = queue.Queue()
+        self._thread = threading.Thread(target=self._batch_loop, daemon=True)
+        self._thread.start()
+
+    def __getattr__(self, name):
+        # Everything except detection (visualization, urgency, ...) goes straight to the detector
+        return getattr(self.detector, name)
+
+    def detect(self, image: Union[str, np.ndarray], conf_threshold: float = 0.3,
+               image_size: Optional[int] = None) -> Detections:
+        """Queue one image for the next batch and wait for its detections"""
+        if isinstance(image, str):
+            path = image
+            image = cv2.imread(path)
+            if image is None:
+                raise ValueError(f"Could not read image: {path}")
+
+        future = Future()
+        self._requests.put((as_three_channel(image), conf_threshold, image_size, time.perf_counter(), future))
+        return future.result()
+
+    def detect_batch(self, images: List[np.ndarray], conf_threshold: float = 0.3,
+                     image_size: Optional[int] = None) -> List[Detections]:
+        """Queue several images at once (e.g. series slices) and wait for all of them"""
+        enqueued = time.perf_counter()
+        futures = []
+        for image in images:
+            future = Future()
+            self._requests.put((as_three_channel(image), conf_threshold, image_size, enqueued, future))
+            futures.append(future)
+        return [future.result() for future in futures]
+
+    def close(self):
+        """Stop the batching thread once queued requests are served"""
+        self._requests.put(None)
+        self._thread.join()
+
+    def stats(self) -> Dict:
+        """Batch-size and latency histograms"""
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'batch_size': self.batch_size_hist.snapshot(),
+            'queue_wait_seconds': self.queue_wait_hist.snapshot(),
+            'inference_seconds': self.inference_hist.snapshot(),
+            'latency_seconds': self.latency_hist.snapshot()
+        }
+
+    def _batch_loop(self):
+        while True:
+            first = self._requests.get()
+            if first is None:
+                return
+
+            batch = [first]
+            closing = False
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    item = self._requests.get(timeout=remaining) if remaining > 0 else self._requests.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    closing = True
+                    break
+                batch.append(item)
+
+            self._run_batch(batch)
+            if closing:
+                return
+
+    def _run_batch(self, batch: List):
+        # Requests for a non-default input size (low-resolution triage) get their own predict call
+        by_size: Dict[Optional[int], List] = {}
+        for item in batch:
+            by_size.setdefault(item[2], []).append(item)
+        for image_size, items in by_size.items():
+            self._run_sized_batch(items, image_size)
+
+    def _run_sized_batch(self, batch: List, image_size: Optional[int]):
+        started = time.perf_counter()
+        for _, _, _, enqueued, _ in batch:
+            self.queue_wait_hist.observe(started - enqueued)
+
+        # One predict at the loosest threshold, then each caller's own threshold is applied
+        conf_threshold = min(item[1] for item in batch)
+        try:
+            results = self.detector.detect_batch([item[0] for item in batch], conf_threshold, image_size)
+        except Exception as e:
+            for _, _, _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        finished = time.perf_counter()
+        self.batch_size_hist.observe(len(batch))
+        self.inference_hist.observe(finished - started)
+
+        for (_, threshold, _, enqueued, future), detections in zip(batch, results):
+            if threshold > conf_threshold:
+                detections = detections.above(threshold)
+            self.latency_hist.observe(finished - enqueued)
+            future.set_result(detections)
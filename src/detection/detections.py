@@ -0,0 +1,98 @@
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+# Urgency codes index URGENCY_LEVELS; confidence > 0.4 is moderate, > 0.7 high
+URGENCY_LEVELS = ('low', 'moderate', 'high')
+URGENCY_THRESHOLDS = np.array([0.4, 0.7])
+
+FINDING = 'abnormality'
+
+def urgency_codes(confidences: np.ndarray) -> np.ndarray:
+    """Urgency code per confidence (0 low, 1 moderate, 2 high), thresholds exclusive as in determine_urgency"""
+    return np.digitize(confidences, URGENCY_THRESHOLDS, right=True).astype(np.int8)
+
+class Detections:
+    """Detections of one image as columns: (N, 4) xyxy boxes, confidences, class ids and urgency codes
+
+    Detectors, batching, tiling and rescaling work on the arrays directly;
+    `to_dicts` produces the JSON detection dicts only where a result is
+    assembled for the API and the report.
+    """
+
+    __slots__ = ('boxes', 'confidences', 'classes', 'urgency')
+
+    def __init__(self, boxes: Optional[np.ndarray] = None, confidences: Optional[np.ndarray] = None,
+                 classes: Optional[np.ndarray] = None, urgency: Optional[np.ndarray] = None):
+        self.boxes = np.empty((0, 4), dtype=np.float32) if boxes is None else np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        self.confidences = (np.empty(0, dtype=np.float32) if confidences is None
+                            else np.asarray(confidences, dtype=np.float32).reshape(-1))
+        self.classes = np.zeros(len(self.confidences), dtype=np.int32) if classes is None else np.asarray(classes, dtype=np.int32)
+        self.urgency = urgency_codes(self.confidences) if urgency is None else urgency
+
+    @classmethod
+    def from_result(cls, result) -> 'Detections':
+        """One ultralytics result, moved off the device in a single (N, 6) transfer"""
+        data = result.boxes.data.cpu().numpy()
+        return cls(data[:, :4], data[:, 4], data[:, 5])
+
+    @classmethod
+    def from_dicts(cls, detections: Sequence[Dict]) -> 'Detections':
+        """Columns from stored detection dicts (e.g. a saved result being re-rendered)"""
+        if not detections:
+            return cls()
+        return cls(
+            [[d['bbox']['x1'], d['bbox']['y1'], d['bbox']['x2'], d['bbox']['y2']] for d in detections],
+            [d['confidence'] for d in detections]
+        )
+
+    @classmethod
+    def concatenate(cls, parts: Iterable['Detections']) -> 'Detections':
+        parts = list(parts)
+        if len(parts) == 1:
+            return parts[0]
+        if not parts:
+            return cls()
+        return cls(
+            np.concatenate([part.boxes for part in parts]),
+            np.concatenate([part.confidences for part in parts]),
+            np.concatenate([part.classes for part in parts]),
+            np.concatenate([part.urgency for part in parts])
+        )
+
+    def __len__(self) -> int:
+        return len(self.confidences)
+
+    def __getitem__(self, index) -> 'Detections':
+        """Subset by boolean mask or index array"""
+        return Detections(self.boxes[index], self.confidences[index], self.classes[index], self.urgency[index])
+
+    def above(self, conf_threshold: float) -> 'Detections':
+        return self[self.confidences >= conf_threshold]
+
+    def shifted(self, dx: float, dy: float) -> 'Detections':
+        """Boxes moved by (dx, dy), e.g. from tile to image coordinates"""
+        return Detections(self.boxes + np.array([dx, dy, dx, dy], dtype=np.float32),
+                          self.confidences, self.classes, self.urgency)
+
+    def scaled(self, sx: float, sy: float) -> 'Detections':
+        """Boxes scaled by (sx, sy), e.g. from a reduced decode to native pixels"""
+        return Detections(self.boxes * np.array([sx, sy, sx, sy], dtype=np.float32),
+                          self.confidences, self.classes, self.urgency)
+
+    def max_urgency(self) -> str:
+        """Highest urgency level, or 'none' without detections"""
+        return URGENCY_LEVELS[self.urgency.max()] if len(self) else 'none'
+
+    def to_dicts(self) -> List[Dict]:
+        """JSON detection dicts ({'finding', 'confidence', 'bbox', 'urgency'})"""
+        return [
+            {
+                'finding': FINDING,
+                'confidence': confidence,
+                'bbox': {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2},
+                'urgency': URGENCY_LEVELS[code]
+            }
+            for (x1, y1, x2, y2), confidence, code in zip(self.boxes.tolist(), self.confidences.tolist(),
+                                                         self.urgency.tolist())
+        ]
@@ -0,0 +1,156 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from src.detection.backends import ExportedDetector, export_model, set_torch_threads
+from src.detection.simple_detector import SimpleDetector
+
+class ModelRegistry:
+    """Loads each detector weight file once per process and hands out the shared instance
+
+    The active weights are recorded in `active_model_file`, so every worker
+    process picks up a hot-swap (or a weight file replaced in place) on its
+    next lookup without a restart. Loading new active weights evicts the
+    previous detector, so a swap does not keep two models in memory.
+    `backend` selects PyTorch or an exported CPU runtime; `threads` caps
+    intra-op threads so several workers can share a host.
+    """
+
+    def __init__(self, default_weights: str = 'yolov8n.pt', models_dir: str = 'models',
+                 warmup: bool = True, backend: str = 'torch', threads: int = 0,
+                 check_interval: float = 1.0):
+        self.default_weights = default_weights
+        self.models_dir = models_dir
+        self.active_model_file = f"{models_dir}/active_model.json"
+        self.warmup = warmup
+        self.backend = backend or 'torch'
+        self.threads = threads
+        self.check_interval = check_interval
+
+        self._detectors: Dict[str, SimpleDetector] = {}
+        self._lock = threading.Lock()
+        self._active_weights = None
+        self._active_mtime = None
+        self._last_check = 0.0
+        self._version_checks: Dict[str, float] = {}
+
+    def get(self, weights: Optional[str] = None) -> SimpleDetector:
+        """Shared detector for `weights` (default: the active weights), loading it on first use"""
+        active = weights is None
+        weights = weights or self.active_weights()
+
+        detector = self._detectors.get(weights)
+        if detector is not None and not self._replaced(weights, detector):
+            return detector
+
+        with self._lock:
+            detector = self._detectors.get(weights)
+            if detector is None or detector.model_version != SimpleDetector.describe_weights(weights):
+                detector = self.load(weights)
+                self._detectors[weights] = detector
+                if active:
+                    self._evict(keep=weights)
+            return detector
+
+    def _replaced(self, weights: str, detector: SimpleDetector) -> bool:
+        """Whether the weight file changed since `detector` loaded (stat at most every check_interval)"""
+        now = time.monotonic()
+        if now - self._version_checks.get(weights, 0.0) < self.check_interval:
+            return False
+        self._version_checks[weights] = now
+        return detector.model_version != SimpleDetector.describe_weights(weights)
+
+    def load(self, weights: str) -> SimpleDetector:
+        """Load (exporting on first use) and warm up one detector"""
+        if self.backend == 'torch':
+            set_torch_threads(self.threads)
+            detector = SimpleDetector(weights)
+        else:
+            detector = ExportedDetector(self.export(weights, self.backend), self.backend, self.threads)
+        if self.warmup:
+            self.warm_up(detector)
+        # Cache keys and hot-swap checks follow the original weight file
+        detector.model_version = SimpleDetector.describe_weights(weights)
+        return detector
+
+    def warm_up(self, detector: SimpleDetector, image_size: int = 640):
+        """Fuse conv+bn layers and run one dummy inference so the first study isn't slow"""
+        start = time.perf_counter()
+        try:
+            detector.model.fuse()
+        except Exception:
+            # Exported backends are already fused
+            pass
+        detector.detect(np.zeros((image_size, image_size, 3), dtype=np.uint8))
+        print(f"✅ Model warmed up in {time.perf_counter() - start:.2f}s")
+
+    def export(self, weights: str, backend: str) -> str:
+        """Export weights once (onnx/onnx-int8/openvino) and cache the result under models/"""
+        return export_model(weights, backend, self.models_dir)
+
+    def active_weights(self) -> str:
+        """Weights currently selected for this host (re-read at most every check_interval)"""
+        now = time.monotonic()
+        if self._active_weights is None or now - self._last_check >= self.check_interval:
+            self._last_check = now
+            try:
+                mtime = os.stat(self.active_model_file).st_mtime_ns
+            except OSError:
+                mtime = None
+            # The file is only parsed again when a swap rewrote it
+            if self._active_weights is None or mtime != self._active_mtime:
+                self._active_mtime = mtime
+                try:
+                    with open(self.active_model_file) as f:
+                        self._active_weights = json.load(f)['weights']
+                except (OSError, ValueError, KeyError):
+                    self._active_weights = self.default_weights
+        return self._active_weights
+
+    def activate(self, weights: str):
+        """Switch every worker on this host to new weights
+
+        The default weights may be a name ultralytics downloads and caches
+        itself (e.g. yolov8n.pt), so only other weights must exist locally.
+        """
+        if weights != self.default_weights and not os.path.exists(weights):
+            raise FileNotFoundError(f"Weights not found: {weights}")
+
+        os.makedirs(self.models_dir, exist_ok=True)
+        tmp_path = self.active_model_file + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'weights': weights, 'activated_at': time.time()}, f)
+        os.replace(tmp_path, self.active_model_file)
+        self._active_weights = weights
+
+    def evict(self, keep: Optional[str] = None):
+        """Drop loaded detectors other than `keep` to free memory after a swap"""
+        with self._lock:
+            self._evict(keep)
+
+    def _evict(self, keep: Optional[str]):
+        # Jobs still holding an evicted detector keep it alive until they finish
+        for weights in list(self._detectors):
+            if weights != keep:
+                del self._detectors[weights]
+                self._version_checks.pop(weights, None)
+
+_registry: Optional[ModelRegistry] = None
+
+def get_registry() -> ModelRegistry:
+    """Process-wide registry configured from the environment"""
+    global _registry
+    if _registry is None:
+        from src.utils import config
+        _registry = ModelRegistry(
+            default_weights=config.MODEL_WEIGHTS,
+            models_dir=config.MODELS_DIR,
+            warmup=config.MODEL_WARMUP,
+            backend=config.MODEL_BACKEND,
+            threads=config.INFERENCE_THREADS
+        )
+    return _registry
@@ -1,86 +1,123 @@
 from ultralytics import YOLO
 import cv2
+import os
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Optional, Union
+
+from src.detection.detections import FINDING, URGENCY_LEVELS, Detections, urgency_codes
+
+# BGR box colour per urgency code
+URGENCY_COLORS = ((0, 255, 0), (0, 165, 255), (0, 0, 255))
+
+def as_three_channel(image: np.ndarray) -> np.ndarray:
+    """Present a grayscale frame as 3 channels without copying (broadcast view)"""
+    if image.ndim == 2:
+        return np.broadcast_to(image[..., None], image.shape + (3,))
+    return image
+
+def draw_detections(image: Union[str, np.ndarray], detections: Union[Detections, List[Dict]], output_path: str):
+    """Draw detection boxes over an image file or in-memory array and write it to output_path"""
+    if not isinstance(detections, Detections):
+        detections = Detections.from_dicts(detections)
+    
+    if isinstance(image, str):
+        img = cv2.imread(image)
+    elif image.ndim == 2:
+        img = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    else:
+        # Drawing needs a private, writable copy
+        img = np.array(image, copy=True)
+    
+    for (x1, y1, x2, y2), confidence, code in zip(detections.boxes.astype(int).tolist(),
+                                                  detections.confidences.tolist(), detections.urgency.tolist()):
+        color = URGENCY_COLORS[code]
+        
+        cv2.rectangle(
+            img,
+            (x1, y1),
+            (x2, y2),
+            color,
+            2
+        )
+        
+        label = f"{FINDING} {confidence:.2f}"
+        cv2.putText(
+            img,
+            label,
+            (x1, y1 - 10),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5,
+            color,
+            2
+        )
+    
+    cv2.imwrite(output_path, img)
 
 class SimpleDetector:
     """Simple detector for testing - uses pretrained YOLO"""
     
-    def __init__(self):
+    def __init__(self, weights: str = 'yolov8n.pt'):
         print("Loading YOLOv8 model...")
-        self.model = YOLO('yolov8n.pt')  # Nano model for testing
+        self.weights = weights
+        self.model = YOLO(weights)  # Nano model for testing
+        self.model_version = self.describe_weights(weights)
         print("✅ Model loaded!")
     
-    def detect(self, image_path: str, conf_threshold: float = 0.3) -> List[Dict]:
-        """Detect objects in image"""
+    @staticmethod
+    def describe_weights(weights: str) -> str:
+        """Identify a weight file by name, size and mtime (changes when it is replaced)"""
+        if os.path.exists(weights):
+            stat = os.stat(weights)
+            return f"{os.path.basename(weights)}:{stat.st_size}:{int(stat.st_mtime)}"
+        return weights
+    
+    def detect(self, image: Union[str, np.ndarray], conf_threshold: float = 0.3,
+               image_size: Optional[int] = None) -> Detections:
+        """Detect objects in an image file or in-memory array (at the model's input size unless image_size is given)"""
+        if isinstance(image, np.ndarray):
+            image = as_three_channel(image)
+        
         results = self.model.predict(
-            image_path,
+            image,
             conf=conf_threshold,
-            verbose=False
+            verbose=False,
+            **self.predict_size(image_size)
         )
         
-        detections = []
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                detection = {
-                    'finding': 'abnormality',
-                    'confidence': float(box.conf[0]),
-                    'bbox': {
-                        'x1': float(box.xyxy[0][0]),
-                        'y1': float(box.xyxy[0][1]),
-                        'x2': float(box.xyxy[0][2]),
-                        'y2': float(box.xyxy[0][3])
-                    },
-                    'urgency': self.determine_urgency(float(box.conf[0]))
-                }
-                detections.append(detection)
+        return Detections.concatenate(self.parse_result(result) for result in results)
+    
+    def detect_batch(self, images: List[np.ndarray], conf_threshold: float = 0.3,
+                     image_size: Optional[int] = None) -> List[Detections]:
+        """Detect objects in several in-memory images with one predict call"""
+        if not images:
+            return []
         
-        return detections
+        results = self.model.predict(
+            [as_three_channel(image) for image in images],
+            conf=conf_threshold,
+            verbose=False,
+            **self.predict_size(image_size)
+        )
+        
+        return [self.parse_result(result) for result in results]
+    
+    @staticmethod
+    def predict_size(image_size: Optional[int]) -> Dict:
+        """predict() arguments for a non-default input size (e.g. a cheap low-resolution pass)"""
+        return {'imgsz': image_size} if image_size else {}
+    
+    def parse_result(self, result) -> Detections:
+        """Columns of one YOLO result, copied off the device in a single transfer"""
+        return Detections.from_result(result)
     
     def determine_urgency(self, confidence: float) -> str:
-        """Determine urgency level"""
-        if confidence > 0.7:
-            return "high"
-        elif confidence > 0.4:
-            return "moderate"
-        else:
-            return "low"
+        """Determine urgency level (Detections applies the same thresholds to whole arrays)"""
+        return URGENCY_LEVELS[int(urgency_codes(np.asarray([confidence]))[0])]
     
-    def visualize_detections(self, image_path: str, detections: List[Dict], output_path: str):
-        """Visualize detections on image"""
-        img = cv2.imread(image_path)
-        
-        for det in detections:
-            bbox = det['bbox']
-            confidence = det['confidence']
-            
-            color = {
-                'high': (0, 0, 255),
-                'moderate': (0, 165, 255),
-                'low': (0, 255, 0)
-            }[det['urgency']]
-            
-            cv2.rectangle(
-                img,
-                (int(bbox['x1']), int(bbox['y1'])),
-                (int(bbox['x2']), int(bbox['y2'])),
-                color,
-                2
-            )
-            
-            label = f"{det['finding']} {confidence:.2f}"
-            cv2.putText(
-                img,
-                label,
-                (int(bbox['x1']), int(bbox['y1']) - 10),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                color,
-                2
-            )
-        
-        cv2.imwrite(output_path, img)
+    def visualize_detections(self, image: Union[str, np.ndarray], detections: Union[Detections, List[Dict]],
+                             output_path: str):
+        """Visualize detections on an image file or in-memory array"""
+        draw_detections(image, detections, output_path)
         print(f"✅ Visualization saved to {output_path}")
 
 if __name__ == "__main__":
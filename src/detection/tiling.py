@@ -0,0 +1,122 @@
+from typing import Tuple
+
+import numpy as np
+
+from src.detection.detections import Detections
+
+class TileConfig:
+    """Settings for sliding-window inference on full-resolution images
+
+    Tiles of `tile_size` px (the detector's native input size, so tiles are
+    not rescaled) overlap by `overlap` of their width. Tiles with less than
+    `min_foreground` of informative pixels (neither background air nor
+    collimation/labels) are skipped. `max_tiles_per_batch` bounds how many
+    tiles go through one predict call.
+    """
+
+    def __init__(self, tile_size: int = 640, overlap: float = 0.2, max_tiles_per_batch: int = 16,
+                 min_foreground: float = 0.1, iou_threshold: float = 0.5, include_full_image: bool = True,
+                 background_low: int = 10, background_high: int = 245):
+        self.tile_size = max(32, tile_size)
+        self.overlap = min(max(overlap, 0.0), 0.9)
+        self.max_tiles_per_batch = max(1, max_tiles_per_batch)
+        self.min_foreground = min_foreground
+        self.iou_threshold = iou_threshold
+        self.include_full_image = include_full_image
+        self.background_low = background_low
+        self.background_high = background_high
+
+    def applies_to(self, shape: Tuple[int, ...]) -> bool:
+        """Tiling only pays off when the image is larger than one tile"""
+        return max(shape[0], shape[1]) > self.tile_size
+
+    def signature(self) -> str:
+        """Identifies the settings in result-cache keys (they change the detections)"""
+        return (f"tiles:{self.tile_size}:{self.overlap}:{self.min_foreground}:{self.iou_threshold}:"
+                f"{int(self.include_full_image)}:{self.background_low}:{self.background_high}")
+
+def tile_grid(height: int, width: int, tile_size: int, overlap: float) -> np.ndarray:
+    """(N, 4) array of x0, y0, x1, y1 tiles covering the image; edge tiles are shifted inwards"""
+    def starts(length: int) -> np.ndarray:
+        if length <= tile_size:
+            return np.array([0])
+        stride = max(1, int(tile_size * (1.0 - overlap)))
+        positions = np.arange(0, length - tile_size, stride)
+        return np.append(positions, length - tile_size)
+
+    ys, xs = np.meshgrid(starts(height), starts(width), indexing='ij')
+    x0 = xs.ravel()
+    y0 = ys.ravel()
+    return np.stack([x0, y0, np.minimum(x0 + tile_size, width), np.minimum(y0 + tile_size, height)], axis=1)
+
+def foreground_fractions(image: np.ndarray, tiles: np.ndarray, low: int, high: int, step: int = 16) -> np.ndarray:
+    """Share of informative pixels per tile, from a strided sample and a summed-area table"""
+    gray = image if image.ndim == 2 else image[..., 0]
+    sample = gray[::step, ::step]
+    mask = (sample > low) & (sample < high)
+
+    # Summed-area table with a zero row/column so any rectangle sum is four lookups
+    table = np.zeros((mask.shape[0] + 1, mask.shape[1] + 1), dtype=np.int64)
+    table[1:, 1:] = mask.cumsum(axis=0).cumsum(axis=1)
+
+    x0 = tiles[:, 0] // step
+    y0 = tiles[:, 1] // step
+    x1 = np.maximum(-(-tiles[:, 2] // step), x0 + 1).clip(max=mask.shape[1])
+    y1 = np.maximum(-(-tiles[:, 3] // step), y0 + 1).clip(max=mask.shape[0])
+
+    counts = table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+    return counts / ((x1 - x0) * (y1 - y0))
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """Greedy non-maximum suppression; returns indices of the kept boxes, best first"""
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    x1, y1, x2, y2 = boxes.T
+    areas = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+    order = scores.argsort()[::-1]
+
+    keep = []
+    while order.size:
+        best = order[0]
+        keep.append(best)
+        rest = order[1:]
+
+        width = np.maximum(np.minimum(x2[best], x2[rest]) - np.maximum(x1[best], x1[rest]), 0)
+        height = np.maximum(np.minimum(y2[best], y2[rest]) - np.maximum(y1[best], y1[rest]), 0)
+        intersection = width * height
+        iou = intersection / np.maximum(areas[best] + areas[rest] - intersection, 1e-9)
+        order = rest[iou <= iou_threshold]
+
+    return np.array(keep, dtype=np.int64)
+
+def detect_tiled(detector, image: np.ndarray, conf_threshold: float, config: TileConfig) -> Detections:
+    """Run overlapping tiles (plus optionally the whole image) through detector.detect_batch and merge
+
+    Works with SimpleDetector and BatchingDetector alike; tiles are numpy
+    views, so nothing is copied before the model's own preprocessing.
+    """
+    height, width = image.shape[:2]
+    tiles = tile_grid(height, width, config.tile_size, config.overlap)
+    fractions = foreground_fractions(image, tiles, config.background_low, config.background_high)
+    tiles = tiles[fractions >= config.min_foreground]
+
+    inputs = [image[y0:y1, x0:x1] for x0, y0, x1, y1 in tiles]
+    offsets = [(int(x0), int(y0)) for x0, y0, _, _ in tiles]
+    if config.include_full_image:
+        # Downscaled whole-image pass keeps findings larger than a tile
+        inputs.append(image)
+        offsets.append((0, 0))
+
+    parts = []
+    for start in range(0, len(inputs), config.max_tiles_per_batch):
+        chunk = inputs[start:start + config.max_tiles_per_batch]
+        for (dx, dy), tile_detections in zip(offsets[start:start + len(chunk)],
+                                             detector.detect_batch(chunk, conf_threshold)):
+            if len(tile_detections):
+                parts.append(tile_detections.shifted(dx, dy))
+
+    detections = Detections.concatenate(parts)
+    if not len(detections):
+        return detections
+    return detections[nms(detections.boxes, detections.confidences, config.iou_threshold)]
@@ -0,0 +1,297 @@
+import argparse
+import fnmatch
+import json
+import multiprocessing as mp
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pydicom
+
+# Ordering of analysed studies in worklists (NULL = not analysed yet)
+URGENCY_RANK = {'none': 0, 'low': 1, 'moderate': 2, 'high': 3}
+
+# Everything extract_metadata reads, so header scans never touch pixel data
+HEADER_TAGS = [
+    'StudyInstanceUID', 'PatientID', 'PatientName', 'PatientAge', 'PatientSex',
+    'StudyDate', 'Modality', 'Rows', 'Columns'
+]
+
+STUDY_FIELDS = (
+    'study_uid', 'patient_id', 'patient_name', 'patient_age', 'patient_sex', 'study_date',
+    'modality', 'rows', 'columns', 'instances', 'source_path', 'job_id', 'urgency',
+    'urgency_rank', 'findings', 'analyzed_at', 'updated_at'
+)
+
+# Header fields a rescan refreshes; analysis results are only written by record_result
+SCAN_FIELDS = (
+    'patient_id', 'patient_name', 'patient_age', 'patient_sex', 'study_date', 'modality',
+    'rows', 'columns', 'instances', 'source_path', 'updated_at'
+)
+
+def normalize_date(value: Optional[str]) -> Optional[str]:
+    """'2024-03-01' or '20240301' -> '20240301' (DICOM DA, which sorts as text)"""
+    if not value:
+        return None
+    return str(value).replace('-', '').strip() or None
+
+_header_handler = None
+
+def read_study_header(path: str) -> Optional[Dict]:
+    """extract_metadata fields plus the study UID, from a stop-before-pixels read; None if unreadable"""
+    global _header_handler
+    if _header_handler is None:
+        from src.dicom.dicom_handler import DICOMHandler
+        _header_handler = DICOMHandler()
+
+    try:
+        dcm = pydicom.dcmread(path, stop_before_pixels=True, specific_tags=HEADER_TAGS)
+    except Exception:
+        return None
+    if 'Modality' not in dcm and 'StudyInstanceUID' not in dcm:
+        return None
+
+    metadata = _header_handler.extract_metadata(dcm)
+    metadata['study_uid'] = str(dcm.get('StudyInstanceUID', '') or '') or os.path.abspath(path)
+    metadata['path'] = path
+    return metadata
+
+class StudyCatalog:
+    """SQLite catalog of studies for worklist queries without touching the filesystem
+
+    Rows come from two places: the header-only bulk scan (`scan`) and job
+    completion (`record_result`), which adds the detection urgency. Both
+    upsert by StudyInstanceUID, and a rescan never clears analysis results.
+    """
+
+    def __init__(self, db_path: str = 'data/catalog.db'):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS studies (
+                study_uid    TEXT PRIMARY KEY,
+                patient_id   TEXT,
+                patient_name TEXT,
+                patient_age  INTEGER,
+                patient_sex  TEXT,
+                study_date   TEXT,
+                modality     TEXT,
+                rows         INTEGER,
+                columns      INTEGER,
+                instances    INTEGER,
+                source_path  TEXT,
+                job_id       TEXT,
+                urgency      TEXT,
+                urgency_rank INTEGER,
+                findings     INTEGER,
+                analyzed_at  TEXT,
+                updated_at   TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_studies_modality_date ON studies (modality, study_date);
+            CREATE INDEX IF NOT EXISTS idx_studies_date ON studies (study_date);
+            CREATE INDEX IF NOT EXISTS idx_studies_patient_date ON studies (patient_id, study_date);
+            CREATE INDEX IF NOT EXISTS idx_studies_urgency_date ON studies (urgency_rank, study_date);
+        """)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; WAL lets readers proceed while a writer commits
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _upsert(self, rows: List[Dict], update_fields: Iterable[str]):
+        placeholders = ', '.join('?' for _ in STUDY_FIELDS)
+        assignments = ', '.join(f"{field} = excluded.{field}" for field in update_fields)
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                f"INSERT INTO studies ({', '.join(STUDY_FIELDS)}) VALUES ({placeholders}) "
+                f"ON CONFLICT(study_uid) DO UPDATE SET {assignments}",
+                [[row.get(field) for field in STUDY_FIELDS] for row in rows]
+            )
+
+    def add_headers(self, headers: List[Dict]):
+        """Upsert one row per study from read_study_header results (instances are counted)"""
+        now = datetime.now().isoformat()
+        studies: Dict[str, Dict] = {}
+        for header in headers:
+            study = studies.get(header['study_uid'])
+            if study is None:
+                study = studies[header['study_uid']] = {
+                    'study_uid': header['study_uid'],
+                    'patient_id': header['patient_id'],
+                    'patient_name': header['patient_name'],
+                    'patient_age': header['patient_age'],
+                    'patient_sex': header['patient_sex'],
+                    'study_date': normalize_date(header['study_date']),
+                    'modality': header['modality'],
+                    'rows': header['rows'],
+                    'columns': header['columns'],
+                    'instances': 0,
+                    'source_path': os.path.dirname(os.path.abspath(header['path'])),
+                    'updated_at': now
+                }
+            study['instances'] += 1
+        if studies:
+            self._upsert(list(studies.values()), SCAN_FIELDS)
+
+    def record_result(self, result: Dict, job_id: Optional[str] = None, source_path: Optional[str] = None):
+        """Upsert a study from a pipeline result, including its detection urgency"""
+        metadata = result.get('dicom_metadata')
+        if not metadata:
+            # Plain image uploads carry no study metadata
+            return
+
+        detections = result.get('detections') or []
+        urgency = 'none'
+        for det in detections:
+            if URGENCY_RANK.get(det.get('urgency'), 0) > URGENCY_RANK[urgency]:
+                urgency = det['urgency']
+
+        now = datetime.now().isoformat()
+        study_uid = result.get('study_instance_uid') or metadata.get('study_instance_uid') or job_id
+        instances = sum(series.get('num_instances', 0) for series in result.get('series', [])) or 1
+        row = {
+            'study_uid': study_uid,
+            'patient_id': metadata.get('patient_id'),
+            'patient_name': metadata.get('patient_name'),
+            'patient_age': metadata.get('patient_age'),
+            'patient_sex': metadata.get('patient_sex'),
+            'study_date': normalize_date(metadata.get('study_date')),
+            'modality': metadata.get('modality'),
+            'rows': metadata.get('rows'),
+            'columns': metadata.get('columns'),
+            'instances': instances,
+            'source_path': source_path,
+            'job_id': job_id,
+            'urgency': urgency,
+            'urgency_rank': URGENCY_RANK[urgency],
+            'findings': len(detections),
+            'analyzed_at': now,
+            'updated_at': now
+        }
+        self._upsert([row], [field for field in STUDY_FIELDS if field != 'study_uid'])
+
+    def query(self, modality: Optional[str] = None, date_from: Optional[str] = None, date_to: Optional[str] = None,
+              patient_id: Optional[str] = None, urgency: Optional[List[str]] = None, analyzed: Optional[bool] = None,
+              limit: int = 50, offset: int = 0) -> Tuple[int, List[Dict]]:
+        """Studies matching every given filter, most urgent then newest first"""
+        clauses, params = [], []
+        if modality:
+            clauses.append("modality = ?")
+            params.append(modality.upper())
+        if date_from:
+            clauses.append("study_date >= ?")
+            params.append(normalize_date(date_from))
+        if date_to:
+            clauses.append("study_date <= ?")
+            params.append(normalize_date(date_to))
+        if patient_id:
+            clauses.append("patient_id = ?")
+            params.append(patient_id)
+        if urgency:
+            # By rank so the (urgency_rank, study_date) index serves the filter
+            clauses.append(f"urgency_rank IN ({', '.join('?' for _ in urgency)})")
+            params.extend(URGENCY_RANK[level] for level in urgency)
+        if analyzed is not None:
+            clauses.append("analyzed_at IS NOT NULL" if analyzed else "analyzed_at IS NULL")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        conn = self._conn()
+        total = conn.execute(f"SELECT COUNT(*) FROM studies {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT * FROM studies {where} "
+            f"ORDER BY urgency_rank IS NULL, urgency_rank DESC, study_date DESC, study_uid "
+            f"LIMIT ? OFFSET ?",
+            params + [limit, offset]
+        ).fetchall()
+        return total, [dict(row) for row in rows]
+
+    def get(self, study_uid: str) -> Optional[Dict]:
+        row = self._conn().execute("SELECT * FROM studies WHERE study_uid = ?", (study_uid,)).fetchone()
+        return dict(row) if row else None
+
+def find_dicom_files(root: str, pattern: str = '*.dcm') -> List[str]:
+    paths = []
+    for directory, _, files in os.walk(root):
+        paths.extend(os.path.join(directory, name) for name in files if fnmatch.fnmatch(name.lower(), pattern.lower()))
+    return sorted(paths)
+
+def scan(root: str, catalog: StudyCatalog, workers: int = None, pattern: str = '*.dcm',
+         chunk_size: int = 256) -> Dict:
+    """Header-only scan of a directory tree into the catalog, parsing headers on a process pool"""
+    workers = workers or os.cpu_count() or 1
+    paths = find_dicom_files(root, pattern)
+    start = time.perf_counter()
+    headers, unreadable = [], 0
+
+    if workers > 1 and len(paths) > chunk_size:
+        with ProcessPoolExecutor(workers, mp_context=mp.get_context('spawn')) as executor:
+            results = list(executor.map(read_study_header, paths, chunksize=chunk_size))
+    else:
+        results = [read_study_header(path) for path in paths]
+
+    for header in results:
+        if header is None:
+            unreadable += 1
+        else:
+            headers.append(header)
+    catalog.add_headers(headers)
+
+    return {
+        'files': len(paths),
+        'unreadable': unreadable,
+        'studies': len({header['study_uid'] for header in headers}),
+        'seconds': time.perf_counter() - start
+    }
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Build and query the study metadata catalog")
+    parser.add_argument('--db', default=None, help="Catalog database (default: RADIOLOGY_CATALOG_DB)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    scan_parser = commands.add_parser('scan', help="Index a DICOM directory from headers only")
+    scan_parser.add_argument('root')
+    scan_parser.add_argument('-w', '--workers', type=int, default=None, help="Header-reading processes (default: all cores)")
+    scan_parser.add_argument('--pattern', default='*.dcm')
+
+    query_parser = commands.add_parser('query', help="List matching studies")
+    query_parser.add_argument('--modality')
+    query_parser.add_argument('--date-from')
+    query_parser.add_argument('--date-to')
+    query_parser.add_argument('--patient-id')
+    query_parser.add_argument('--urgency', action='append', choices=sorted(URGENCY_RANK))
+    query_parser.add_argument('--limit', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    from src.utils import config
+    catalog = StudyCatalog(args.db or config.CATALOG_DB_PATH)
+
+    if args.command == 'scan':
+        summary = scan(args.root, catalog, args.workers, args.pattern)
+        print(f"✅ Indexed {summary['studies']} study(ies) from {summary['files']} file(s) "
+              f"({summary['unreadable']} unreadable) in {summary['seconds']:.1f}s")
+        return 0
+
+    total, studies = catalog.query(args.modality, args.date_from, args.date_to, args.patient_id,
+                                   args.urgency, limit=args.limit)
+    print(f"📋 {total} matching study(ies)")
+    for study in studies:
+        print(json.dumps(study, default=str))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,25 +1,44 @@
+import os
 import pydicom
 from pydicom.dataset import Dataset, FileDataset
+from pydicom.multival import MultiValue
 from datetime import datetime
 import numpy as np
 from PIL import Image
 import json
-from typing import Dict, Optional
+from typing import Dict, Iterator, Optional, Tuple
+
+from src.dicom.decoders import FrameDecoder
+
+# Elements larger than this (PixelData) are left on disk until first accessed
+DEFER_SIZE = '64 KB'
 
 class DICOMHandler:
     """Handle DICOM files - read, parse, convert"""
     
-    def __init__(self):
+    def __init__(self, decoder: Optional[FrameDecoder] = None):
         self.supported_modalities = ['CR', 'DX', 'CT', 'MR']
+        # Routes each transfer syntax to the fastest installed decoder
+        self.decoder = decoder or FrameDecoder()
+    
+    def read_header(self, dicom_path: str) -> FileDataset:
+        """Parse DICOM headers once, deferring the pixel data until it is used"""
+        try:
+            return pydicom.dcmread(dicom_path, defer_size=DEFER_SIZE)
+        except Exception as e:
+            raise Exception(f"Error reading DICOM: {str(e)}")
     
     def read_dicom(self, dicom_path: str) -> Dict:
         """Read DICOM file and extract metadata + image"""
+        dcm = self.read_header(dicom_path)
+        return self.load_dicom(dcm)
+    
+    def load_dicom(self, dcm: FileDataset, max_size: int = 0) -> Dict:
+        """Extract metadata and decode pixels from an already parsed dataset"""
         try:
-            dcm = pydicom.dcmread(dicom_path)
-            
             dicom_data = {
                 'metadata': self.extract_metadata(dcm),
-                'image': self.extract_image(dcm),
+                'image': self.extract_image(dcm, max_size),
                 'raw_dicom': dcm
             }
             
@@ -38,11 +57,29 @@ class DICOMHandler:
             'study_date': str(dcm.get('StudyDate', '')),
             'modality': str(dcm.get('Modality', '')),
             'rows': int(dcm.get('Rows', 0)),
-            'columns': int(dcm.get('Columns', 0))
+            'columns': int(dcm.get('Columns', 0)),
+            'study_instance_uid': str(dcm.get('StudyInstanceUID', ''))
         }
         
         return metadata
     
+    def pixel_signature(self, dcm: FileDataset) -> Tuple:
+        """Header values that change how the stored pixels become the detector input"""
+        fields = (
+            'Rows', 'Columns', 'BitsAllocated', 'PixelRepresentation', 'SamplesPerPixel',
+            'PhotometricInterpretation', 'RescaleSlope', 'RescaleIntercept',
+            'WindowCenter', 'WindowWidth', 'VOILUTFunction'
+        )
+        transfer_syntax = getattr(getattr(dcm, 'file_meta', None), 'TransferSyntaxUID', '')
+        return (str(transfer_syntax),) + tuple(str(dcm.get(field, '')) for field in fields)
+    
+    def is_mirrored(self, dcm: FileDataset) -> bool:
+        """True when rows run towards the patient's right, i.e. the patient's right is on the image right"""
+        orientation = dcm.get('PatientOrientation')
+        if not orientation or isinstance(orientation, str):
+            return str(orientation or '').upper().startswith('R')
+        return str(orientation[0]).upper().startswith('R')
+    
     def calculate_age(self, dcm: FileDataset) -> Optional[int]:
         """Calculate patient age"""
         try:
@@ -53,26 +90,167 @@ class DICOMHandler:
         except:
             return None
     
-    def extract_image(self, dcm: FileDataset) -> np.ndarray:
-        """Extract and normalize image from DICOM"""
-        img = dcm.pixel_array
-        img = self.normalize_image(img)
+    def extract_image(self, dcm: FileDataset, max_size: int = 0) -> np.ndarray:
+        """Extract and normalize image from DICOM (reduced towards max_size where the codec allows)"""
+        return self.normalize_frame(dcm, self.decoder.decode(dcm, max_size=max_size))
+    
+    def get_frame_count(self, dcm: FileDataset) -> int:
+        """Number of frames in the dataset (1 for classic single-frame images)"""
+        try:
+            return max(1, int(dcm.get('NumberOfFrames', 1) or 1))
+        except (TypeError, ValueError):
+            return 1
+    
+    def decode_frame(self, dicom_path: str, dcm: FileDataset, index: int = 0, max_size: int = 0) -> np.ndarray:
+        """Decode and normalize one frame, reading only that frame where possible"""
+        frames = self.get_frame_count(dcm)
+        img = self.decoder.decode(dcm, index if frames > 1 else None, max_size, dicom_path)
+        return self.normalize_frame(dcm, img)
+    
+    def iter_frames(self, dicom_path: str, dcm: FileDataset) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield (frame_index, normalized frame) one frame at a time"""
+        for index in range(self.get_frame_count(dcm)):
+            yield index, self.decode_frame(dicom_path, dcm, index)
+    
+    def store_key(self, dicom_path: str, dcm: FileDataset, store, max_size: int = 0) -> str:
+        """Key of this file's normalized frames in a FrameStore"""
+        return store.make_key(dicom_path, dcm, self.pixel_signature(dcm), max_size)
+    
+    def store_index(self, dicom_path: str, dcm: FileDataset, max_size: int = 0) -> Dict:
+        """Index fields recorded with a file's stored frames"""
+        return {
+            'metadata': self.extract_metadata(dcm),
+            'source_path': os.path.abspath(dicom_path),
+            'sop_instance_uid': str(dcm.get('SOPInstanceUID', '')),
+            'native_shape': (int(dcm.get('Rows', 0) or 0), int(dcm.get('Columns', 0) or 0)),
+            'max_size': max_size
+        }
+    
+    def load_frames(self, dicom_path: str, dcm: FileDataset, store, max_size: int = 0) -> Optional[np.ndarray]:
+        """Zero-copy (frames, rows, cols) view of previously stored normalized frames, or None"""
+        return store.get(self.store_key(dicom_path, dcm, store, max_size))
+    
+    def store_frames(self, dicom_path: str, dcm: FileDataset, store, max_size: int = 0,
+                     frames: Optional[list] = None) -> np.ndarray:
+        """Write the normalized frames of a file (decoding them one by one unless given) to a FrameStore
+        
+        Returns the stored frames as a read-only memory map.
+        """
+        key = self.store_key(dicom_path, dcm, store, max_size)
+        count = len(frames) if frames is not None else self.get_frame_count(dcm)
+        
+        writer = None
+        try:
+            for index in range(count):
+                frame = frames[index] if frames is not None else self.decode_frame(dicom_path, dcm, index, max_size)
+                if writer is None:
+                    writer = store.writer(key, count, frame.shape)
+                writer.write(index, frame)
+            path = writer.commit(**self.store_index(dicom_path, dcm, max_size))
+        except BaseException:
+            if writer is not None:
+                writer.abort()
+            raise
+        return np.load(path, mmap_mode='r')
+    
+    def normalize_frame(self, dcm: FileDataset, img: np.ndarray) -> np.ndarray:
+        """Normalize decoded pixels using the dataset's rescale, VOI and photometric tags"""
+        return self.normalize_image(
+            img,
+            slope=float(dcm.get('RescaleSlope', 1) or 1),
+            intercept=float(dcm.get('RescaleIntercept', 0) or 0),
+            window=self.get_voi_window(dcm),
+            invert=dcm.get('PhotometricInterpretation') == "MONOCHROME1"
+        )
+    
+    def get_voi_window(self, dcm: FileDataset) -> Optional[Tuple[float, float, str]]:
+        """First WindowCenter/WindowWidth pair and the VOI LUT function, if present"""
+        if 'WindowCenter' not in dcm or 'WindowWidth' not in dcm:
+            return None
+        
+        try:
+            center = dcm.WindowCenter
+            width = dcm.WindowWidth
+            center = float(center[0] if isinstance(center, MultiValue) else center)
+            width = float(width[0] if isinstance(width, MultiValue) else width)
+        except (TypeError, ValueError, IndexError):
+            return None
+        
+        if width < 1:
+            return None
+        
+        function = str(dcm.get('VOILUTFunction', 'LINEAR') or 'LINEAR').upper()
+        return center, width, function
+    
+    def normalize_image(self, image: np.ndarray, slope: float = 1.0, intercept: float = 0.0,
+                        window: Optional[Tuple[float, float, str]] = None, invert: bool = False) -> np.ndarray:
+        """Rescale, window, invert and quantize to uint8 in a single stage
         
-        if hasattr(dcm, 'PhotometricInterpretation'):
-            if dcm.PhotometricInterpretation == "MONOCHROME1":
-                img = np.max(img) - img
+        8/16-bit integer frames go through a lookup table built over the stored
+        value range, so the full frame is only read for one min/max pass and
+        one table lookup - no float copy of the image is made.
+        """
+        if image.dtype.kind in 'iu' and image.dtype.itemsize <= 2:
+            lo, hi = int(image.min()), int(image.max())
+            codes = np.arange(lo, hi + 1)
+            
+            lut = self._intensity_transform(codes * slope + intercept, window)
+            if invert:
+                lut = 255 - lut
+            
+            # Index by the raw bit pattern so signed frames need no offset copy
+            unsigned = np.dtype(f'u{image.dtype.itemsize}')
+            indices = codes.astype(image.dtype).view(unsigned)
+            table = np.zeros(int(indices.max()) + 1, dtype=np.uint8)
+            table[indices] = lut
+            
+            return table[image.view(unsigned)]
         
-        return img
+        # Float or wide integer data: one float32 working copy, updated in place
+        values = image.astype(np.float32)
+        if slope != 1.0:
+            values *= slope
+        if intercept != 0.0:
+            values += intercept
+        
+        out = self._intensity_transform(values, window)
+        if invert:
+            np.subtract(255, out, out=out)
+        
+        return out
     
-    def normalize_image(self, image):
-        """Normalize image to 0-255 range"""
-        img_min = np.min(image)
-        img_max = np.max(image)
+    def _intensity_transform(self, values: np.ndarray, window: Optional[Tuple[float, float, str]]) -> np.ndarray:
+        """Map modality values to uint8 with the VOI window, or a min/max stretch"""
+        values = np.asarray(values, dtype=np.float32)
         
-        if img_max > img_min:
-            image = ((image - img_min) / (img_max - img_min) * 255).astype(np.uint8)
+        if window is None:
+            v_min, v_max = float(values.min()), float(values.max())
+            if v_max <= v_min:
+                return np.zeros(values.shape, dtype=np.uint8)
+            values -= v_min
+            values *= 255.0 / (v_max - v_min)
+        else:
+            center, width, function = window
+            if function == 'SIGMOID':
+                values -= center
+                values *= -4.0 / width
+                np.exp(values, out=values)
+                values += 1.0
+                np.divide(255.0, values, out=values)
+            elif function == 'LINEAR_EXACT':
+                values -= center
+                values *= 1.0 / width
+                values += 0.5
+                values *= 255.0
+            else:
+                # DICOM PS3.3 C.11.2.1.2 linear VOI function
+                values -= center - 0.5
+                values *= 1.0 / max(width - 1.0, 1e-6)
+                values += 0.5
+                values *= 255.0
         
-        return image
+        np.clip(values, 0, 255, out=values)
+        return values.astype(np.uint8)
     
     def save_as_png(self, image: np.ndarray, output_path: str):
         """Save DICOM image as PNG"""
@@ -83,29 +261,35 @@ class DICOMHandler:
     
     def validate_dicom(self, dicom_path: str) -> Dict:
         """Validate DICOM file"""
+        try:
+            dcm = self.read_header(dicom_path)
+        except Exception as e:
+            return {
+                'is_valid': False,
+                'errors': [f"Failed to read DICOM: {str(e)}"],
+                'warnings': []
+            }
+        
+        return self.validate_dataset(dcm)
+    
+    def validate_dataset(self, dcm: FileDataset) -> Dict:
+        """Validate an already parsed dataset (headers only, pixels untouched)"""
         validation = {
             'is_valid': True,
             'errors': [],
             'warnings': []
         }
         
-        try:
-            dcm = pydicom.dcmread(dicom_path)
-            
-            required_tags = ['PatientID', 'Modality']
-            
-            for tag in required_tags:
-                if tag not in dcm:
-                    validation['errors'].append(f"Missing required tag: {tag}")
-                    validation['is_valid'] = False
-            
-            if 'PixelData' not in dcm:
-                validation['errors'].append("No pixel data found")
+        required_tags = ['PatientID', 'Modality']
+        
+        for tag in required_tags:
+            if tag not in dcm:
+                validation['errors'].append(f"Missing required tag: {tag}")
                 validation['is_valid'] = False
-            
-        except Exception as e:
+        
+        if 'PixelData' not in dcm:
+            validation['errors'].append("No pixel data found")
             validation['is_valid'] = False
-            validation['errors'].append(f"Failed to read DICOM: {str(e)}")
         
         return validation
 
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Bump when normalization or decoding changes what a stored frame contains
+STORE_VERSION = 1
+
+class FrameStore:
+    """On-disk store of normalized uint8 frames for re-analysis without decoding
+
+    Each DICOM file becomes one `.npy` array of shape (frames, rows, cols)
+    that is memory-mapped on read, so the pipeline gets zero-copy views and
+    the page cache is shared by every worker process on the host. An SQLite
+    index records the `extract_metadata` fields and the stored geometry of
+    every entry. Entries are keyed by the instance and everything that
+    changes the decoded pixels, not by file path, so a moved archive still hits.
+    """
+
+    def __init__(self, directory: str = 'data/frame_store'):
+        self.directory = directory
+        self.db_path = os.path.join(directory, 'index.db')
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS frames (
+                key TEXT PRIMARY KEY,
+                sop_instance_uid TEXT,
+                source_path TEXT,
+                frames INTEGER NOT NULL,
+                rows INTEGER NOT NULL,
+                columns INTEGER NOT NULL,
+                native_rows INTEGER,
+                native_columns INTEGER,
+                max_size INTEGER NOT NULL,
+                metadata TEXT,
+                created_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_frames_sop ON frames (sop_instance_uid);
+        """)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread, as in SQLiteJobStore
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(dicom_path: str, dcm, pixel_signature: Tuple, max_size: int = 0) -> str:
+        """Instance UID plus the header values and decode size that shape the stored frames"""
+        uid = str(dcm.get('SOPInstanceUID', '') or '')
+        if not uid:
+            # No instance UID: fall back to the file itself
+            stat = os.stat(dicom_path)
+            uid = f"{os.path.abspath(dicom_path)}:{stat.st_mtime_ns}"
+        digest = hashlib.sha256()
+        for part in (STORE_VERSION, uid, os.path.getsize(dicom_path), max_size, *pixel_signature):
+            digest.update(str(part).encode())
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _array_path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.npy")
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Read-only memory map of the (frames, rows, cols) array, or None"""
+        try:
+            frames = np.load(self._array_path(key), mmap_mode='r')
+        except (FileNotFoundError, ValueError):
+            frames = None
+        with self._lock:
+            if frames is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return frames
+
+    def writer(self, key: str, count: int, frame_shape: Tuple[int, ...]) -> 'FrameWriter':
+        """Writer that fills the entry's array one frame at a time (bounded memory for long cines)"""
+        return FrameWriter(self, key, count, frame_shape)
+
+    def put(self, key: str, frames: List[np.ndarray], **index) -> str:
+        """Write all frames of one file and index them; returns the array path"""
+        writer = self.writer(key, len(frames), np.shape(frames[0]))
+        try:
+            for i, frame in enumerate(frames):
+                writer.write(i, frame)
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.commit(**index)
+
+    def _index(self, key: str, shape: Tuple[int, ...], metadata: Optional[Dict] = None,
+               source_path: Optional[str] = None, sop_instance_uid: Optional[str] = None,
+               native_shape: Optional[Tuple[int, int]] = None, max_size: int = 0):
+        native_rows, native_columns = native_shape or shape[1:3]
+        self._conn().execute(
+            "INSERT OR REPLACE INTO frames VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, sop_instance_uid, source_path, shape[0], shape[1], shape[2],
+             native_rows, native_columns, max_size,
+             json.dumps(metadata, default=str) if metadata is not None else None,
+             datetime.now().isoformat())
+        )
+        with self._lock:
+            self.writes += 1
+
+    def metadata(self, key: str) -> Optional[Dict]:
+        """Index entry for a key, with the stored `extract_metadata` fields"""
+        row = self._conn().execute("SELECT * FROM frames WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        entry['metadata'] = json.loads(entry['metadata']) if entry['metadata'] else None
+        return entry
+
+    def summary(self) -> Dict:
+        """Entry, frame and byte totals across the store"""
+        entries, frames, pixels = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(frames), 0), COALESCE(SUM(frames * rows * columns), 0) FROM frames"
+        ).fetchone()
+        return {'entries': entries, 'frames': frames, 'bytes': pixels}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'writes': self.writes}
+
+class FrameWriter:
+    """Fills one store entry through a memory-mapped temporary file, published on commit"""
+
+    def __init__(self, store: FrameStore, key: str, count: int, frame_shape: Tuple[int, ...]):
+        self.store = store
+        self.key = key
+        self.path = store._array_path(key)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Write-then-rename so concurrent readers never map a partial array
+        self.tmp_path = f"{self.path}.{uuid.uuid4().hex[:8]}.tmp"
+        self.array = np.lib.format.open_memmap(self.tmp_path, mode='w+', dtype=np.uint8,
+                                               shape=(count,) + tuple(frame_shape))
+
+    def write(self, index: int, frame: np.ndarray):
+        self.array[index] = frame
+
+    def commit(self, **index) -> str:
+        shape = self.array.shape
+        self.array.flush()
+        del self.array
+        os.replace(self.tmp_path, self.path)
+        self.store._index(self.key, shape, **index)
+        return self.path
+
+    def abort(self):
+        self.array = None
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
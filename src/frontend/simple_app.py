@@ -6,6 +6,7 @@ import streamlit as st
 import requests
 from PIL import Image
 import io
+import json
 import time
 
 # Config
@@ -16,6 +17,33 @@ st.set_page_config(
 )
 
 API_URL = "http://localhost:8000"
+POLL_INTERVAL_SECONDS = 1.0
+# (connect, read) timeouts; the event stream sends a heartbeat every few seconds
+UPLOAD_TIMEOUT_SECONDS = (5, 120)
+EVENTS_TIMEOUT_SECONDS = (5, 30)
+
+def iter_events(job_id: str):
+    """Yield (event, data) pairs from the job's server-sent event stream"""
+    with requests.get(f"{API_URL}/events/{job_id}", stream=True, timeout=EVENTS_TIMEOUT_SECONDS) as response:
+        response.raise_for_status()
+        event, data = None, []
+        for line in response.iter_lines(decode_unicode=True):
+            if not line:
+                if event and data:
+                    yield event, json.loads('\n'.join(data))
+                event, data = None, []
+            elif line.startswith('event:'):
+                event = line[len('event:'):].strip()
+            elif line.startswith('data:'):
+                data.append(line[len('data:'):].strip())
+
+def wait_by_polling(job_id: str) -> dict:
+    """Fallback when the event stream is unavailable: poll /status until the job finishes"""
+    while True:
+        status_data = requests.get(f"{API_URL}/status/{job_id}", timeout=10).json()
+        if status_data['status'] not in ('uploaded', 'queued', 'processing'):
+            return status_data
+        time.sleep(POLL_INTERVAL_SECONDS)
 
 # Custom CSS
 st.markdown("""
@@ -81,26 +109,45 @@ with col2:
     
     if uploaded_file:
         if st.button("🚀 Analyze Image", type="primary", use_container_width=True):
-            with st.spinner("Processing..."):
+            with st.status("Uploading...", expanded=True) as progress:
                 try:
                     files = {'file': (uploaded_file.name, uploaded_file.getvalue())}
-                    response = requests.post(f"{API_URL}/upload", files=files)
+                    response = requests.post(f"{API_URL}/upload", files=files, timeout=UPLOAD_TIMEOUT_SECONDS)
                     
                     if response.status_code == 200:
-                        data = response.json()
-                        job_id = data['job_id']
+                        job_id = response.json()['job_id']
+                        result = None
+                        error = None
                         
-                        if data['status'] == 'completed':
-                            st.success("✅ Processing completed!")
-                            
-                            result_response = requests.get(f"{API_URL}/result/{job_id}")
-                            result = result_response.json()
-                            
+                        try:
+                            # Live progress pushed by the API instead of polling
+                            for event, data in iter_events(job_id):
+                                if event == 'status':
+                                    position = data.get('queue_position')
+                                    progress.update(label=f"{data['status'].title()}..." + (f" (position {position} in queue)" if position else ""))
+                                elif event == 'stage' and data['phase'] == 'end':
+                                    progress.write(f"✅ {data['stage']} ({data['seconds']:.2f}s)")
+                                elif event == 'result':
+                                    result = data
+                                elif event == 'error':
+                                    error = data.get('error')
+                        except requests.RequestException:
+                            status_data = wait_by_polling(job_id)
+                            if status_data['status'] == 'completed':
+                                result = requests.get(f"{API_URL}/result/{job_id}", timeout=30).json()
+                            else:
+                                error = status_data.get('error')
+                        
+                        if result is not None:
+                            progress.update(label="✅ Processing completed!", state="complete")
                             st.session_state.result = result
                             st.session_state.job_id = job_id
                             st.rerun()
                         else:
-                            st.error(f"Processing failed: {data.get('message')}")
+                            progress.update(label="Processing failed", state="error")
+                            st.error(f"Processing failed: {error}")
+                    elif response.status_code in (429, 503):
+                        st.warning("⏳ Server is busy, please try again shortly")
                     else:
                         st.error(f"Upload failed: {response.text}")
                 
@@ -179,7 +226,11 @@ if 'result' in st.session_state and st.session_state.result:
     
     # Download button
     st.markdown("---")
-    report_text = report['full_text']
+    report_response = requests.get(f"{API_URL}/report/{job_id}")
+    report_text = report_response.text if report_response.status_code == 200 else (
+        f"FINDINGS:\n{report['findings']}\n\nIMPRESSION:\n{report['impression']}\n\n"
+        f"RECOMMENDATIONS:\n{report['recommendations']}"
+    )
     st.download_button(
         label="📥 Download Report",
         data=report_text,
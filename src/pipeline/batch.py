@@ -0,0 +1,254 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import argparse
+import contextlib
+import csv
+import fnmatch
+import hashlib
+import json
+import multiprocessing as mp
+import re
+import time
+from typing import Dict, Iterator, List, Optional
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+STATUS_FILE = 'batch_status.json'
+
+# Per-process pipeline, created once by the pool initializer
+_pipeline = None
+_quiet = True
+
+def _init_worker(quiet: bool, tile_size: int = 0, tile_overlap: float = 0.2, decode_max_size: int = 0,
+                 frame_store: Optional[str] = None):
+    """Load the pipeline (and its model) once per worker process"""
+    global _pipeline, _quiet
+    from src.detection.tiling import TileConfig
+    from src.dicom.frame_store import FrameStore
+    from src.pipeline.simple_pipeline import SimplePipeline
+
+    _quiet = quiet
+    tile_config = TileConfig(tile_size, tile_overlap) if tile_size > 0 else None
+    with _maybe_silenced(quiet):
+        _pipeline = SimplePipeline(
+            tile_config=tile_config,
+            decode_max_size=decode_max_size,
+            frame_store=FrameStore(frame_store) if frame_store else None
+        )
+
+@contextlib.contextmanager
+def _maybe_silenced(quiet: bool):
+    if not quiet:
+        yield
+        return
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+def _process_study(study: Dict) -> Dict:
+    """Worker task: run one study and write its status file"""
+    start = time.perf_counter()
+    output_dir = study['output_dir']
+    os.makedirs(output_dir, exist_ok=True)
+
+    try:
+        with _maybe_silenced(_quiet):
+            output_policy = study.get('output_policy')
+            if study['kind'] == 'series':
+                result = _pipeline.process_series(study['path'], output_dir, output_policy=output_policy)
+            elif study['kind'] == 'image':
+                result = _pipeline.process_image(study['path'], output_dir, output_policy=output_policy)
+            else:
+                result = _pipeline.process_dicom(study['path'], output_dir, output_policy=output_policy)
+        success = bool(result.get('success', True))
+        error = result.get('error')
+        detections = result.get('detections', []) if success else []
+        timings = result.get('timings')
+    except Exception as e:
+        success, error, detections, timings = False, str(e), [], None
+
+    status = {
+        'study_id': study['study_id'],
+        'path': study['path'],
+        'output_dir': output_dir,
+        'success': success,
+        'error': error,
+        'num_detections': len(detections),
+        'max_urgency': _max_urgency(detections),
+        'seconds': time.perf_counter() - start,
+        'timings': timings
+    }
+
+    # Written last: its presence marks the study as done for --resume
+    with open(f"{output_dir}/{STATUS_FILE}", 'w') as f:
+        json.dump(status, f, separators=(',', ':'))
+
+    return status
+
+def _max_urgency(detections: List[Dict]) -> Optional[str]:
+    order = {'low': 0, 'moderate': 1, 'high': 2}
+    urgencies = [d['urgency'] for d in detections if d.get('urgency') in order]
+    return max(urgencies, key=order.get) if urgencies else None
+
+def study_key(path: str, study_id: Optional[str] = None) -> str:
+    """Stable, filesystem-safe output name for a study (same input -> same directory)"""
+    if study_id:
+        return re.sub(r'[^A-Za-z0-9._-]+', '_', study_id)
+    stem = re.sub(r'[^A-Za-z0-9._-]+', '_', os.path.splitext(os.path.basename(os.path.normpath(path)))[0])
+    digest = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:10]
+    return f"{stem}_{digest}"
+
+def _kind_for(path: str, series: bool) -> str:
+    if series or os.path.isdir(path):
+        return 'series'
+    return 'image' if path.lower().endswith(IMAGE_EXTENSIONS) else 'dicom'
+
+def iter_directory(root: str, pattern: str, series: bool) -> Iterator[Dict]:
+    """Studies under a directory: matching files, or one study per subdirectory with --series"""
+    if series:
+        for name in sorted(os.listdir(root)):
+            path = os.path.join(root, name)
+            if os.path.isdir(path):
+                yield {'path': path, 'study_id': None}
+        return
+
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if fnmatch.fnmatch(name.lower(), pattern.lower()):
+                yield {'path': os.path.join(dirpath, name), 'study_id': None}
+
+def iter_manifest(manifest: str) -> Iterator[Dict]:
+    """Studies from a CSV (columns: path[, study_id]) or JSONL ({"path": ..., "study_id": ...}) manifest"""
+    base_dir = os.path.dirname(os.path.abspath(manifest))
+
+    def resolve(path: str) -> str:
+        return path if os.path.isabs(path) else os.path.join(base_dir, path)
+
+    if manifest.lower().endswith(('.jsonl', '.ndjson')):
+        with open(manifest) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    yield {'path': resolve(entry['path']), 'study_id': entry.get('study_id')}
+    else:
+        with open(manifest, newline='') as f:
+            for row in csv.DictReader(f):
+                yield {'path': resolve(row['path']), 'study_id': row.get('study_id') or None}
+
+def plan_studies(source: str, output_root: str, pattern: str = '*.dcm', series: bool = False,
+                 resume: bool = True, output_policy: str = 'lazy') -> Dict:
+    """Build the study list, dropping studies already completed when resuming"""
+    entries = iter_directory(source, pattern, series) if os.path.isdir(source) else iter_manifest(source)
+
+    todo = []
+    skipped = 0
+    seen = set()
+    for entry in entries:
+        key = study_key(entry['path'], entry['study_id'])
+        if key in seen:
+            raise ValueError(f"Duplicate study key '{key}' for {entry['path']}")
+        seen.add(key)
+
+        output_dir = os.path.join(output_root, key)
+        if resume and _completed(output_dir):
+            skipped += 1
+            continue
+        todo.append({
+            'study_id': key,
+            'path': entry['path'],
+            'kind': _kind_for(entry['path'], series),
+            'output_dir': output_dir,
+            'output_policy': output_policy
+        })
+
+    return {'todo': todo, 'skipped': skipped}
+
+def _completed(output_dir: str) -> bool:
+    try:
+        with open(f"{output_dir}/{STATUS_FILE}") as f:
+            return json.load(f).get('success', False)
+    except (OSError, ValueError):
+        return False
+
+def run_batch(source: str, output_root: str, workers: int = None, pattern: str = '*.dcm',
+              series: bool = False, resume: bool = True, quiet: bool = True,
+              progress_every: float = 5.0, output_policy: str = 'lazy', tile_size: int = 0,
+              tile_overlap: float = 0.2, decode_max_size: int = 0, frame_store: Optional[str] = None) -> Dict:
+    """Process every study across a process pool, one pipeline per worker"""
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(output_root, exist_ok=True)
+
+    plan = plan_studies(source, output_root, pattern, series, resume, output_policy)
+    todo = plan['todo']
+    print(f"📋 {len(todo)} study(ies) to process, {plan['skipped']} already done, {workers} worker(s)")
+    if not todo:
+        return {'processed': 0, 'failed': 0, 'skipped': plan['skipped'], 'seconds': 0.0}
+
+    processed = failed = 0
+    start = time.perf_counter()
+    last_report = start
+
+    ctx = mp.get_context('spawn')
+    with ctx.Pool(workers, initializer=_init_worker, initargs=(quiet, tile_size, tile_overlap, decode_max_size, frame_store)) as pool, \
+            open(os.path.join(output_root, 'batch_results.jsonl'), 'a') as results_log:
+        for status in pool.imap_unordered(_process_study, todo):
+            processed += 1
+            if not status['success']:
+                failed += 1
+                print(f"❌ {status['study_id']}: {status['error']}")
+            results_log.write(json.dumps(status, separators=(',', ':')) + '\n')
+
+            now = time.perf_counter()
+            if now - last_report >= progress_every or processed == len(todo):
+                last_report = now
+                rate = processed / (now - start)
+                eta = (len(todo) - processed) / rate if rate else 0.0
+                print(f"⏱️ {processed}/{len(todo)} studies, {failed} failed, "
+                      f"{rate:.2f} studies/s, ETA {eta / 60:.1f} min")
+                results_log.flush()
+
+    seconds = time.perf_counter() - start
+    print(f"✅ Batch finished: {processed} processed ({failed} failed) in {seconds:.1f}s, "
+          f"{processed / seconds:.2f} studies/s")
+    return {'processed': processed, 'failed': failed, 'skipped': plan['skipped'], 'seconds': seconds}
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(
+        description="Process a directory or CSV/JSONL manifest of studies on all cores"
+    )
+    parser.add_argument('source', help="Directory of studies, or a .csv/.jsonl manifest with a 'path' column")
+    parser.add_argument('-o', '--output', default='outputs/batch', help="Root directory for per-study results")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--pattern', default='*.dcm', help="File pattern when scanning a directory")
+    parser.add_argument('--series', action='store_true', help="Treat each subdirectory as one series study")
+    parser.add_argument('--no-resume', action='store_true', help="Reprocess studies that already completed")
+    parser.add_argument('--output-policy', choices=('lazy', 'full'), default='lazy',
+                        help="lazy: JSON + report.txt per study; full: also render detection overlays")
+    parser.add_argument('--tile-size', type=int, default=0, help="Tiled full-resolution inference with this tile size (0: off)")
+    parser.add_argument('--tile-overlap', type=float, default=0.2, help="Fractional overlap between neighbouring tiles")
+    parser.add_argument('--decode-max-size', type=int, default=0,
+                        help="Decode JPEG 2000 / JPEG frames at reduced resolution down to this short side (0: full)")
+    parser.add_argument('--frame-store', default=None,
+                        help="Keep normalized frames in this directory; later runs (e.g. a new model) skip decoding")
+    parser.add_argument('--verbose', action='store_true', help="Show per-study pipeline output")
+    args = parser.parse_args(argv)
+
+    summary = run_batch(
+        args.source,
+        args.output,
+        workers=args.workers,
+        pattern=args.pattern,
+        series=args.series,
+        resume=not args.no_resume,
+        quiet=not args.verbose,
+        output_policy=args.output_policy,
+        tile_size=args.tile_size,
+        tile_overlap=args.tile_overlap,
+        decode_max_size=args.decode_max_size,
+        frame_store=args.frame_store
+    )
+    return 1 if summary['failed'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional
+
+class ResultCache:
+    """Content-addressed cache of model outputs (detections, report, visualization)
+
+    Entries are keyed by a hash of the pixel data, the model version and the
+    confidence threshold. A bounded in-memory LRU sits in front of an on-disk
+    tier that is shared by every worker process on the host.
+    """
+
+    def __init__(self, max_entries: int = 256, cache_dir: Optional[str] = 'data/result_cache'):
+        self.max_entries = max(1, max_entries)
+        self.cache_dir = cache_dir
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(pixel_data, model_version: str, conf_threshold: float, extra: Iterable = ()) -> str:
+        """Hash pixel bytes plus everything else that changes the model output"""
+        digest = hashlib.sha256()
+        digest.update(memoryview(pixel_data).cast('B'))
+        for part in (model_version, f"{conf_threshold:.4f}", *extra):
+            digest.update(b'\0')
+            digest.update(str(part).encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Cached entry ({'detections', 'report', 'validation', 'visualization'}) or None"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key: str, entry: Dict, visualization_path: Optional[str] = None):
+        """Store model outputs, copying the visualization into the disk tier"""
+        entry = dict(entry)
+        entry['visualization'] = None
+
+        if self.cache_dir:
+            entry_dir = self._entry_dir(key)
+            os.makedirs(entry_dir, exist_ok=True)
+            if visualization_path and os.path.exists(visualization_path):
+                cached_viz = f"{entry_dir}/visualization.png"
+                self._write_atomic(cached_viz, lambda tmp_path: shutil.copyfile(visualization_path, tmp_path))
+                entry['visualization'] = cached_viz
+
+            def write_json(tmp_path: str):
+                with open(tmp_path, 'w') as f:
+                    json.dump(entry, f, separators=(',', ':'), default=str)
+            self._write_atomic(f"{entry_dir}/result.json", write_json)
+
+        with self._lock:
+            self._remember(key, entry)
+
+    @staticmethod
+    def _write_atomic(path: str, write: Callable[[str], None]):
+        """Write-then-rename through a temporary name unique to this writer
+
+        Two workers storing the same study never share a temporary file, so
+        concurrent readers never see a partial entry.
+        """
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for sizing the cache"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'entries_in_memory': len(self._memory),
+                'max_entries': self.max_entries,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+            }
+
+    def _remember(self, key: str, entry: Dict):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _entry_dir(self, key: str) -> str:
+        return f"{self.cache_dir}/{key[:2]}/{key}"
+
+    def _read_disk(self, key: str) -> Optional[Dict]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(f"{self._entry_dir(key)}/result.json") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
@@ -1,23 +1,168 @@
 from src.dicom.dicom_handler import DICOMHandler
-from src.detection.simple_detector import SimpleDetector
+from src.dicom.decoders import DecodePool
+from src.dicom.frame_store import FrameStore
+from src.detection.batch_engine import BatchingDetector
+from src.detection.detections import Detections
+from src.detection.model_registry import ModelRegistry, get_registry
+from src.detection.simple_detector import draw_detections
+from src.detection.tiling import TileConfig, detect_tiled
 from src.rag.simple_rag import SimpleRAG
+from src.pipeline.result_cache import ResultCache
+from src.utils.profiling import StageTimer
+from collections import deque
+from concurrent.futures import Future
 from datetime import datetime
+from typing import Callable, Iterator, List, Optional, Tuple, Union
 import json
 import os
+import shutil
+import uuid
+import cv2
+import numpy as np
+
+# results: detections/report in the returned result only, no files written
+# lazy: JSON + report.txt (+ the normalized frame, frame.npy); the visualization is rendered
+#       from that frame on first request (render_visualization)
+# full: everything, including the rendered detection overlay
+OUTPUT_POLICIES = ('results', 'lazy', 'full')
 
 class SimplePipeline:
     """Simple end-to-end pipeline for testing"""
     
-    def __init__(self):
+    def __init__(self, batch_size: int = 1, batch_wait_ms: float = 10.0,
+                 result_cache: Optional[ResultCache] = None, model_registry: Optional[ModelRegistry] = None,
+                 output_policy: str = 'full', tile_config: Optional[TileConfig] = None,
+                 decode_pool: Optional[DecodePool] = None, decode_max_size: int = 0,
+                 frame_store: Optional[FrameStore] = None):
         print("🚀 Initializing pipeline...")
         self.dicom_handler = DICOMHandler()
-        self.detector = SimpleDetector()
+        # Detectors are shared per process through the registry
+        self.models = model_registry or get_registry()
+        self.detector = self.models.get()
+        if batch_size > 1:
+            # Concurrent callers share batched predict calls
+            self.detector = BatchingDetector(self.detector, batch_size, batch_wait_ms)
         self.rag = SimpleRAG()
+        self.result_cache = result_cache
+        self.output_policy = self.resolve_output_policy(output_policy)
+        self.tile_config = tile_config
+        # Shared decode pool (decoding runs inline without one) and reduced-resolution target
+        self.decode_pool = decode_pool
+        self.decode_max_size = decode_max_size
+        # Normalized frames kept on disk so re-analysis skips parsing pixels and decoding
+        self.frame_store = frame_store
         print("✅ Pipeline ready!")
     
-    def process_dicom(self, dicom_path: str, output_dir: str = 'outputs') -> dict:
-        """Process a DICOM file"""
+    def refresh_detector(self):
+        """Pick up hot-swapped weights; jobs already running keep their instance"""
+        current = self.models.get()
+        if isinstance(self.detector, BatchingDetector):
+            if self.detector.detector is not current:
+                self.detector.detector = current
+        elif self.detector is not current:
+            self.detector = current
+    
+    def detect_image(self, image, conf_threshold: float) -> Detections:
+        """Detect on one full image, tiled at native resolution when it is larger than a tile"""
+        if self.tile_config is not None and self.tile_config.applies_to(image.shape):
+            return detect_tiled(self.detector, image, conf_threshold, self.tile_config)
+        return self.detector.detect(image, conf_threshold)
+    
+    def decode_size(self) -> int:
+        """Reduced-resolution decode target; tiling needs native pixels, so it disables reduction"""
+        return 0 if self.tile_config is not None else self.decode_max_size
+    
+    def decode_image(self, dicom_path: str, dcm):
+        """Decode and normalize a single-frame image, on the decode pool when there is one
+        
+        With a frame store, a stored frame is returned as a zero-copy view and
+        a freshly decoded one is written for the next run.
+        """
+        if self.frame_store is not None:
+            frames = self.dicom_handler.load_frames(dicom_path, dcm, self.frame_store, self.decode_size())
+            if frames is not None:
+                return frames[0]
+        
+        if self.decode_pool is not None:
+            image = self.decode_pool.decode(dicom_path, dcm, 0, self.decode_size())
+        else:
+            image = self.dicom_handler.decode_frame(dicom_path, dcm, 0, self.decode_size())
+        
+        if self.frame_store is not None:
+            self.dicom_handler.store_frames(dicom_path, dcm, self.frame_store, self.decode_size(), [image])
+        return image
+    
+    def detection_version(self) -> str:
+        """Model version plus detection and report settings, for result-cache keys"""
+        version = f"{self.detector.model_version}|{self.rag.version()}"
+        if self.decode_size():
+            version = f"{version}|decode{self.decode_size()}"
+        if self.tile_config is None:
+            return version
+        return f"{version}|{self.tile_config.signature()}"
+    
+    def resolve_output_policy(self, output_policy: Optional[str]) -> str:
+        """Per-call policy, falling back to the pipeline default"""
+        policy = output_policy or getattr(self, 'output_policy', 'full')
+        if policy not in OUTPUT_POLICIES:
+            raise ValueError(f"Unknown output policy '{policy}' (expected one of {', '.join(OUTPUT_POLICIES)})")
+        return policy
+    
+    def stats(self) -> dict:
+        """Runtime counters reported back to the API"""
+        return {
+            'detector': self.detector.stats() if hasattr(self.detector, 'stats') else None,
+            'result_cache': self.result_cache.stats() if self.result_cache else None,
+            'frame_store': self.frame_store.stats() if self.frame_store else None
+        }
+    
+    def triage(self, path: str, kind: str = 'dicom', image_size: int = 320, conf_threshold: float = 0.3) -> dict:
+        """Cheap first look at a queued study: one frame, decoded and detected at low resolution
+        
+        Only the highest finding urgency is returned, for the scheduler to move
+        likely-urgent studies ahead; the full pass still produces the result.
+        A series is triaged on its middle file, a multi-frame file on its
+        middle frame.
+        """
         start_time = datetime.now()
+        self.refresh_detector()
+        
+        if kind == 'image':
+            # DCT-domain downscaling for JPEG
+            image = cv2.imread(path, cv2.IMREAD_REDUCED_COLOR_2)
+            if image is None:
+                raise ValueError(f"Could not read image: {path}")
+        else:
+            if kind == 'series':
+                paths = self.collect_dicom_paths(path)
+                path = paths[len(paths) // 2]
+            dcm = self.dicom_handler.read_header(path)
+            index = self.dicom_handler.get_frame_count(dcm) // 2
+            image = self.dicom_handler.decode_frame(path, dcm, index, image_size)
+        
+        detections = self.detector.detect(image, conf_threshold, image_size=image_size)
+        return {
+            'urgency': detections.max_urgency(),
+            'findings': len(detections),
+            'image_size': image_size,
+            'seconds': (datetime.now() - start_time).total_seconds()
+        }
+    
+    def process_dicom(self, dicom_path: str, output_dir: str = 'outputs', save_image: bool = False,
+                      conf_threshold: float = 0.3, output_policy: Optional[str] = None,
+                      progress: Optional[Callable] = None) -> dict:
+        """Process a DICOM file
+
+        The decoded frame goes straight to the detector as an array; it is only
+        written to disk (image.png) when save_image is set. `output_policy`
+        selects which artifacts are written (see OUTPUT_POLICIES). Per-stage
+        wall times are returned in result['timings']; `progress` is called as
+        each stage starts and ends (see StageTimer).
+        """
+        start_time = datetime.now()
+        policy = self.resolve_output_policy(output_policy)
+        timer = StageTimer(progress)
+        self.refresh_detector()
         
         print(f"\n{'='*60}")
         print(f"Processing: {os.path.basename(dicom_path)}")
@@ -28,8 +173,11 @@ class SimplePipeline:
         # Step 1: Read DICOM
         print("Step 1/5: Reading DICOM file...")
         try:
-            dicom_data = self.dicom_handler.read_dicom(dicom_path)
-            validation = self.dicom_handler.validate_dicom(dicom_path)
+            # Headers are parsed once; pixel data is only decoded for valid files
+            with timer.stage('read'):
+                dcm = self.dicom_handler.read_header(dicom_path)
+            with timer.stage('validate'):
+                validation = self.dicom_handler.validate_dataset(dcm)
             
             if not validation['is_valid']:
                 return {
@@ -38,6 +186,31 @@ class SimplePipeline:
                     'validation': validation
                 }
             
+            if self.dicom_handler.get_frame_count(dcm) > 1:
+                # Multi-frame objects are streamed frame by frame like a series
+                return self.process_series([dicom_path], output_dir, conf_threshold=conf_threshold,
+                                           output_policy=policy, progress=progress)
+            
+            # Repeated studies are answered from the cache before any pixel decoding
+            cache_key = None
+            if self.result_cache is not None:
+                with timer.stage('cache'):
+                    cache_key = self.result_cache.make_key(
+                        dcm.PixelData,
+                        self.detection_version(),
+                        conf_threshold,
+                        self.dicom_handler.pixel_signature(dcm)
+                    )
+                    cached = self.result_cache.get(cache_key)
+                # A full-output request needs the cached overlay as well
+                if cached is not None and (policy != 'full' or cached.get('visualization')):
+                    print("✅ Result cache hit - skipping decode, detection and report")
+                    metadata = self.dicom_handler.extract_metadata(dcm)
+                    return self.result_from_cache(cached, cache_key, metadata, output_dir, start_time, timer, policy)
+            
+            metadata = self.dicom_handler.extract_metadata(dcm)
+            with timer.stage('decode'):
+                image = self.decode_image(dicom_path, dcm)
             print("✅ DICOM read successfully")
         except Exception as e:
             return {
@@ -45,61 +218,89 @@ class SimplePipeline:
                 'error': f'Failed to read DICOM: {str(e)}'
             }
         
-        # Step 2: Save image
+        # Step 2: Extract image
         print("Step 2/5: Extracting image...")
-        temp_image_path = f"{output_dir}/temp_image.png"
-        self.dicom_handler.save_as_png(dicom_data['image'], temp_image_path)
-        print(f"✅ Image saved to {temp_image_path}")
+        native_shape = (metadata['rows'] or image.shape[0], metadata['columns'] or image.shape[1])
+        image_path = None
+        if save_image:
+            image_path = f"{output_dir}/image.png"
+            with timer.stage('png_save'):
+                self.dicom_handler.save_as_png(image, image_path)
+            print(f"✅ Image saved to {image_path}")
         
         # Step 3: Detect abnormalities
         print("Step 3/5: Running anomaly detection...")
-        detections = self.detector.detect(temp_image_path)
+        with timer.stage('detect'):
+            detections = self.detect_image(image, conf_threshold)
         print(f"✅ Found {len(detections)} finding(s)")
         
-        # Visualize
-        detection_viz_path = f"{output_dir}/detections_visualized.png"
-        self.detector.visualize_detections(
-            temp_image_path,
-            detections,
-            detection_viz_path
-        )
+        # Visualize (lazy/results policies skip the full-resolution PNG encode)
+        detection_viz_path = None
+        if policy == 'full':
+            detection_viz_path = f"{output_dir}/detections_visualized.png"
+            with timer.stage('visualize'):
+                self.detector.visualize_detections(
+                    image,
+                    detections,
+                    detection_viz_path
+                )
+        
+        # The deferred overlay is drawn on the normalized frame, so its first request never decodes again
+        frame_path = None
+        if policy == 'lazy':
+            frame_path = f"{output_dir}/frame.npy"
+            with timer.stage('frame_save'):
+                np.save(frame_path, image)
+        
+        # Boxes found on a reduced-resolution decode are reported in native pixel coordinates;
+        # the report and the result take JSON detection dicts
+        detections = rescale_detections(detections, image.shape, native_shape).to_dicts()
         
         # Step 4: Extract patient info
         print("Step 4/5: Extracting patient information...")
-        patient_info = {
-            'age': dicom_data['metadata']['patient_age'],
-            'sex': dicom_data['metadata']['patient_sex'],
-            'patient_id': dicom_data['metadata']['patient_id']
-        }
+        patient_info = self.patient_info_from(metadata)
         print("✅ Patient info extracted")
         
         # Step 5: Generate report
         print("Step 5/5: Generating radiology report...")
-        report = self.rag.generate_report(detections, patient_info)
-        validation_result = self.rag.validate_report(report, detections)
+        with timer.stage('report'):
+            report = self.rag.generate_report(detections, patient_info, native_shape,
+                                              self.dicom_handler.is_mirrored(dcm))
+            validation_result = self.rag.validate_report(report, detections)
         print("✅ Report generated")
         
         # Calculate time
         processing_time = (datetime.now() - start_time).total_seconds()
         
         # Compile result
+        report = compact_report(report)
         result = {
             'success': True,
             'processing_time_seconds': processing_time,
-            'dicom_metadata': dicom_data['metadata'],
+            'output_policy': policy,
+            'dicom_metadata': metadata,
             'patient_info': patient_info,
             'detections': detections,
             'report': report,
             'validation': validation_result,
-            'output_files': {
-                'detection_visualization': detection_viz_path,
-                'report_json': f"{output_dir}/report.json",
-                'report_text': f"{output_dir}/report.txt"
-            }
+            'output_files': self.output_files(output_dir, policy, image=image_path,
+                                              detection_visualization=detection_viz_path, frame=frame_path)
         }
         
+        if cache_key is not None:
+            with timer.stage('cache'):
+                self.result_cache.put(
+                    cache_key,
+                    {'detections': detections, 'report': report, 'validation': validation_result},
+                    detection_viz_path
+                )
+            result['cache'] = {'hit': False, 'key': cache_key}
+        
         # Save outputs
-        self.save_results(result, output_dir)
+        if policy != 'results':
+            with timer.stage('save_results'):
+                self.save_results(result, output_dir)
+        result['timings'] = timer.summary()
         
         print(f"\n{'='*60}")
         print(f"✅ Processing completed in {processing_time:.2f} seconds")
@@ -107,23 +308,473 @@ class SimplePipeline:
         
         return result
     
+    def result_from_cache(self, cached: dict, cache_key: str, metadata: dict, output_dir: str,
+                          start_time: datetime, timer: Optional[StageTimer] = None,
+                          output_policy: str = 'full') -> dict:
+        """Build a full result from cached model outputs and this file's own metadata"""
+        detection_viz_path = None
+        if output_policy == 'full' and cached.get('visualization') and os.path.exists(cached['visualization']):
+            detection_viz_path = f"{output_dir}/detections_visualized.png"
+            shutil.copyfile(cached['visualization'], detection_viz_path)
+        
+        result = {
+            'success': True,
+            'processing_time_seconds': (datetime.now() - start_time).total_seconds(),
+            'output_policy': output_policy,
+            'dicom_metadata': metadata,
+            'patient_info': self.patient_info_from(metadata),
+            'detections': cached['detections'],
+            'report': compact_report(cached['report']),
+            'validation': cached['validation'],
+            'cache': {'hit': True, 'key': cache_key},
+            'output_files': self.output_files(output_dir, output_policy, detection_visualization=detection_viz_path)
+        }
+        
+        timer = timer or StageTimer()
+        if output_policy != 'results':
+            with timer.stage('save_results'):
+                self.save_results(result, output_dir)
+        result['timings'] = timer.summary()
+        return result
+    
+    def output_files(self, output_dir: str, output_policy: str, **files) -> dict:
+        """Paths of the artifacts written under `output_policy` (None when skipped)"""
+        saved = output_policy != 'results'
+        return {
+            'image': None,
+            'detection_visualization': None,
+            'frame': None,
+            **files,
+            'report_json': f"{output_dir}/complete_result.json" if saved else None,
+            'report_text': f"{output_dir}/report.txt" if saved else None
+        }
+    
+    def patient_info_from(self, metadata: dict) -> dict:
+        """Patient fields passed to report generation"""
+        return {
+            'age': metadata['patient_age'],
+            'sex': metadata['patient_sex'],
+            'patient_id': metadata['patient_id']
+        }
+    
+    def process_image(self, image_path: str, output_dir: str = 'outputs', conf_threshold: float = 0.3,
+                      output_policy: Optional[str] = None, progress: Optional[Callable] = None) -> dict:
+        """Process a regular image file (PNG/JPG)"""
+        start_time = datetime.now()
+        policy = self.resolve_output_policy(output_policy)
+        timer = StageTimer(progress)
+        self.refresh_detector()
+        os.makedirs(output_dir, exist_ok=True)
+        
+        # Decode once and share the array between detection and visualization
+        with timer.stage('read'):
+            image = cv2.imread(image_path)
+        if image is None:
+            raise ValueError(f"Could not read image: {image_path}")
+        
+        detection_viz_path = f"{output_dir}/detections_visualized.png" if policy == 'full' else None
+        
+        cache_key = None
+        cached = None
+        if self.result_cache is not None:
+            with timer.stage('cache'):
+                cache_key = self.result_cache.make_key(image, self.detection_version(), conf_threshold, ('image',))
+                cached = self.result_cache.get(cache_key)
+            if cached is not None and policy == 'full' and not cached.get('visualization'):
+                cached = None
+        
+        if cached is not None:
+            detections = cached['detections']
+            report = compact_report(cached['report'])
+            if detection_viz_path and os.path.exists(cached['visualization']):
+                shutil.copyfile(cached['visualization'], detection_viz_path)
+        else:
+            with timer.stage('detect'):
+                detections = self.detect_image(image, conf_threshold)
+            
+            if detection_viz_path:
+                with timer.stage('visualize'):
+                    self.detector.visualize_detections(
+                        image,
+                        detections,
+                        detection_viz_path
+                    )
+            detections = detections.to_dicts()
+            
+            with timer.stage('report'):
+                report = compact_report(self.rag.generate_report(detections, {}, image.shape))
+            
+            if cache_key is not None:
+                with timer.stage('cache'):
+                    self.result_cache.put(
+                        cache_key,
+                        {'detections': detections, 'report': report, 'validation': None},
+                        detection_viz_path
+                    )
+        
+        report_path = None
+        if policy != 'results':
+            report_path = f"{output_dir}/report.txt"
+            with timer.stage('save_results'):
+                with open(report_path, 'w') as f:
+                    f.write(SimpleRAG.format_full_text(report))
+        
+        result = {
+            'success': True,
+            'output_policy': policy,
+            'detections': detections,
+            'report': report,
+            'processing_time_seconds': (datetime.now() - start_time).total_seconds(),
+            'output_files': {
+                'visualization': detection_viz_path,
+                'report': report_path
+            }
+        }
+        if cache_key is not None:
+            result['cache'] = {'hit': cached is not None, 'key': cache_key}
+        result['timings'] = timer.summary()
+        
+        return result
+    
+    def process_series(self, dicom_paths: Union[str, List[str]], output_dir: str = 'outputs',
+                       decode_workers: int = 4, prefetch: int = 8, chunk_size: int = 8,
+                       max_key_images: int = 5, output_policy: Optional[str] = None,
+                       progress: Optional[Callable] = None, conf_threshold: float = 0.3) -> dict:
+        """Process all series of one study (a directory or list of DICOM files)
+        
+        Slices and frames are decoded on the pipeline's decode pool (or a
+        thread pool of `decode_workers` when it has none) up to `prefetch` frames
+        ahead of the detector and consumed as a stream, so only a bounded
+        window of the volume is in memory at any time. Detections are
+        aggregated into one report per series. Because decoding overlaps
+        detection, the 'decode' timing is the time spent waiting for frames.
+        
+        Key images can't be rendered later without re-decoding the volume, so
+        they are written under both 'lazy' and 'full' and skipped for 'results'.
+        """
+        start_time = datetime.now()
+        policy = self.resolve_output_policy(output_policy)
+        if policy == 'results':
+            max_key_images = 0
+        timer = StageTimer(progress)
+        self.refresh_detector()
+        os.makedirs(output_dir, exist_ok=True)
+        
+        paths = self.collect_dicom_paths(dicom_paths)
+        print(f"\n{'='*60}")
+        print(f"Processing series: {len(paths)} file(s)")
+        print(f"{'='*60}\n")
+        
+        # Headers only - pixel data stays deferred until a frame is decoded
+        instances = []
+        skipped = []
+        for path in paths:
+            try:
+                with timer.stage('read'):
+                    dcm = self.dicom_handler.read_header(path)
+            except Exception as e:
+                skipped.append({'file': os.path.basename(path), 'errors': [str(e)]})
+                continue
+            with timer.stage('validate'):
+                validation = self.dicom_handler.validate_dataset(dcm)
+            if validation['is_valid']:
+                instances.append((path, dcm))
+            else:
+                skipped.append({'file': os.path.basename(path), 'errors': validation['errors']})
+        
+        if not instances:
+            return {
+                'success': False,
+                'error': 'No valid DICOM instances found',
+                'skipped_files': skipped
+            }
+        
+        study_uids = {str(dcm.get('StudyInstanceUID', '')) for _, dcm in instances}
+        if len(study_uids) > 1:
+            return {
+                'success': False,
+                'error': f'Files belong to {len(study_uids)} different studies; upload one StudyInstanceUID at a time'
+            }
+        
+        first_dcm = instances[0][1]
+        metadata = self.dicom_handler.extract_metadata(first_dcm)
+        patient_info = self.patient_info_from(metadata)
+        
+        series_results = []
+        all_detections = []
+        pool = self.decode_pool or DecodePool(self.dicom_handler, decode_workers)
+        try:
+            for series_number, (series_uid, series_instances) in enumerate(self.group_series(instances), 1):
+                series_result = self._process_one_series(
+                    series_number, series_uid, series_instances, pool,
+                    output_dir, prefetch, chunk_size, max_key_images, patient_info, timer, conf_threshold
+                )
+                series_results.append(series_result)
+                all_detections.extend(series_result['detections'])
+        finally:
+            if pool is not self.decode_pool:
+                pool.close()
+        
+        with timer.stage('report'):
+            # Each series already placed its detections in anatomical zones against its own frame shape
+            report = self.rag.generate_report(all_detections, patient_info)
+            validation_result = self.rag.validate_report(report, all_detections)
+        processing_time = (datetime.now() - start_time).total_seconds()
+        
+        result = {
+            'success': True,
+            'processing_time_seconds': processing_time,
+            'output_policy': policy,
+            'study_instance_uid': study_uids.pop(),
+            'dicom_metadata': metadata,
+            'patient_info': patient_info,
+            'series': series_results,
+            'detections': all_detections,
+            'report': compact_report(report),
+            'validation': validation_result,
+            'skipped_files': skipped,
+            'output_files': {
+                'key_images': [path for series in series_results for path in series['key_images']],
+                'report_json': f"{output_dir}/complete_result.json" if policy != 'results' else None,
+                'report_text': f"{output_dir}/report.txt" if policy != 'results' else None
+            }
+        }
+        
+        if policy != 'results':
+            with timer.stage('save_results'):
+                self.save_results(result, output_dir)
+        result['timings'] = timer.summary()
+        
+        print(f"\n{'='*60}")
+        print(f"✅ Series processing completed in {processing_time:.2f} seconds")
+        print(f"{'='*60}\n")
+        
+        return result
+    
+    def _process_one_series(self, series_number: int, series_uid: str, instances: List[Tuple], pool: DecodePool,
+                            output_dir: str, prefetch: int, chunk_size: int, max_key_images: int,
+                            patient_info: dict, timer: Optional[StageTimer] = None,
+                            conf_threshold: float = 0.3) -> dict:
+        """Stream one series through the detector and build its report"""
+        first_dcm = instances[0][1]
+        timer = timer or StageTimer()
+        detections = []
+        key_images = []
+        frames_seen = 0
+        frames_with_findings = 0
+        frame_shape = None
+        
+        chunk = []
+        
+        def flush():
+            nonlocal frames_with_findings
+            frames = [frame for _, frame, _ in chunk]
+            with timer.stage('detect'):
+                if self.tile_config is not None and any(self.tile_config.applies_to(frame.shape) for frame in frames):
+                    # Frames larger than a tile are tiled one at a time, as single images are
+                    frame_detections = [self.detect_image(frame, conf_threshold) for frame in frames]
+                else:
+                    frame_detections = self.detector.detect_batch(frames, conf_threshold)
+            for (location, frame, native_shape), dets in zip(chunk, frame_detections):
+                if not len(dets):
+                    continue
+                frames_with_findings += 1
+                
+                if len(key_images) < max_key_images:
+                    key_path = f"{output_dir}/series{series_number}_slice{location['slice_index']}_frame{location['frame_index']}.png"
+                    with timer.stage('visualize'):
+                        self.detector.visualize_detections(frame, dets, key_path)
+                    key_images.append(key_path)
+                
+                for det in rescale_detections(dets, frame.shape, native_shape).to_dicts():
+                    det.update(location)
+                    detections.append(det)
+            chunk.clear()
+        
+        for location, frame, native_shape in self.iter_series_frames(instances, pool, prefetch, timer):
+            frames_seen += 1
+            # Boxes are reported in native pixels (decoded ones when Rows/Columns are missing),
+            # and every slice of a series shares one geometry
+            frame_shape = native_shape if all(native_shape) else frame.shape[:2]
+            chunk.append((location, frame, native_shape))
+            if len(chunk) >= chunk_size:
+                flush()
+        if chunk:
+            flush()
+        
+        print(f"✅ Series {series_number}: {frames_seen} frame(s), {len(detections)} finding(s)")
+        
+        with timer.stage('report'):
+            report = self.rag.generate_report(detections, patient_info, frame_shape,
+                                              self.dicom_handler.is_mirrored(first_dcm))
+        return {
+            'series_instance_uid': series_uid,
+            'series_number': series_number,
+            'modality': str(first_dcm.get('Modality', '')),
+            'series_description': str(first_dcm.get('SeriesDescription', '')),
+            'num_instances': len(instances),
+            'num_frames': frames_seen,
+            'frames_with_findings': frames_with_findings,
+            'detections': detections,
+            'report': compact_report(report),
+            'key_images': key_images
+        }
+    
+    def iter_series_frames(self, instances: List[Tuple], pool: DecodePool, prefetch: int,
+                           timer: Optional[StageTimer] = None) -> Iterator[Tuple[dict, object, Tuple[int, int]]]:
+        """Yield (location, frame, native shape) in slice order while later frames decode in the background
+        
+        Files already in the frame store are served from it without decoding;
+        the others are written to it frame by frame as they are consumed.
+        """
+        pending = deque()
+        timer = timer or StageTimer()
+        max_size = self.decode_size()
+        writer = None
+        
+        def units():
+            for slice_index, (path, dcm) in enumerate(instances):
+                stored = None
+                if self.frame_store is not None:
+                    stored = self.dicom_handler.load_frames(path, dcm, self.frame_store, max_size)
+                count = self.dicom_handler.get_frame_count(dcm)
+                for frame_index in range(count):
+                    location = {
+                        'slice_index': slice_index,
+                        'frame_index': frame_index,
+                        'instance_number': int(dcm.get('InstanceNumber', slice_index + 1) or slice_index + 1),
+                        'sop_instance_uid': str(dcm.get('SOPInstanceUID', ''))
+                    }
+                    native_shape = (int(dcm.get('Rows', 0) or 0), int(dcm.get('Columns', 0) or 0))
+                    if stored is not None:
+                        future = Future()
+                        future.set_result(stored[frame_index])
+                        yield location, native_shape, future, None
+                    else:
+                        future = pool.submit(path, dcm, frame_index, max_size)
+                        to_store = (path, dcm, frame_index, count) if self.frame_store is not None else None
+                        yield location, native_shape, future, to_store
+        
+        def take():
+            nonlocal writer
+            location, native_shape, future, to_store = pending.popleft()
+            with timer.stage('decode'):
+                frame = future.result()
+            if to_store is not None:
+                # Frames of a file arrive contiguously and in order
+                path, dcm, frame_index, count = to_store
+                with timer.stage('frame_store'):
+                    if frame_index == 0:
+                        key = self.dicom_handler.store_key(path, dcm, self.frame_store, max_size)
+                        writer = self.frame_store.writer(key, count, frame.shape)
+                    writer.write(frame_index, frame)
+                    if frame_index == count - 1:
+                        writer.commit(**self.dicom_handler.store_index(path, dcm, max_size))
+                        writer = None
+            return location, frame, native_shape
+        
+        try:
+            for unit in units():
+                pending.append(unit)
+                if len(pending) > prefetch:
+                    yield take()
+            
+            while pending:
+                yield take()
+        finally:
+            if writer is not None:
+                writer.abort()
+    
+    def group_series(self, instances: List[Tuple]) -> List[Tuple[str, List[Tuple]]]:
+        """Group (path, dataset) pairs by SeriesInstanceUID, sorted into slice order"""
+        series = {}
+        for path, dcm in instances:
+            series.setdefault(str(dcm.get('SeriesInstanceUID', '')), []).append((path, dcm))
+        
+        def slice_key(instance):
+            dcm = instance[1]
+            position = dcm.get('ImagePositionPatient')
+            z = float(position[2]) if position is not None and len(position) == 3 else 0.0
+            return (int(dcm.get('InstanceNumber', 0) or 0), z)
+        
+        return [(uid, sorted(items, key=slice_key)) for uid, items in series.items()]
+    
+    def collect_dicom_paths(self, dicom_paths: Union[str, List[str]]) -> List[str]:
+        """Expand a directory (recursively) or a list of paths into DICOM file paths"""
+        if isinstance(dicom_paths, str):
+            if os.path.isdir(dicom_paths):
+                found = []
+                for root, _, files in os.walk(dicom_paths):
+                    found.extend(os.path.join(root, name) for name in files)
+                return sorted(found)
+            return [dicom_paths]
+        return list(dicom_paths)
+    
     def save_results(self, result: dict, output_dir: str):
         """Save all results"""
-        # Save JSON
+        # Save JSON (compact - machine clients parse it, nobody reads it by eye)
         with open(f"{output_dir}/complete_result.json", 'w') as f:
-            json.dump(result, f, indent=2, default=str)
+            json.dump(result, f, separators=(',', ':'), default=str)
         
         # Save text report
         with open(f"{output_dir}/report.txt", 'w') as f:
-            f.write("RADIOLOGY REPORT\n")
-            f.write("="*60 + "\n\n")
-            f.write(f"Patient ID: {result['patient_info']['patient_id']}\n")
-            f.write(f"Age: {result['patient_info']['age']}, Sex: {result['patient_info']['sex']}\n")
-            f.write("\n" + "="*60 + "\n\n")
-            f.write(result['report']['full_text'])
+            f.write(format_report_text(result))
         
         print(f"✅ Results saved to {output_dir}/")
 
+def rescale_detections(detections: Detections, decoded_shape: Tuple[int, ...], native_shape: Tuple[int, ...]) -> Detections:
+    """Map boxes from a reduced-resolution decode back to native pixel coordinates"""
+    rows, cols = native_shape[:2]
+    if not rows or not cols or tuple(decoded_shape[:2]) == (rows, cols):
+        return detections
+    return detections.scaled(cols / decoded_shape[1], rows / decoded_shape[0])
+
+def compact_report(report: dict) -> dict:
+    """Report without the fields that duplicate other parts of the result
+
+    'detections_used' repeats result['detections'] and 'full_text' repeats the
+    three sections; SimpleRAG.format_full_text rebuilds the text on demand.
+    """
+    return {key: value for key, value in report.items() if key not in ('full_text', 'detections_used')}
+
+def format_report_text(result: dict) -> str:
+    """report.txt contents for a pipeline result"""
+    lines = ["RADIOLOGY REPORT", "=" * 60, ""]
+    patient_info = result.get('patient_info')
+    if patient_info:
+        lines.append(f"Patient ID: {patient_info['patient_id']}")
+        lines.append(f"Age: {patient_info['age']}, Sex: {patient_info['sex']}")
+        lines.extend(["", "=" * 60, ""])
+    lines.append(SimpleRAG.format_full_text(result['report']))
+    return "\n".join(lines)
+
+def render_visualization(source_path: str, detections: List[dict], output_path: str,
+                         dicom_handler: Optional[DICOMHandler] = None, frame_path: Optional[str] = None,
+                         native_shape: Optional[Tuple[int, int]] = None) -> str:
+    """Render a deferred ('lazy') detection overlay
+    
+    Drawn on the normalized frame saved with the result when there is one
+    (boxes are mapped from `native_shape` to its size), else on the
+    original upload. Written to a temporary name and renamed, so concurrent
+    first requests never serve a partially written PNG.
+    """
+    if frame_path and os.path.exists(frame_path):
+        image = np.load(frame_path, mmap_mode='r')
+        detections = Detections.from_dicts(detections)
+        if native_shape and all(native_shape):
+            detections = rescale_detections(detections, native_shape, image.shape)
+    elif source_path.lower().endswith(('.png', '.jpg', '.jpeg')):
+        image = cv2.imread(source_path)
+        if image is None:
+            raise ValueError(f"Could not read image: {source_path}")
+    else:
+        image = (dicom_handler or DICOMHandler()).read_dicom(source_path)['image']
+    
+    tmp_path = f"{os.path.splitext(output_path)[0]}.{uuid.uuid4().hex[:8]}.tmp.png"
+    draw_detections(image, detections, tmp_path)
+    os.replace(tmp_path, output_path)
+    return output_path
+
 if __name__ == "__main__":
     pipeline = SimplePipeline()
     print("\n🎉 Pipeline is ready to use!")
@@ -0,0 +1,136 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Frontal chest radiograph zones in normalized image coordinates. Radiographic
+# convention displays the patient's right on the image left.
+SIDES = ('right', 'left')
+ZONES = ('upper zone', 'middle zone', 'lower zone', 'perihilar region', 'costophrenic angle')
+LABELS = tuple(f"{side} {zone}" for side in SIDES for zone in ZONES) + ('mediastinum',)
+MEDIASTINUM = len(LABELS) - 1
+
+def zone_grid(size: int = 64) -> np.ndarray:
+    """(size, size) label map of LABELS indices, sampled at cell centres"""
+    y, x = (np.mgrid[0:size, 0:size] + 0.5) / size
+    lateral = np.abs(x - 0.5)
+    side = (x >= 0.5).astype(np.int64)
+
+    zone = np.select([y < 0.38, y < 0.62], [0, 1], 2)
+    zone = np.where((y >= 0.3) & (y < 0.6) & (lateral >= 0.07) & (lateral < 0.2), 3, zone)
+    zone = np.where((y >= 0.72) & (lateral >= 0.28), 4, zone)
+
+    labels = side * len(ZONES) + zone
+    return np.where(lateral < 0.07, MEDIASTINUM, labels)
+
+class LocationEngine:
+    """Maps detection boxes to anatomical zones with one vectorized lookup per study
+
+    The zone grid is turned into one summed-area table per label at start-up,
+    so the share of each zone covered by any box is four table reads, no
+    matter how large the box or how many boxes there are.
+    """
+
+    def __init__(self, grid_size: int = 64, min_coverage: float = 0.25):
+        self.grid_size = grid_size
+        self.min_coverage = min_coverage
+        grid = zone_grid(grid_size)
+        onehot = (grid[None] == np.arange(len(LABELS))[:, None, None]).astype(np.int32)
+        self.tables = np.zeros((len(LABELS), grid_size + 1, grid_size + 1), dtype=np.int32)
+        self.tables[:, 1:, 1:] = onehot.cumsum(axis=1).cumsum(axis=2)
+
+    def coverage(self, boxes: np.ndarray, image_shape: Tuple[int, ...], mirrored: bool = False) -> np.ndarray:
+        """(N, len(LABELS)) share of each box lying in each zone"""
+        rows, cols = image_shape[:2]
+        scaled = np.clip(boxes / np.array([cols, rows, cols, rows], dtype=np.float64), 0.0, 1.0)
+        if mirrored:
+            # Patient right displayed on the image right (e.g. PatientOrientation starting with R)
+            scaled[:, [0, 2]] = 1.0 - scaled[:, [2, 0]]
+
+        g = self.grid_size
+        x0 = np.minimum((scaled[:, 0] * g).astype(np.int64), g - 1)
+        y0 = np.minimum((scaled[:, 1] * g).astype(np.int64), g - 1)
+        x1 = np.clip(np.ceil(scaled[:, 2] * g).astype(np.int64), x0 + 1, g)
+        y1 = np.clip(np.ceil(scaled[:, 3] * g).astype(np.int64), y0 + 1, g)
+
+        t = self.tables
+        counts = (t[:, y1, x1] - t[:, y0, x1] - t[:, y1, x0] + t[:, y0, x0]).T
+        return counts / ((x1 - x0) * (y1 - y0))[:, None]
+
+    def locate(self, boxes: np.ndarray, image_shape: Tuple[int, ...], mirrored: bool = False) -> List[Dict]:
+        """Primary zone, side and every zone covering at least min_coverage, per box
+
+        Boxes without a dominant zone are described by lung instead
+        ('right lung', or 'lungs bilaterally' when both sides are substantially covered).
+        """
+        if len(boxes) == 0:
+            return []
+
+        cover = self.coverage(np.asarray(boxes, dtype=np.float64).reshape(-1, 4), image_shape, mirrored)
+        primary = cover.argmax(axis=1)
+        dominant = cover[np.arange(len(cover)), primary] >= self.min_coverage
+        involved = cover >= self.min_coverage
+        side_cover = cover[:, :-1].reshape(len(cover), len(SIDES), len(ZONES)).sum(axis=2)
+        bilateral = (side_cover >= self.min_coverage).all(axis=1)
+
+        located = []
+        for i, label in enumerate(primary):
+            if bilateral[i]:
+                side = 'bilateral'
+            else:
+                side = 'midline' if label == MEDIASTINUM else SIDES[label // len(ZONES)]
+
+            if dominant[i]:
+                location = LABELS[label]
+            else:
+                location = 'lungs bilaterally' if side == 'bilateral' else f"{SIDES[side_cover[i].argmax()]} lung"
+            located.append({
+                'location': location,
+                'side': side,
+                'zones': [LABELS[j] for j in np.flatnonzero(involved[i])] or [location]
+            })
+        return located
+
+    def annotate(self, detections: List[Dict], image_shape: Tuple[int, ...], mirrored: bool = False) -> Dict:
+        """Add location/side/zones to each detection in place and return the study summary"""
+        boxes = np.array([[d['bbox']['x1'], d['bbox']['y1'], d['bbox']['x2'], d['bbox']['y2']] for d in detections])
+        for det, location in zip(detections, self.locate(boxes, image_shape, mirrored)):
+            det.update(location)
+        return summarize_locations(detections)
+
+def summarize_locations(detections: List[Dict]) -> Dict:
+    """Laterality (right/left/bilateral/midline), multiplicity and zones across a study"""
+    sides = set()
+    for det in detections:
+        if det.get('side') == 'bilateral':
+            sides.update(SIDES)
+        elif det.get('side') in SIDES:
+            sides.add(det['side'])
+    if sides == set(SIDES):
+        laterality = 'bilateral'
+    elif sides:
+        laterality = sides.pop()
+    else:
+        laterality = 'midline' if any(d.get('side') == 'midline' for d in detections) else 'none'
+
+    # Zones ordered by their most confident detection
+    zones = []
+    for det in sorted(detections, key=lambda d: -d['confidence']):
+        if det.get('location') and det['location'] not in zones:
+            zones.append(det['location'])
+
+    return {
+        'count': len(detections),
+        'multiplicity': 'none' if not detections else 'single' if len(detections) == 1 else 'multiple',
+        'laterality': laterality,
+        'zones': zones
+    }
+
+def describe_zones(zones: List[str], limit: int = 3) -> str:
+    """'right upper zone', 'right upper zone and left lower zone', 'a, b, c and 2 other sites'"""
+    if not zones:
+        return 'lung field'
+    shown = zones[:limit]
+    rest = len(zones) - len(shown)
+    if rest:
+        return f"{', '.join(shown)} and {rest} other site{'s' if rest > 1 else ''}"
+    return shown[0] if len(shown) == 1 else f"{', '.join(shown[:-1])} and {shown[-1]}"
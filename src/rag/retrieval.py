@@ -0,0 +1,328 @@
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, List, Optional
+
+import numpy as np
+
+SECTIONS = ('findings', 'impression', 'recommendations')
+
+# Bump when section metadata changes; each version is built as a fresh collection
+SCHEMA_VERSION = 2
+
+class HashingEmbedder:
+    """Dependency-free embedder: signed feature hashing of words and word pairs, L2-normalised
+
+    Deterministic across processes (crc32, not Python's salted hash), so an
+    index built in one process can be queried from any worker.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = re.findall(r"[a-z0-9]+", text.lower())
+            for token in words + [f"{a}_{b}" for a, b in zip(words, words[1:])]:
+                h = zlib.crc32(token.encode())
+                vectors[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-9)
+
+class SentenceTransformerEmbedder:
+    """sentence-transformers model on CPU with normalised output"""
+
+    def __init__(self, model_name: str = 'all-MiniLM-L6-v2'):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device='cpu')
+        self.name = model_name
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(texts, batch_size=64, normalize_embeddings=True,
+                                 convert_to_numpy=True).astype(np.float32)
+
+def load_embedder(model_name: str):
+    """sentence-transformers when installed and the model is available, else feature hashing"""
+    if model_name and model_name != 'hashing':
+        try:
+            return SentenceTransformerEmbedder(model_name)
+        except Exception as e:
+            print(f"⚠️ Embedding model {model_name} unavailable ({e.__class__.__name__}); using hashed embeddings")
+    return HashingEmbedder()
+
+class NumpyStore:
+    """Embeddings in one .npy matrix plus a JSON document list; exact cosine search
+
+    Used when chromadb is not installed. Brute force over a few thousand
+    sections is a single matrix-vector product.
+    """
+
+    def __init__(self, directory: str, collection: str):
+        self.matrix_path = f"{directory}/{collection}.npy"
+        self.documents_path = f"{directory}/{collection}.json"
+        self.matrix = np.load(self.matrix_path) if os.path.exists(self.matrix_path) else None
+        self.documents: List[Dict] = []
+        if os.path.exists(self.documents_path):
+            with open(self.documents_path) as f:
+                self.documents = json.load(f)
+        self._masks: Dict[tuple, np.ndarray] = {}
+
+    def ids(self) -> set:
+        return {doc['id'] for doc in self.documents}
+
+    def count(self) -> int:
+        return len(self.documents)
+
+    def add(self, ids: List[str], embeddings: np.ndarray, texts: List[str], metadatas: List[Dict]):
+        self.matrix = embeddings if self.matrix is None else np.vstack([self.matrix, embeddings])
+        self.documents.extend({'id': i, 'text': t, 'metadata': m} for i, t, m in zip(ids, texts, metadatas))
+        self._masks.clear()
+
+        os.makedirs(os.path.dirname(self.matrix_path), exist_ok=True)
+        # Write both files under temporary names first so readers never see half an index
+        np.save(self.matrix_path + '.tmp.npy', self.matrix)
+        with open(self.documents_path + '.tmp', 'w') as f:
+            json.dump(self.documents, f)
+        os.replace(self.matrix_path + '.tmp.npy', self.matrix_path)
+        os.replace(self.documents_path + '.tmp', self.documents_path)
+
+    def query(self, embedding: np.ndarray, k: int, where: Optional[Dict] = None) -> List[Dict]:
+        if self.matrix is None:
+            return []
+        scores = self.matrix @ embedding
+        if where:
+            key = tuple(sorted(where.items()))
+            mask = self._masks.get(key)
+            if mask is None:
+                mask = np.array([all(doc['metadata'].get(f) == v for f, v in where.items()) for doc in self.documents])
+                self._masks[key] = mask
+            scores = np.where(mask, scores, -np.inf)
+
+        top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [dict(self.documents[i], score=float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+class ChromaStore:
+    """Persistent chromadb collection (HNSW, cosine distance)"""
+
+    def __init__(self, directory: str, collection: str):
+        import chromadb
+        from chromadb.config import Settings
+        client = chromadb.PersistentClient(path=directory, settings=Settings(anonymized_telemetry=False))
+        self.collection = client.get_or_create_collection(collection, metadata={'hnsw:space': 'cosine'})
+
+    def ids(self) -> set:
+        return set(self.collection.get(include=[])['ids'])
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def add(self, ids: List[str], embeddings: np.ndarray, texts: List[str], metadatas: List[Dict]):
+        self.collection.upsert(ids=ids, embeddings=embeddings.tolist(), documents=texts, metadatas=metadatas)
+
+    def query(self, embedding: np.ndarray, k: int, where: Optional[Dict] = None) -> List[Dict]:
+        if where and len(where) > 1:
+            where = {'$and': [{field: value} for field, value in where.items()]}
+        found = self.collection.query(query_embeddings=[embedding.tolist()], n_results=k, where=where or None,
+                                      include=['documents', 'metadatas', 'distances'])
+        return [
+            {'id': i, 'text': t, 'metadata': m, 'score': 1.0 - d}
+            for i, t, m, d in zip(found['ids'][0], found['documents'][0], found['metadatas'][0], found['distances'][0])
+        ]
+
+def document_id(doc: Dict) -> str:
+    """Stable id from section and text, so re-adding a corpus only embeds new sections"""
+    return hashlib.sha1(f"{doc['section']}\n{doc['text']}".encode()).hexdigest()[:16]
+
+def embedding_text(doc: Dict) -> str:
+    """Text that is embedded: the section prose plus its finding/location/urgency labels"""
+    labels = ' '.join(str(doc[field]) for field in ('finding', 'location', 'urgency') if doc.get(field))
+    return f"{labels}. {doc['text']}" if labels else doc['text']
+
+def parse_report_text(text: str) -> Dict[str, str]:
+    """Split a FINDINGS:/IMPRESSION:/RECOMMENDATIONS: plain-text report into sections"""
+    sections = {}
+    pattern = r"^(FINDINGS|IMPRESSION|RECOMMENDATIONS?):\s*\n?(.*?)(?=^\s*(?:FINDINGS|IMPRESSION|RECOMMENDATIONS?):|\Z)"
+    for heading, body in re.findall(pattern, text, flags=re.S | re.M):
+        name = heading.lower() if heading.endswith('S') or heading == 'IMPRESSION' else 'recommendations'
+        if body.strip():
+            sections[name] = ' '.join(body.split())
+    return sections
+
+def load_corpus(path: str) -> List[Dict]:
+    """Section documents from a .jsonl/.txt file or a directory of them
+
+    JSONL lines are either single sections ({'section', 'text', ...labels})
+    or whole reports ({'findings', 'impression', 'recommendations', ...labels});
+    .txt files are plain-text reports such as the pipeline's report.txt.
+    Every section is labelled `multiple` ('true'/'false'): whether the
+    report describes several findings, so single-finding lookups can skip it.
+    """
+    if os.path.isdir(path):
+        docs = []
+        for root, _, files in sorted(os.walk(path)):
+            for name in sorted(files):
+                if name.endswith(('.jsonl', '.txt')):
+                    docs.extend(load_corpus(os.path.join(root, name)))
+        return docs
+
+    labels = ('finding', 'location', 'urgency')
+    docs = []
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.txt'):
+            records = [dict(parse_report_text(f.read()), source=path)]
+        else:
+            records = [json.loads(line) for line in f if line.strip()]
+
+    for number, record in enumerate(records):
+        meta = {field: record[field] for field in labels if record.get(field)}
+        meta['multiple'] = 'true' if record.get('multiple') else 'false'
+        source = record.get('source', os.path.basename(path))
+        # Sections of one report share an id so they can be retrieved together
+        meta['report'] = record.get('report') or hashlib.sha1(f"{path}:{number}".encode()).hexdigest()[:12]
+        if 'section' in record:
+            docs.append(dict(meta, section=record['section'], text=record['text'], source=source))
+        for section in SECTIONS:
+            if record.get(section):
+                docs.append(dict(meta, section=section, text=record[section], source=source))
+    return docs
+
+class ReportIndex:
+    """Persistent vector index of report sections (findings / impression / recommendations)
+
+    Sections are embedded once and stored on disk (chromadb when installed,
+    else a NumPy matrix); adding a corpus only embeds sections whose id is
+    new. Query embeddings are cached per detection signature.
+    """
+
+    def __init__(self, directory: str = 'data/rag_index', embedder=None, store: str = 'auto',
+                 query_cache_size: int = 512):
+        self.directory = directory
+        self.embedder = embedder or HashingEmbedder()
+        # One collection per embedder (vectors from different models are not comparable) and schema version
+        collection = f"report_sections_v{SCHEMA_VERSION}_" + re.sub(r'[^A-Za-z0-9]+', '_', self.embedder.name).strip('_')
+
+        self.store = None
+        if store in ('auto', 'chroma'):
+            try:
+                self.store = ChromaStore(directory, collection)
+            except ImportError:
+                if store == 'chroma':
+                    raise
+        if self.store is None:
+            self.store = NumpyStore(directory, collection)
+
+        self.query_cache_size = query_cache_size
+        self._query_cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.store.count()
+
+    def version(self) -> str:
+        """Changes whenever the embedder or the indexed corpus does (used in result-cache keys)"""
+        return f"{self.embedder.name}:{len(self)}"
+
+    def add_documents(self, docs: Iterable[Dict], batch_size: int = 64) -> int:
+        """Embed and store sections not yet in the index; returns how many were added"""
+        with self._lock:
+            existing = self.store.ids()
+            new = {}
+            for doc in docs:
+                doc_id = document_id(doc)
+                if doc_id not in existing:
+                    new[doc_id] = doc
+            ids = list(new)
+
+            for start in range(0, len(ids), batch_size):
+                chunk = ids[start:start + batch_size]
+                self.store.add(
+                    chunk,
+                    self.embedder.embed([embedding_text(new[i]) for i in chunk]),
+                    [new[i]['text'] for i in chunk],
+                    [{k: str(v) for k, v in new[i].items() if k != 'text'} for i in chunk]
+                )
+            return len(ids)
+
+    def add_corpus(self, path: str) -> int:
+        """Index a corpus file or directory incrementally"""
+        if not os.path.exists(path):
+            return 0
+        return self.add_documents(load_corpus(path))
+
+    def embed_query(self, text: str, key: Optional[Hashable] = None) -> np.ndarray:
+        """Query embedding, cached under `key` (default: the text itself)"""
+        key = text if key is None else key
+        with self._lock:
+            embedding = self._query_cache.get(key)
+            if embedding is not None:
+                self._query_cache.move_to_end(key)
+                return embedding
+
+        embedding = self.embedder.embed([text])[0]
+        with self._lock:
+            self._query_cache[key] = embedding
+            while len(self._query_cache) > self.query_cache_size:
+                self._query_cache.popitem(last=False)
+        return embedding
+
+    def search(self, text: str, k: int = 3, where: Optional[Dict[str, str]] = None,
+               key: Optional[Hashable] = None) -> List[Dict]:
+        """Nearest sections to `text`, optionally restricted to exact metadata values (section, finding, report, multiple)"""
+        return self.store.query(self.embed_query(text, key), k, where)
+
+_index: Optional[ReportIndex] = None
+
+def get_index() -> Optional[ReportIndex]:
+    """Process-wide index configured from the environment, synced with the corpus directory"""
+    global _index
+    if _index is None:
+        from src.utils import config
+        if not config.RAG_ENABLED:
+            return None
+        _index = ReportIndex(config.RAG_INDEX_DIR, load_embedder(config.RAG_EMBEDDING_MODEL),
+                             config.RAG_STORE, config.RAG_QUERY_CACHE_SIZE)
+        added = _index.add_corpus(config.RAG_CORPUS_DIR)
+        if added:
+            print(f"✅ Indexed {added} new report section(s) ({len(_index)} total)")
+    return _index
+
+def main(argv=None) -> int:
+    import argparse
+    import time
+    from src.utils import config
+
+    parser = argparse.ArgumentParser(description="Add prior reports to the retrieval index (only new sections are embedded) or query it")
+    parser.add_argument('paths', nargs='*', help=f"Corpus files or directories (default: {config.RAG_CORPUS_DIR})")
+    parser.add_argument('--index-dir', default=config.RAG_INDEX_DIR)
+    parser.add_argument('--model', default=config.RAG_EMBEDDING_MODEL, help="sentence-transformers model, or 'hashing'")
+    parser.add_argument('--store', default=config.RAG_STORE, choices=['auto', 'chroma', 'numpy'])
+    parser.add_argument('--query', help="Print the nearest sections for this text instead of indexing")
+    parser.add_argument('--section', choices=SECTIONS)
+    args = parser.parse_args(argv)
+
+    index = ReportIndex(args.index_dir, load_embedder(args.model), args.store)
+    if args.query:
+        start = time.perf_counter()
+        hits = index.search(args.query, 5, {'section': args.section} if args.section else None)
+        print(f"📋 {len(hits)} hit(s) in {(time.perf_counter() - start) * 1000:.1f} ms")
+        for hit in hits:
+            print(f"  {hit['score']:.3f} [{hit['metadata'].get('section')}] {hit['text']}")
+        return 0
+
+    for path in args.paths or [config.RAG_CORPUS_DIR]:
+        start = time.perf_counter()
+        added = index.add_corpus(path)
+        print(f"✅ {path}: {added} new section(s) embedded in {time.perf_counter() - start:.2f}s")
+    print(f"📋 Index {args.index_dir} ({index.embedder.name}): {len(index)} section(s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,12 @@
-from typing import List, Dict
+from typing import Iterable, List, Dict, Optional, Tuple
+
+from src.rag.anatomy import LocationEngine, describe_zones, summarize_locations
+from src.rag.retrieval import ReportIndex, get_index
 
 class SimpleRAG:
-    """Simple RAG system - template-based for now"""
+    """Report generation from retrieved prior report sections, with templates as fallback"""
     
-    def __init__(self):
+    def __init__(self, index: Optional[ReportIndex] = None):
         print("Initializing Simple RAG system...")
         self.templates = {
             'no_findings': {
@@ -17,16 +20,44 @@ class SimpleRAG:
                 'recommendations': 'Clinical correlation is advised. Consider follow-up imaging or comparison with prior studies if available.'
             }
         }
+        self.locations = LocationEngine()
+        self.index = index
+        if self.index is None:
+            try:
+                self.index = get_index()
+            except Exception as e:
+                print(f"⚠️ Report index unavailable ({e}); using templates")
         print("✅ RAG system ready!")
     
-    def generate_report(self, detections: List[Dict], patient_info: Dict = None) -> Dict:
-        """Generate radiology report"""
+    def version(self) -> str:
+        """Identifies what reports are generated from (used in result-cache keys)"""
+        return f"rag:{self.index.version()}" if self.index is not None else "rag:templates"
+    
+    def generate_report(self, detections: List[Dict], patient_info: Dict = None,
+                        image_shape: Optional[Tuple[int, ...]] = None, mirrored: bool = False) -> Dict:
+        """Generate radiology report
+        
+        With the image shape (rows, cols) of a frontal projection, each
+        detection is placed in an anatomical zone first; `mirrored` marks
+        images displayed with the patient's right on the image right.
+        """
+        if detections and image_shape:
+            locations = self.locations.annotate(detections, image_shape, mirrored)
+        else:
+            locations = summarize_locations(detections)
+        
+        if self.index is not None and len(self.index):
+            report = self.retrieve_report(detections)
+            if report is not None:
+                report['locations'] = locations
+                report['full_text'] = self.format_full_text(report)
+                return report
         
         if len(detections) == 0:
             template = self.templates['no_findings']
         else:
             template = self.templates['abnormality_detected']
-            location = "lung field"
+            location = describe_zones(locations['zones'])
             template = {
                 'findings': template['findings'].format(location=location),
                 'impression': template['impression'].format(location=location),
@@ -37,12 +68,94 @@ class SimpleRAG:
             'findings': template['findings'],
             'impression': template['impression'],
             'recommendations': template['recommendations'],
-            'full_text': f"FINDINGS:\n{template['findings']}\n\nIMPRESSION:\n{template['impression']}\n\nRECOMMENDATIONS:\n{template['recommendations']}",
-            'detections_used': detections
+            'detections_used': detections,
+            'sources': [],
+            'locations': locations
         }
+        report['full_text'] = self.format_full_text(report)
         
         return report
     
+    @staticmethod
+    def detection_signature(detections: List[Dict], limit: int = 3) -> Tuple:
+        """Distinct (finding, location, urgency) triples, most confident first"""
+        if not detections:
+            return (('none', 'none', 'none'),)
+        
+        signature = []
+        for det in sorted(detections, key=lambda d: -d['confidence']):
+            triple = (det.get('finding', 'abnormality'), det.get('location', 'lung field'), det.get('urgency', 'low'))
+            if triple not in signature:
+                signature.append(triple)
+        return tuple(signature[:limit])
+    
+    def retrieve_findings(self, triple: Tuple, multiple: bool, exclude: Iterable[str] = ()) -> Optional[Dict]:
+        """Nearest prior findings section for one finding, skipping the document ids in `exclude`"""
+        finding, location, urgency = triple
+        query = f"{'multiple ' if multiple else ''}{finding} {location} {urgency}"
+        exclude = set(exclude)
+        
+        # Restricting to the detected finding class keeps retrieval from naming a different pathology;
+        # a single finding must not be described with a multiple-findings report
+        where = {'section': 'findings', 'finding': finding}
+        if not multiple:
+            where['multiple'] = 'false'
+        hits = self.index.search(query, k=1 + len(exclude), where=where, key=(triple, multiple))
+        return next((hit for hit in hits if hit['id'] not in exclude), None)
+    
+    def retrieve_sections(self, triple: Tuple, multiple: bool) -> Dict[str, Dict]:
+        """Nearest prior findings section for one finding, plus the rest of that report"""
+        finding, location, urgency = triple
+        query = f"{'multiple ' if multiple else ''}{finding} {location} {urgency}"
+        
+        hit = self.retrieve_findings(triple, multiple)
+        if hit is None:
+            return {}
+        
+        best = {'findings': hit}
+        for section in ('impression', 'recommendations'):
+            same_report = self.index.search(query, k=1, key=(triple, multiple),
+                                            where={'section': section, 'report': hit['metadata']['report']})
+            fallback = same_report or self.index.search(query, k=1, key=(triple, multiple),
+                                                        where={'section': section, 'finding': finding})
+            if fallback:
+                best[section] = fallback[0]
+        return best
+    
+    def retrieve_report(self, detections: List[Dict]) -> Optional[Dict]:
+        """Compose a report from the nearest indexed sections; None if a section is missing"""
+        signature = self.detection_signature(detections)
+        multiple = len(detections) > 1
+        
+        primary = self.retrieve_sections(signature[0], multiple)
+        if any(section not in primary for section in ('findings', 'impression', 'recommendations')):
+            return None
+        
+        fill = lambda hit, location: hit['text'].replace('{location}', location)
+        location = signature[0][1]
+        findings = [fill(primary['findings'], location)]
+        sources = [primary[section]['id'] for section in ('findings', 'impression', 'recommendations')]
+        
+        # Secondary findings contribute the lead sentence of a single-finding section not used yet
+        for triple in signature[1:]:
+            hit = self.retrieve_findings(triple, False, exclude=sources)
+            if hit is not None:
+                findings.append(fill(hit, triple[1]).split('. ')[0].rstrip('.') + '.')
+                sources.append(hit['id'])
+        
+        return {
+            'findings': ' '.join(findings),
+            'impression': fill(primary['impression'], location),
+            'recommendations': fill(primary['recommendations'], location),
+            'detections_used': detections,
+            'sources': sources
+        }
+    
+    @staticmethod
+    def format_full_text(report: Dict) -> str:
+        """Plain-text report from its findings/impression/recommendations sections"""
+        return f"FINDINGS:\n{report['findings']}\n\nIMPRESSION:\n{report['impression']}\n\nRECOMMENDATIONS:\n{report['recommendations']}"
+    
     def validate_report(self, report: Dict, detections: List[Dict]) -> Dict:
         """Validate report"""
         return {
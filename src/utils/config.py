@@ -0,0 +1,106 @@
+import os
+
+def env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment"""
+    value = os.getenv(name)
+    if value is None or value.strip() == '':
+        return default
+    return int(value)
+
+def env_float(name: str, default: float) -> float:
+    """Read a float setting from the environment"""
+    value = os.getenv(name)
+    if value is None or value.strip() == '':
+        return default
+    return float(value)
+
+def env_str(name: str, default: str) -> str:
+    """Read a string setting from the environment"""
+    value = os.getenv(name)
+    if value is None or value.strip() == '':
+        return default
+    return value.strip()
+
+# Models
+MODEL_WEIGHTS = env_str('RADIOLOGY_MODEL_WEIGHTS', 'yolov8n.pt')
+MODELS_DIR = env_str('RADIOLOGY_MODELS_DIR', 'models')
+MODEL_WARMUP = env_int('RADIOLOGY_MODEL_WARMUP', 1) == 1
+MODEL_EXPORT_FORMAT = env_str('RADIOLOGY_MODEL_EXPORT', '')
+# Inference backend: torch, onnx, onnx-int8 or openvino (exports are cached under MODELS_DIR)
+MODEL_BACKEND = env_str('RADIOLOGY_MODEL_BACKEND', MODEL_EXPORT_FORMAT or 'torch')
+# Intra-op threads per worker process (0 = library default, one per core)
+INFERENCE_THREADS = env_int('RADIOLOGY_INFERENCE_THREADS', 0)
+
+# Job queue / worker pool
+WORKER_COUNT = env_int('RADIOLOGY_WORKERS', 2)
+MAX_QUEUE_SIZE = env_int('RADIOLOGY_MAX_QUEUE', 32)
+QUEUE_RETRY_AFTER_SECONDS = env_int('RADIOLOGY_RETRY_AFTER', 5)
+WORKER_THREADS = env_int('RADIOLOGY_WORKER_THREADS', 1)
+
+# Priority scheduling: jobs run by requested priority (X-Priority header or the DICOM order
+# priority) with aging - seconds a job may wait before a newly queued stat job stops overtaking it
+PRIORITY_AGING_URGENT_SECONDS = env_float('RADIOLOGY_PRIORITY_AGING_URGENT', 120.0)
+PRIORITY_AGING_ROUTINE_SECONDS = env_float('RADIOLOGY_PRIORITY_AGING_ROUTINE', 600.0)
+# Low-resolution triage pass (detector input size, 0 disables) for jobs queued behind at least
+# TRIAGE_MIN_QUEUE others; studies with likely-urgent findings are promoted
+TRIAGE_IMAGE_SIZE = env_int('RADIOLOGY_TRIAGE_SIZE', 320)
+TRIAGE_MIN_QUEUE = env_int('RADIOLOGY_TRIAGE_MIN_QUEUE', 2)
+
+# Progress events (/events/{job_id}): heartbeat and job-store re-check interval
+EVENTS_HEARTBEAT_SECONDS = env_float('RADIOLOGY_EVENTS_HEARTBEAT', 2.0)
+
+# Uploads
+MAX_UPLOAD_BYTES = env_int('RADIOLOGY_MAX_UPLOAD_MB', 1024) * 1024 * 1024
+UPLOAD_CHUNK_BYTES = env_int('RADIOLOGY_UPLOAD_CHUNK_KB', 1024) * 1024
+
+# Job store
+JOB_STORE_BACKEND = env_str('RADIOLOGY_JOB_STORE', 'sqlite')
+JOB_DB_PATH = env_str('RADIOLOGY_JOB_DB', 'data/jobs.db')
+JOB_TTL_HOURS = env_float('RADIOLOGY_JOB_TTL_HOURS', 72.0)
+JOB_CLEANUP_INTERVAL_SECONDS = env_int('RADIOLOGY_JOB_CLEANUP_INTERVAL', 600)
+
+# Study metadata catalog behind /studies (filled on job completion and by `python -m src.dicom.catalog scan`)
+CATALOG_DB_PATH = env_str('RADIOLOGY_CATALOG_DB', 'data/catalog.db')
+
+# Micro-batched inference (used when a worker runs several threads)
+BATCH_MAX_SIZE = env_int('RADIOLOGY_BATCH_SIZE', 8)
+BATCH_WAIT_MS = env_float('RADIOLOGY_BATCH_WAIT_MS', 10.0)
+
+# Series / multi-frame streaming
+SERIES_DECODE_WORKERS = env_int('RADIOLOGY_SERIES_DECODE_WORKERS', 4)
+SERIES_PREFETCH = env_int('RADIOLOGY_SERIES_PREFETCH', 8)
+
+# Pixel decoding: one shared pool per worker process ('thread' or 'process') and an optional
+# reduced-resolution target (0 = full size; JPEG 2000 / JPEG frames decode down to this short side)
+DECODE_WORKERS = env_int('RADIOLOGY_DECODE_WORKERS', SERIES_DECODE_WORKERS)
+DECODE_POOL = env_str('RADIOLOGY_DECODE_POOL', 'thread')
+DECODE_MAX_SIZE = env_int('RADIOLOGY_DECODE_MAX_SIZE', 0)
+# Memory-mapped store of normalized frames for re-analysis ('' disables)
+FRAME_STORE_DIR = env_str('RADIOLOGY_FRAME_STORE', '')
+
+# Result cache
+RESULT_CACHE_ENABLED = env_int('RADIOLOGY_RESULT_CACHE', 1) == 1
+RESULT_CACHE_ENTRIES = env_int('RADIOLOGY_RESULT_CACHE_ENTRIES', 256)
+RESULT_CACHE_DIR = env_str('RADIOLOGY_RESULT_CACHE_DIR', 'data/result_cache')
+
+# Retrieval-backed reports (corpus files are indexed incrementally on startup)
+RAG_ENABLED = env_int('RADIOLOGY_RAG', 1) == 1
+RAG_CORPUS_DIR = env_str('RADIOLOGY_RAG_CORPUS', 'data/corpus')
+RAG_INDEX_DIR = env_str('RADIOLOGY_RAG_INDEX', 'data/rag_index')
+RAG_EMBEDDING_MODEL = env_str('RADIOLOGY_RAG_EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
+RAG_STORE = env_str('RADIOLOGY_RAG_STORE', 'auto')
+RAG_QUERY_CACHE_SIZE = env_int('RADIOLOGY_RAG_QUERY_CACHE', 512)
+
+# Profiling (0 disables the slow-request sampling profiler)
+PROFILE_SLOW_SECONDS = env_float('RADIOLOGY_PROFILE_SLOW_SECONDS', 0.0)
+PROFILE_INTERVAL_MS = env_float('RADIOLOGY_PROFILE_INTERVAL_MS', 5.0)
+PROFILE_DIR = env_str('RADIOLOGY_PROFILE_DIR', 'data/profiles')
+
+# Output artifacts: results | lazy | full (see src/pipeline/simple_pipeline.py OUTPUT_POLICIES)
+OUTPUT_POLICY = env_str('RADIOLOGY_OUTPUT_POLICY', 'lazy')
+
+# Tiled inference on full-resolution images (0 disables; tiles are native-size model inputs)
+TILE_SIZE = env_int('RADIOLOGY_TILE_SIZE', 0)
+TILE_OVERLAP = env_float('RADIOLOGY_TILE_OVERLAP', 0.2)
+TILE_BATCH = env_int('RADIOLOGY_TILE_BATCH', 16)
+TILE_MIN_FOREGROUND = env_float('RADIOLOGY_TILE_MIN_FOREGROUND', 0.1)
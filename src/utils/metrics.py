@@ -0,0 +1,107 @@
+import bisect
+import threading
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+# Bucket upper bounds, Prometheus style (seconds / counts)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+class Histogram:
+    """Fixed-bucket histogram with count and sum, safe to share between threads"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """Record one observation"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Approximate quantile by linear interpolation inside the matching bucket"""
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+        return _bucket_quantile(self.buckets, counts, total, q)
+
+    def snapshot(self) -> Dict:
+        """Plain-dict view of the histogram (picklable, JSON friendly)"""
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+            value_sum = self.sum
+
+        cumulative = []
+        running = 0
+        for count in counts[:-1]:
+            running += count
+            cumulative.append(running)
+
+        return {
+            'buckets': [[bound, cum] for bound, cum in zip(self.buckets, cumulative)],
+            'count': total,
+            'sum': value_sum,
+            'mean': value_sum / total if total else 0.0,
+            'p50': _bucket_quantile(self.buckets, counts, total, 0.50),
+            'p95': _bucket_quantile(self.buckets, counts, total, 0.95),
+            'p99': _bucket_quantile(self.buckets, counts, total, 0.99)
+        }
+
+def _bucket_quantile(buckets: List[float], counts: List[int], total: int, q: float) -> float:
+    if total == 0:
+        return 0.0
+
+    rank = q * total
+    running = 0
+    lower = 0.0
+    for bound, count in zip(buckets, counts):
+        if count and running + count >= rank:
+            return lower + (bound - lower) * (rank - running) / count
+        running += count
+        lower = bound
+
+    # Observation in the +Inf bucket: the last finite bound is the best estimate
+    return buckets[-1]
+
+class PrometheusText:
+    """Builds a Prometheus text-format (0.0.4) exposition"""
+
+    def __init__(self):
+        self.lines: List[str] = []
+
+    def metric(self, name: str, kind: str, help_text: str, samples: Iterable[Tuple[Dict, float]]):
+        """Counter/gauge family: samples are (labels, value) pairs"""
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            self.lines.append(f"{name}{_labels(labels)} {value}")
+
+    def histogram(self, name: str, help_text: str, samples: Iterable[Tuple[Dict, Dict]]):
+        """Histogram family: samples are (labels, Histogram.snapshot()) pairs"""
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} histogram")
+        for labels, snapshot in samples:
+            for bound, count in snapshot['buckets']:
+                self.lines.append(f"{name}_bucket{_labels({**labels, 'le': bound})} {count}")
+            self.lines.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {snapshot['count']}")
+            self.lines.append(f"{name}_sum{_labels(labels)} {snapshot['sum']}")
+            self.lines.append(f"{name}_count{_labels(labels)} {snapshot['count']}")
+
+    def render(self) -> str:
+        return '\n'.join(self.lines) + '\n'
+
+def _labels(labels: Dict) -> str:
+    if not labels:
+        return ''
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{key}="{value}"')
+    return '{' + ','.join(pairs) + '}'
@@ -0,0 +1,110 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+class StageTimer:
+    """Wall-clock seconds per pipeline stage for one request
+
+    An optional `listener(phase, stage, seconds)` is told when each stage
+    starts ('start', seconds None) and ends ('end', elapsed seconds), e.g.
+    to stream progress to a client.
+    """
+
+    def __init__(self, listener: Optional[Callable[[str, str, Optional[float]], None]] = None):
+        self.timings: Dict[str, float] = {}
+        self.listener = listener
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block; repeated stages accumulate"""
+        if self.listener is not None:
+            self.listener('start', name, None)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.add(name, elapsed)
+            if self.listener is not None:
+                self.listener('end', name, elapsed)
+
+    def add(self, name: str, seconds: float):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def summary(self) -> Dict[str, float]:
+        """Stage timings plus 'total' (elapsed since the timer was created)"""
+        timings = {name: round(seconds, 6) for name, seconds in self.timings.items()}
+        timings['total'] = round(time.perf_counter() - self._start, 6)
+        return timings
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval
+
+    Samples are kept as folded stacks ("outer;inner;leaf count"), the input
+    format of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.samples[';'.join(reversed(stack))] += 1
+
+    def write_folded(self, path: str):
+        with open(path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+class SlowRequestProfiler:
+    """Opt-in profiler: samples every tracked request, keeps the profile only for slow ones"""
+
+    def __init__(self, threshold_seconds: float, interval_ms: float = 5.0, output_dir: str = 'data/profiles'):
+        self.threshold = threshold_seconds
+        self.interval = interval_ms / 1000.0
+        self.output_dir = output_dir
+
+    @contextmanager
+    def track(self, label: str):
+        """Profile the calling thread for the duration of the block"""
+        sampler = StackSampler(threading.get_ident(), self.interval)
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            sampler.stop()
+            if elapsed >= self.threshold:
+                path = self.dump(sampler, label, elapsed)
+                print(f"🐢 {label} took {elapsed:.2f}s, profile saved to {path}")
+
+    def dump(self, sampler: StackSampler, label: str, elapsed: float) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = f"{self.output_dir}/{label}_{int(time.time())}_{elapsed:.1f}s.folded"
+        sampler.write_folded(path)
+        return path
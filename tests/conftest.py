@@ -0,0 +1,95 @@
+import os
+import sys
+import tempfile
+
+# Settings are read at import time, so point every on-disk store at a scratch
+# directory before anything under src/ is imported
+_SCRATCH = tempfile.mkdtemp(prefix='radiology-tests-')
+for _name, _value in {
+    'RADIOLOGY_JOB_STORE': 'memory',
+    'RADIOLOGY_JOB_DB': os.path.join(_SCRATCH, 'jobs.db'),
+    'RADIOLOGY_CATALOG_DB': os.path.join(_SCRATCH, 'catalog.db'),
+    'RADIOLOGY_RESULT_CACHE_DIR': os.path.join(_SCRATCH, 'result_cache'),
+    'RADIOLOGY_RAG_CORPUS': os.path.join(_SCRATCH, 'corpus'),
+    'RADIOLOGY_RAG_INDEX': os.path.join(_SCRATCH, 'rag_index'),
+    'RADIOLOGY_RAG_EMBEDDING_MODEL': 'hashing',
+    'RADIOLOGY_RAG_STORE': 'numpy',
+    'RADIOLOGY_MODELS_DIR': os.path.join(_SCRATCH, 'models'),
+    'RADIOLOGY_MODEL_WARMUP': '0',
+    'RADIOLOGY_FRAME_STORE': ''
+}.items():
+    os.environ[_name] = _value
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+import pydicom
+import pytest
+
+from benchmarks.harness import make_dicom
+from src.detection.detections import Detections
+from src.detection.simple_detector import draw_detections
+
+def write_dicom(path: str, rows: int = 64, columns: int = 64, frames: int = 1,
+                photometric: str = 'MONOCHROME2', seed: int = 0, **attributes) -> str:
+    """Small synthetic DICOM file; keyword arguments set (or with None, delete) attributes"""
+    make_dicom(str(path), rows, columns, photometric, frames, seed)
+    if attributes:
+        dataset = pydicom.dcmread(str(path))
+        for keyword, value in attributes.items():
+            if value is None:
+                delattr(dataset, keyword)
+            else:
+                setattr(dataset, keyword, value)
+        dataset.save_as(str(path), enforce_file_format=True)
+    return str(path)
+
+@pytest.fixture
+def dicom_file(tmp_path):
+    """Factory for small synthetic DICOM files under tmp_path"""
+    counter = iter(range(1_000_000))
+
+    def make(name: str = None, **kwargs) -> str:
+        return write_dicom(tmp_path / (name or f"image_{next(counter)}.dcm"), **kwargs)
+    return make
+
+class FakeDetector:
+    """Stand-in for SimpleDetector: fixed detections in normalised coordinates, every call recorded"""
+
+    def __init__(self, boxes=None, model_version: str = 'fake:1'):
+        # ((x1, y1, x2, y2) as fractions of the image, confidence)
+        self.boxes = boxes if boxes is not None else [((0.1, 0.2, 0.3, 0.5), 0.9)]
+        self.model_version = model_version
+        self.calls = []
+
+    def _detections(self, image, conf: float) -> Detections:
+        if isinstance(image, str):
+            image = cv2.imread(image)
+        height, width = np.asarray(image).shape[:2]
+        boxes = [[x1 * width, y1 * height, x2 * width, y2 * height] for (x1, y1, x2, y2), _ in self.boxes]
+        return Detections(boxes, [confidence for _, confidence in self.boxes]).above(conf)
+
+    def detect(self, image, conf_threshold: float = 0.25, image_size: int = None) -> Detections:
+        self.calls.append(('detect', [np.shape(image)], conf_threshold, image_size))
+        return self._detections(image, conf_threshold)
+
+    def detect_batch(self, images, conf_threshold: float = 0.25, image_size: int = None):
+        self.calls.append(('detect_batch', [np.shape(image) for image in images], conf_threshold, image_size))
+        return [self._detections(image, conf_threshold) for image in images]
+
+    def visualize_detections(self, image, detections, output_path: str):
+        draw_detections(image, detections, output_path)
+
+class FakeRegistry:
+    """ModelRegistry stand-in that always hands out one detector"""
+
+    def __init__(self, detector):
+        self.detector = detector
+
+    def get(self):
+        return self.detector
+
+@pytest.fixture
+def fake_detector():
+    return FakeDetector()
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from src.rag.anatomy import LABELS, LocationEngine, describe_zones, summarize_locations, zone_grid
+
+@pytest.fixture(scope='module')
+def engine():
+    return LocationEngine()
+
+def box(x1, y1, x2, y2, rows=1000, cols=1000):
+    """Box given in fractions of a rows x cols image"""
+    return [x1 * cols, y1 * rows, x2 * cols, y2 * rows]
+
+def test_zone_grid_is_symmetric():
+    grid = zone_grid(64)
+    assert grid.shape == (64, 64)
+    assert set(np.unique(grid)) == set(range(len(LABELS)))
+    # Mirroring swaps right and left labels, the mediastinum stays
+    mirrored = grid[:, ::-1]
+    swap = np.array([index + 5 if index < 5 else index - 5 if index < 10 else index for index in range(len(LABELS))])
+    assert np.array_equal(swap[grid], mirrored)
+
+def test_image_left_is_the_patients_right(engine):
+    located = engine.locate([box(0.15, 0.1, 0.3, 0.25), box(0.7, 0.7, 0.85, 0.8)], (1000, 1000))
+    assert located[0]['location'] == 'right upper zone'
+    assert located[0]['side'] == 'right'
+    assert located[1]['location'] == 'left lower zone'
+
+def test_mirrored_images_swap_sides(engine):
+    located = engine.locate([box(0.15, 0.1, 0.3, 0.25)], (1000, 1000), mirrored=True)
+    assert located[0]['location'] == 'left upper zone'
+
+def test_non_square_images_use_relative_coordinates(engine):
+    located = engine.locate([box(0.85, 0.8, 0.95, 0.9, rows=3000, cols=2500)], (3000, 2500))
+    assert located[0]['location'] == 'left costophrenic angle'
+
+def test_midline_and_bilateral(engine):
+    midline, bilateral = engine.locate([box(0.47, 0.4, 0.53, 0.5), box(0.1, 0.2, 0.9, 0.8)], (1000, 1000))
+    assert midline['location'] == 'mediastinum' and midline['side'] == 'midline'
+    assert bilateral['side'] == 'bilateral'
+    assert bilateral['location'] == 'lungs bilaterally'
+
+def test_box_spanning_zones_lists_them(engine):
+    located = engine.locate([box(0.15, 0.2, 0.3, 0.55)], (1000, 1000))[0]
+    assert located['side'] == 'right'
+    assert {'right upper zone', 'right middle zone'} <= set(located['zones'])
+
+def test_annotate_and_summary(engine):
+    detections = [
+        {'bbox': dict(zip(('x1', 'y1', 'x2', 'y2'), box(0.7, 0.7, 0.85, 0.8))), 'confidence': 0.5},
+        {'bbox': dict(zip(('x1', 'y1', 'x2', 'y2'), box(0.15, 0.1, 0.3, 0.25))), 'confidence': 0.9}
+    ]
+    summary = engine.annotate(detections, (1000, 1000))
+    assert detections[0]['location'] == 'left lower zone'
+    assert summary == {
+        'count': 2,
+        'multiplicity': 'multiple',
+        'laterality': 'bilateral',
+        'zones': ['right upper zone', 'left lower zone']
+    }
+    assert summarize_locations([])['laterality'] == 'none'
+    assert engine.locate([], (10, 10)) == []
+
+def test_describe_zones():
+    assert describe_zones([]) == 'lung field'
+    assert describe_zones(['a']) == 'a'
+    assert describe_zones(['a', 'b']) == 'a and b'
+    assert describe_zones(['a', 'b', 'c', 'd', 'e']) == 'a, b, c and 2 other sites'
+    assert describe_zones(['a', 'b', 'c', 'd']) == 'a, b, c and 1 other site'
@@ -0,0 +1,216 @@
+import io
+import json
+import os
+import zipfile
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api import simple_api
+from src.api.job_queue import JobQueue
+from src.api.job_store import MemoryJobStore
+from src.dicom.catalog import StudyCatalog
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    """Client on fresh module state; workers are never started, so queued jobs stay queued"""
+    monkeypatch.chdir(tmp_path)
+    store = MemoryJobStore()
+    queue = JobQueue(store, num_workers=1, max_queue_size=8)
+    monkeypatch.setattr(queue, 'alive_workers', lambda: 1)
+    monkeypatch.setattr(simple_api, 'job_store', store)
+    monkeypatch.setattr(simple_api, 'job_queue', queue)
+    monkeypatch.setattr(simple_api, 'study_catalog', StudyCatalog(str(tmp_path / 'catalog.db')))
+    return TestClient(simple_api.app)
+
+def read(path) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+def completed_job(job_id: str, result: dict, file_path: str = None, **fields):
+    simple_api.job_store.create({
+        'job_id': job_id, 'filename': 'a.dcm', 'kind': 'dicom', 'status': 'uploaded',
+        'created_at': '2024-01-01T00:00:00', 'file_path': file_path, 'upload_dir': f"uploads/{job_id}",
+        'output_dir': f"outputs/{job_id}", 'priority': 'routine', **fields
+    })
+    simple_api.job_store.update(job_id, status='completed', result=result)
+
+RESULT = {
+    'success': True,
+    'output_policy': 'results',
+    'patient_info': {'patient_id': 'P7', 'age': 50, 'sex': 'F'},
+    'dicom_metadata': {'rows': 100, 'columns': 200},
+    'detections': [{'bbox': {'x1': 20.0, 'y1': 40.0, 'x2': 60.0, 'y2': 80.0}, 'confidence': 0.9,
+                    'class_id': 0, 'class_name': 'nodule', 'urgency': 'high'}],
+    'report': {'findings': 'Opacity.', 'impression': 'Finding present.', 'recommendations': 'Follow up.'}
+}
+
+def test_upload_queues_with_dicom_priority(api, dicom_file):
+    path = dicom_file(RequestedProcedurePriority='STAT')
+    response = api.post('/upload', files={'file': ('scan.dcm', read(path))})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body['status'], body['priority'], body['queue_position']) == ('queued', 'stat', 1)
+    assert body['size_bytes'] == os.path.getsize(path)
+    assert read(f"uploads/{body['job_id']}/scan.dcm") == read(path)
+
+    status = api.get(f"/status/{body['job_id']}").json()
+    assert (status['status'], status['priority']) == ('queued', 'stat')
+
+    # The header wins over the DICOM order priority
+    routine = api.post('/upload', files={'file': ('scan.dcm', read(path))}, headers={'X-Priority': 'outpatient'})
+    assert routine.json()['priority'] == 'routine'
+    assert routine.json()['queue_position'] == 2
+
+def test_upload_rejections_leave_nothing_behind(api, dicom_file):
+    data = read(dicom_file())
+    assert api.post('/upload', files={'file': ('notes.txt', b'x')}).status_code == 400
+    response = api.post('/upload', files={'file': ('scan.dcm', data)}, headers={'X-Priority': 'whenever'})
+    assert response.status_code == 400 and 'whenever' in response.json()['detail']
+
+    response = api.post('/upload/stream?filename=scan.dcm', content=b'\0' * 4096)
+    assert response.status_code == 400
+    assert not os.listdir('uploads') and not os.listdir('outputs')
+    assert simple_api.job_store.list()[0] == 0
+
+def test_stream_upload(api, dicom_file):
+    data = read(dicom_file())
+    response = api.post('/upload/stream?filename=../../scan.dcm', content=data)
+    assert response.status_code == 200
+    assert read(f"uploads/{response.json()['job_id']}/scan.dcm") == data
+
+def test_no_workers_is_503(api, dicom_file, monkeypatch):
+    monkeypatch.setattr(simple_api.job_queue, 'alive_workers', lambda: 0)
+    response = api.post('/upload', files={'file': ('scan.dcm', read(dicom_file()))})
+    assert response.status_code == 503
+    assert 'Retry-After' in response.headers
+    assert simple_api.job_store.list()[0] == 0
+
+def test_batch_upload_groups_studies(api, dicom_file, tmp_path):
+    first = dicom_file(StudyInstanceUID='1.1', InstanceNumber=1)
+    second = dicom_file(StudyInstanceUID='1.1', InstanceNumber=2, RequestedProcedurePriority='HIGH')
+    other = dicom_file(StudyInstanceUID='2.2')
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as z:
+        z.write(other, 'nested/dir/other.dcm')
+        z.writestr('.DS_Store', b'junk')
+        z.writestr('empty/', b'')
+
+    response = api.post('/upload/batch', files=[
+        ('files', ('a.dcm', read(first))), ('files', ('b.dcm', read(second))),
+        ('files', ('more.zip', archive.getvalue())), ('files', ('photo.png', b'not decoded here'))
+    ])
+    assert response.status_code == 200
+    body = response.json()
+    jobs = sorted((job['kind'], job['files'], job['priority']) for job in body['jobs'])
+    assert jobs == [('dicom', 1, 'routine'), ('image', 1, 'routine'), ('series', 2, 'urgent')]
+    assert not os.path.exists(f"uploads/batch_{body['batch_id']}")
+
+    summary = api.get(f"/batch/{body['batch_id']}").json()
+    assert (summary['status'], summary['total'], summary['done']) == ('queued', 3, False)
+    assert simple_api.job_queue.stats()['queued'] == 3
+    assert api.get('/batch/unknown').status_code == 404
+
+def test_batch_upload_is_all_or_nothing(api, dicom_file, monkeypatch):
+    monkeypatch.setattr(simple_api.job_queue, 'max_queue_size', 1)
+    files = [('files', (f"{n}.dcm", read(dicom_file(StudyInstanceUID=f"1.{n}")))) for n in range(2)]
+    assert api.post('/upload/batch', files=files).status_code == 413
+
+    simple_api.job_queue.max_queue_size = 2
+    simple_api.job_queue._pending_jobs = 1
+    assert api.post('/upload/batch', files=files).status_code == 429
+    assert simple_api.job_store.list()[0] == 0
+    assert not os.listdir('uploads') and not os.listdir('outputs')
+
+def test_extract_zip_flattens_members(tmp_path):
+    zip_path = tmp_path / 'study.zip'
+    with zipfile.ZipFile(zip_path, 'w') as z:
+        z.writestr('../../evil.dcm', b'a')
+        z.writestr('dir/', b'')
+        z.writestr('dir/.hidden', b'b')
+        z.writestr('dir/scan.dcm', b'c')
+    target = tmp_path / 'out'
+    target.mkdir()
+    simple_api.extract_zip(str(zip_path), str(target))
+    assert sorted(os.listdir(target)) == ['study_00000_evil.dcm', 'study_00003_scan.dcm']
+
+@pytest.mark.parametrize('statuses, expected', [
+    (['queued', 'uploaded'], 'queued'),
+    (['queued', 'completed'], 'processing'),
+    (['processing'], 'processing'),
+    (['completed', 'failed'], 'partial'),
+    (['failed', 'failed'], 'failed'),
+    (['completed'], 'completed')
+])
+def test_batch_summary_status(statuses, expected):
+    jobs = [{'job_id': str(i), 'filename': 'f', 'kind': 'dicom', 'status': status} for i, status in enumerate(statuses)]
+    summary = simple_api.batch_summary('b', jobs)
+    assert summary['status'] == expected
+    assert summary['done'] == (expected in ('partial', 'failed', 'completed'))
+
+def test_batch_results_archive(api):
+    completed_job('done1', RESULT, batch_id='b1')
+    simple_api.job_store.create({'job_id': 'fail1', 'filename': 'b.dcm', 'kind': 'dicom', 'status': 'failed',
+                                 'created_at': '2024-01-01T00:00:01', 'batch_id': 'b1'})
+
+    response = api.get('/batch/b1/results')
+    assert response.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert sorted(archive.namelist()) == ['batch_summary.json', 'done1/complete_result.json', 'done1/report.txt']
+        assert json.loads(archive.read('batch_summary.json'))['status'] == 'partial'
+        assert 'Patient ID: P7' in archive.read('done1/report.txt').decode()
+
+def test_results_policy_job_endpoints(api):
+    assert api.get('/status/missing').status_code == 404
+    completed_job('job1', RESULT)
+
+    report = api.get('/report/job1')
+    assert report.status_code == 200
+    assert 'Finding present.' in report.text and 'Patient ID: P7' in report.text
+    assert api.get('/visualization/job1').status_code == 404
+    assert api.get('/result/job1').json()['detections'] == RESULT['detections']
+
+def test_lazy_visualization_renders_from_frame(api):
+    os.makedirs('outputs/job2')
+    np.save('outputs/job2/frame.npy', np.zeros((50, 100), dtype=np.uint8))
+    result = dict(RESULT, output_policy='lazy', output_files={'frame': 'outputs/job2/frame.npy'})
+    completed_job('job2', result, file_path='outputs/job2/frame.npy')
+
+    response = api.get('/visualization/job2')
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'image/png'
+    assert os.path.exists('outputs/job2/detections_visualized.png')
+
+def test_jobs_and_studies_listing(api):
+    for n in range(3):
+        completed_job(f"job{n}", RESULT)
+    page = api.get('/jobs?limit=2&offset=1').json()
+    assert page['total'] == 3 and len(page['jobs']) == 2
+    assert 'result' not in page['jobs'][0]
+
+    simple_api.study_catalog.record_result(dict(RESULT, study_instance_uid='1.2', dicom_metadata={'modality': 'CR'}))
+    assert api.get('/studies?urgency=bogus').status_code == 400
+    studies = api.get('/studies?urgency=high&modality=cr').json()
+    assert studies['total'] == 1 and studies['studies'][0]['study_uid'] == '1.2'
+
+def test_metrics_exposition(api, dicom_file):
+    api.post('/upload', files={'file': ('scan.dcm', read(dicom_file()))}, headers={'X-Priority': 'stat'})
+    response = api.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+    assert 'radiology_queued_jobs_by_priority{priority="stat"} 1' in response.text
+    assert '# TYPE radiology_time_to_result_seconds histogram' in response.text
+
+def test_events_stream_finished_job(api):
+    assert api.get('/events/missing').status_code == 404
+    completed_job('job3', RESULT)
+    simple_api.job_queue._stage_log['job3'] = [{'type': 'stage', 'stage': 'decode', 'phase': 'end', 'seconds': 0.5}]
+
+    response = api.get('/events/job3')
+    assert response.headers['content-type'].startswith('text/event-stream')
+    events = [frame.split('\n') for frame in response.text.strip().split('\n\n')]
+    assert [lines[0] for lines in events] == ['event: status', 'event: stage', 'event: result']
+    assert json.loads(events[1][1][len('data: '):]) == {'stage': 'decode', 'phase': 'end', 'seconds': 0.5}
+    assert json.loads(events[2][1][len('data: '):])['detections'] == RESULT['detections']
+    assert simple_api.job_queue._subscribers.get('job3') in (None, [])
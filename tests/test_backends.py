@@ -0,0 +1,197 @@
+import contextlib
+import io
+import os
+
+import numpy as np
+import pytest
+
+from src.detection.backends import (
+    ExportedDetector, _box_iou, decode_output, export_model, export_path, letterbox, load_images, parity_check
+)
+from src.detection.detections import Detections
+
+def parity_images():
+    # Square 640 frames letterbox identically in ultralytics and ExportedDetector
+    return [image[:640, :640] for image in load_images([])]
+
+def calibrated_weights(path: str, images, classes: int = 2, quantile: float = 0.999):
+    """yolov8n with random weights, calibrated on `images` so it produces a spread of detections
+
+    No pretrained weights are available offline. An uncalibrated random
+    network scores every anchor identically, which would make any parity
+    check pass trivially.
+    """
+    torch = pytest.importorskip('torch')
+    ultralytics = pytest.importorskip('ultralytics')
+
+    torch.manual_seed(0)
+    model = ultralytics.YOLO('yolov8n.yaml')
+    net = model.model
+    batch = torch.from_numpy(np.stack([letterbox(image)[0] for image in images]))
+
+    # BatchNorm statistics from the images themselves keep activations in range
+    for module in net.modules():
+        if isinstance(module, torch.nn.BatchNorm2d):
+            module.reset_running_stats()
+            module.momentum = None
+    net.train()
+    with torch.no_grad():
+        net(batch)
+    net.eval()
+
+    # Class heads: only the top (1 - quantile) of anchors clear a 0.5 score
+    heads = [branch[-1] for branch in net.model[-1].cv3]
+    for conv in heads:
+        conv.weight.data.normal_(0, 2.0 / conv.weight.shape[1] ** 0.5)
+        conv.bias.data.zero_()
+    logits = []
+    hooks = [conv.register_forward_hook(lambda module, inputs, output: logits.append(output[:, :classes].flatten(2)))
+             for conv in heads]
+    with torch.no_grad():
+        net(batch)
+    for hook in hooks:
+        hook.remove()
+    thresholds = torch.quantile(torch.cat(logits, 2).transpose(0, 1).reshape(classes, -1), quantile, dim=1)
+    for conv in heads:
+        conv.bias.data.fill_(-30.0)
+        conv.bias.data[:classes] = -thresholds
+    model.save(path)
+    return path
+
+@pytest.fixture(scope='module')
+def exported(tmp_path_factory):
+    """Calibrated weights, their PyTorch detector and an exporter into a shared models dir"""
+    pytest.importorskip('onnx')
+    pytest.importorskip('onnxruntime')
+    from src.detection.simple_detector import SimpleDetector
+
+    directory = tmp_path_factory.mktemp('backends')
+    images = parity_images()
+    with contextlib.redirect_stdout(io.StringIO()):
+        weights = calibrated_weights(str(directory / 'calibrated.pt'), images)
+        reference = SimpleDetector(weights)
+
+    def load(backend: str) -> ExportedDetector:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            return ExportedDetector(export_model(weights, backend, str(directory / 'models')), backend, threads=1)
+
+    return {'weights': weights, 'reference': reference, 'images': images, 'load': load,
+            'models_dir': str(directory / 'models')}
+
+def test_calibrated_reference_detects_something(exported):
+    counts = [len(exported['reference'].detect(image, 0.25)) for image in exported['images']]
+    assert all(count > 0 for count in counts)
+    assert sum(counts) >= 20
+
+@pytest.mark.parametrize('backend', ['onnx', 'openvino'])
+def test_exported_backend_matches_pytorch(exported, backend):
+    if backend == 'openvino':
+        pytest.importorskip('openvino')
+    candidate = exported['load'](backend)
+
+    summary = parity_check(exported['reference'], candidate, exported['images'])
+
+    assert summary['passed'], summary
+    assert summary['matched'] == summary['reference'] > 0
+    assert summary['max_conf_diff'] < 1e-3
+    assert summary['min_iou'] > 0.99
+
+def test_int8_export_runs(exported):
+    # Dynamic INT8 quantization of a random network is not expected to keep parity; check it runs
+    candidate = exported['load']('onnx-int8')
+    assert os.path.exists(export_path(exported['weights'], 'onnx-int8', exported['models_dir']))
+
+    image = exported['images'][0]
+    detections = candidate.detect(image, 0.01)
+    assert isinstance(detections, Detections)
+    assert (detections.boxes >= 0).all()
+    assert (detections.boxes[:, [0, 2]] <= image.shape[1]).all()
+    assert (detections.boxes[:, [1, 3]] <= image.shape[0]).all()
+
+def test_exports_are_cached(exported):
+    first = export_model(exported['weights'], 'onnx', exported['models_dir'])
+    mtime = os.path.getmtime(first)
+    assert export_model(exported['weights'], 'onnx', exported['models_dir']) == first
+    assert os.path.getmtime(first) == mtime
+
+def test_detect_batch_and_file_input(exported, tmp_path):
+    import cv2
+
+    candidate = exported['load']('onnx')
+    images = exported['images'][:2]
+    batched = candidate.detect_batch(images, 0.25)
+    for image, detections in zip(images, batched):
+        assert np.allclose(detections.boxes, candidate.detect(image, 0.25).boxes, atol=1e-3)
+
+    path = str(tmp_path / 'frame.png')
+    cv2.imwrite(path, images[0])
+    assert len(candidate.detect(path, 0.25)) == len(batched[0])
+    with pytest.raises(ValueError):
+        candidate.detect(str(tmp_path / 'missing.png'))
+
+def test_export_paths():
+    assert export_path('weights/yolo.pt', 'onnx', 'm') == 'm/yolo.onnx'
+    assert export_path('weights/yolo.pt', 'onnx-int8', 'm') == 'm/yolo_int8.onnx'
+    assert export_path('weights/yolo.pt', 'openvino', 'm') == 'm/yolo_openvino/yolo.xml'
+
+@pytest.mark.parametrize('backend', ['torch', 'tensorrt'])
+def test_export_rejects_non_export_backends(backend, tmp_path):
+    with pytest.raises(ValueError):
+        export_model('yolo.pt', backend, str(tmp_path))
+
+def test_letterbox_scale_and_padding():
+    image = np.zeros((200, 400), dtype=np.uint8)
+    tensor, scale, pad = letterbox(image, 640)
+    assert tensor.shape == (3, 640, 640) and tensor.dtype == np.float32
+    assert scale == 1.6
+    assert pad == (0, 160)
+    # Padding is YOLO grey, the image itself black
+    assert tensor[0, 0, 0] == pytest.approx(114 / 255)
+    assert tensor[0, 320, 320] == 0
+
+def test_decode_output_maps_boxes_and_suppresses_overlaps():
+    # Rows: cx, cy, w, h, class 0, class 1; anchors are columns
+    output = np.array([
+        [100, 102, 300, 300],
+        [100, 100, 100, 500],
+        [40, 40, 40, 40],
+        [40, 40, 40, 40],
+        [0.9, 0.8, 0.1, 0.0],
+        [0.0, 0.0, 0.0, 0.6]
+    ], dtype=np.float32)
+
+    detections = decode_output(output, 0.25, 0.5, scale=2.0, pad=(10, 20), shape=(260, 200))
+
+    # The second anchor overlaps the first of the same class; the third is below the threshold
+    assert detections.confidences.tolist() == pytest.approx([0.9, 0.6])
+    assert detections.classes.tolist() == [0, 1]
+    assert detections.boxes[0].tolist() == pytest.approx([35, 30, 55, 50])
+    # Clipped to the original image
+    assert detections.boxes[1].tolist() == pytest.approx([135, 230, 155, 250])
+
+    assert len(decode_output(output, 0.95, 0.5, 1.0, (0, 0), (640, 640))) == 0
+
+class StubDetector:
+    def __init__(self, detections):
+        self.detections = detections
+
+    def detect(self, image, conf_threshold):
+        return self.detections.above(conf_threshold)
+
+def test_parity_check_counts_missing_and_extra():
+    reference = StubDetector(Detections([[0, 0, 10, 10], [20, 20, 40, 40], [50, 50, 60, 60]], [0.9, 0.8, 0.26]))
+    same = StubDetector(Detections([[0, 0, 10, 10.1], [20, 20, 40, 40]], [0.89, 0.8]))
+    assert parity_check(reference, same, [None])['passed']
+
+    shifted = StubDetector(Detections([[0, 0, 10, 10], [25, 25, 45, 45], [70, 70, 80, 80]], [0.7, 0.8, 0.5]))
+    summary = parity_check(reference, shifted, [None, None])
+    # Per image: the first box's score is off by 0.2, the second moved, and the third is extra
+    assert summary == {
+        'images': 2, 'reference': 6, 'matched': 0, 'missing': 4, 'extra': 6,
+        'max_conf_diff': 0.0, 'min_iou': 1.0, 'passed': False
+    }
+
+def test_box_iou():
+    iou = _box_iou(np.array([[0, 0, 10, 10]], dtype=np.float32),
+                   np.array([[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]], dtype=np.float32))
+    assert iou[0].tolist() == pytest.approx([1.0, 1 / 3, 0.0])
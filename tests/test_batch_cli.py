@@ -0,0 +1,111 @@
+import json
+import os
+
+import pytest
+
+from src.pipeline import batch
+
+class StubPipeline:
+    def __init__(self, result=None, error=None):
+        self.result = result or {'success': True, 'detections': [{'urgency': 'moderate'}, {'urgency': 'high'}],
+                                 'timings': {'total': 0.1}}
+        self.error = error
+        self.calls = []
+
+    def _run(self, method, path, output_dir, output_policy=None):
+        self.calls.append((method, path, output_policy))
+        if self.error:
+            raise self.error
+        return self.result
+
+    def process_dicom(self, *args, **kwargs):
+        return self._run('dicom', *args, **kwargs)
+
+    def process_image(self, *args, **kwargs):
+        return self._run('image', *args, **kwargs)
+
+    def process_series(self, *args, **kwargs):
+        return self._run('series', *args, **kwargs)
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'w').close()
+    return str(path)
+
+def test_study_key_is_stable_and_safe(tmp_path):
+    path = str(tmp_path / 'a b' / 'scan 1.dcm')
+    assert batch.study_key(path) == batch.study_key(path)
+    assert batch.study_key(path).startswith('scan_1_')
+    assert batch.study_key(path) != batch.study_key(str(tmp_path / 'other' / 'scan 1.dcm'))
+    assert batch.study_key(path, 'ACC/123 x') == 'ACC_123_x'
+
+def test_iter_directory(tmp_path):
+    touch(tmp_path / 'b' / 'two.DCM')
+    touch(tmp_path / 'a' / 'one.dcm')
+    touch(tmp_path / 'a' / 'notes.txt')
+    files = [entry['path'] for entry in batch.iter_directory(str(tmp_path), '*.dcm', series=False)]
+    assert files == [str(tmp_path / 'a' / 'one.dcm'), str(tmp_path / 'b' / 'two.DCM')]
+
+    series = [entry['path'] for entry in batch.iter_directory(str(tmp_path), '*.dcm', series=True)]
+    assert series == [str(tmp_path / 'a'), str(tmp_path / 'b')]
+
+@pytest.mark.parametrize('suffix', ['.csv', '.jsonl'])
+def test_manifest_paths_resolve_against_manifest(tmp_path, suffix):
+    manifest = tmp_path / f"studies{suffix}"
+    if suffix == '.csv':
+        manifest.write_text('path,study_id\nimages/a.dcm,ACC1\n/abs/b.png,\n')
+    else:
+        manifest.write_text('{"path": "images/a.dcm", "study_id": "ACC1"}\n\n{"path": "/abs/b.png"}\n')
+
+    entries = list(batch.iter_manifest(str(manifest)))
+    assert entries == [
+        {'path': str(tmp_path / 'images' / 'a.dcm'), 'study_id': 'ACC1'},
+        {'path': '/abs/b.png', 'study_id': None}
+    ]
+
+def test_plan_kinds_resume_and_duplicates(tmp_path):
+    manifest = tmp_path / 'studies.csv'
+    manifest.write_text('path,study_id\na.dcm,done\nb.png,failed\nseries_dir,new\n')
+    os.makedirs(tmp_path / 'series_dir')
+    output = tmp_path / 'out'
+    for key, success in (('done', True), ('failed', False)):
+        os.makedirs(output / key)
+        (output / key / batch.STATUS_FILE).write_text(json.dumps({'success': success}))
+
+    plan = batch.plan_studies(str(manifest), str(output), output_policy='full')
+    assert plan['skipped'] == 1
+    assert [(study['study_id'], study['kind']) for study in plan['todo']] == [('failed', 'image'), ('new', 'series')]
+    assert all(study['output_policy'] == 'full' for study in plan['todo'])
+    assert len(batch.plan_studies(str(manifest), str(output), resume=False)['todo']) == 3
+
+    manifest.write_text('path,study_id\na.dcm,same\nb.dcm,same\n')
+    with pytest.raises(ValueError, match='Duplicate'):
+        batch.plan_studies(str(manifest), str(output))
+
+def test_process_study_writes_status(tmp_path, monkeypatch):
+    pipeline = StubPipeline()
+    monkeypatch.setattr(batch, '_pipeline', pipeline)
+    study = {'study_id': 'ACC1', 'path': 'a.dcm', 'kind': 'dicom',
+             'output_dir': str(tmp_path / 'ACC1'), 'output_policy': 'lazy'}
+
+    status = batch._process_study(study)
+    assert pipeline.calls == [('dicom', 'a.dcm', 'lazy')]
+    assert status['success'] and status['num_detections'] == 2
+    assert status['max_urgency'] == 'high'
+    assert status['timings'] == {'total': 0.1}
+    with open(tmp_path / 'ACC1' / batch.STATUS_FILE) as f:
+        assert json.load(f)['study_id'] == 'ACC1'
+    assert batch._completed(str(tmp_path / 'ACC1'))
+
+def test_process_study_records_failures(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, '_pipeline', StubPipeline(error=RuntimeError('decode failed')))
+    status = batch._process_study({'study_id': 's', 'path': 'dir', 'kind': 'series',
+                                   'output_dir': str(tmp_path / 's')})
+    assert not status['success']
+    assert status['error'] == 'decode failed'
+    assert status['max_urgency'] is None
+    assert not batch._completed(str(tmp_path / 's'))
+
+def test_max_urgency():
+    assert batch._max_urgency([{'urgency': 'low'}, {'urgency': 'moderate'}, {}]) == 'moderate'
+    assert batch._max_urgency([]) is None
@@ -0,0 +1,82 @@
+import threading
+
+import numpy as np
+import pytest
+
+from src.detection.batch_engine import BatchingDetector
+from tests.conftest import FakeDetector
+
+@pytest.fixture
+def detector():
+    return FakeDetector(boxes=[((0.0, 0.0, 0.5, 0.5), 0.9), ((0.5, 0.5, 1.0, 1.0), 0.4)])
+
+def run_concurrently(fn, arguments):
+    results = [None] * len(arguments)
+    barrier = threading.Barrier(len(arguments))
+
+    def call(index):
+        barrier.wait()
+        results[index] = fn(*arguments[index])
+
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(len(arguments))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_concurrent_requests_share_one_predict(detector):
+    batching = BatchingDetector(detector, max_batch_size=8, max_wait_ms=200)
+    image = np.zeros((64, 64), dtype=np.uint8)
+    try:
+        results = run_concurrently(batching.detect, [(image, 0.3), (image, 0.5), (image, 0.3)])
+    finally:
+        batching.close()
+
+    assert [call[0] for call in detector.calls] == ['detect_batch']
+    # One predict at the loosest threshold, then each caller's own threshold
+    assert detector.calls[0][2] == 0.3
+    assert [len(result) for result in results] == [2, 1, 2]
+    assert batching.stats()['batch_size']['count'] == 1
+
+def test_batches_are_capped(detector):
+    batching = BatchingDetector(detector, max_batch_size=2, max_wait_ms=50)
+    images = [np.zeros((32, 32), dtype=np.uint8)] * 5
+    try:
+        results = batching.detect_batch(images, 0.25)
+    finally:
+        batching.close()
+
+    assert len(results) == 5
+    assert [len(call[1]) for call in detector.calls] == [2, 2, 1]
+
+def test_input_sizes_are_not_mixed(detector):
+    batching = BatchingDetector(detector, max_batch_size=8, max_wait_ms=200)
+    image = np.zeros((32, 32), dtype=np.uint8)
+    try:
+        run_concurrently(batching.detect, [(image, 0.25, None), (image, 0.25, 320), (image, 0.25, None)])
+    finally:
+        batching.close()
+
+    sizes = sorted((call[3] or 0, len(call[1])) for call in detector.calls)
+    assert sizes == [(0, 2), (320, 1)]
+
+def test_errors_reach_every_caller(detector):
+    def fail(*args):
+        raise RuntimeError('inference failed')
+    detector.detect_batch = fail
+    batching = BatchingDetector(detector, max_batch_size=4, max_wait_ms=1)
+    try:
+        with pytest.raises(RuntimeError):
+            batching.detect(np.zeros((8, 8), dtype=np.uint8))
+    finally:
+        batching.close()
+
+def test_other_attributes_pass_through(detector, tmp_path):
+    batching = BatchingDetector(detector)
+    try:
+        assert batching.model_version == 'fake:1'
+        with pytest.raises(ValueError):
+            batching.detect(str(tmp_path / 'missing.png'))
+    finally:
+        batching.close()
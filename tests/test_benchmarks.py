@@ -0,0 +1,83 @@
+import json
+import os
+
+import numpy as np
+import pydicom
+
+from benchmarks import harness
+
+def test_measure_reports_latency_throughput_and_memory():
+    calls = []
+    stats = harness.measure(lambda: calls.append(1), repeats=5, warmup=2, items_per_call=4)
+
+    assert len(calls) == 7
+    assert stats['repeats'] == 5
+    assert 0 <= stats['median_ms'] <= stats['p95_ms']
+    assert stats['throughput_per_s'] > 0
+    assert stats['peak_rss_mb'] > 0
+
+def test_summarize_throughput_counts_items():
+    stats = harness.summarize(np.array([0.5, 0.5]), items_per_call=3)
+    assert stats['median_ms'] == 500.0
+    assert stats['throughput_per_s'] == 6.0
+    assert 'peak_rss_mb' not in stats
+
+def test_compare_flags_only_regressions_beyond_tolerance():
+    baseline = {
+        'a': {'median_ms': 100.0, 'p95_ms': 100.0, 'throughput_per_s': 10.0},
+        'b': {'median_ms': 100.0, 'throughput_per_s': 10.0}
+    }
+    results = {
+        # 5% slower, 20% less throughput
+        'a': {'median_ms': 105.0, 'p95_ms': 90.0, 'throughput_per_s': 8.0},
+        # Faster and more throughput
+        'b': {'median_ms': 50.0, 'throughput_per_s': 20.0},
+        'new': {'median_ms': 1e6}
+    }
+
+    regressions = harness.compare(results, baseline, tolerance=0.10)
+    assert [(r['benchmark'], r['metric']) for r in regressions] == [('a', 'throughput_per_s')]
+    assert regressions[0]['change'] == -0.2
+
+    assert len(harness.compare(results, baseline, tolerance=0.01)) == 2
+
+def test_report_writes_record_and_exit_code(tmp_path):
+    results = {'case/detect': {'median_ms': 10.0, 'p95_ms': 12.0, 'throughput_per_s': 100.0}}
+    first = tmp_path / 'run' / 'baseline.json'
+    assert harness.report('pipeline', results, str(first)) == 0
+
+    record = json.loads(first.read_text())
+    assert record['kind'] == 'pipeline'
+    assert record['results'] == results
+    assert record['regressions'] == []
+    assert record['environment']['cpu_count'] == os.cpu_count()
+
+    slower = {'case/detect': dict(results['case/detect'], median_ms=20.0)}
+    second = tmp_path / 'second.json'
+    assert harness.report('pipeline', slower, str(second), str(first)) == 1
+    assert json.loads(second.read_text())['regressions'][0]['metric'] == 'median_ms'
+
+    assert harness.report('pipeline', results, None, str(first)) == 0
+
+def test_synthetic_cases_are_valid_and_reused(tmp_path):
+    harness.CASES['tiny'] = {'rows': 40, 'columns': 30, 'photometric': 'MONOCHROME1', 'frames': 3}
+    try:
+        paths = harness.make_cases(str(tmp_path), ['tiny'])
+        mtime = os.path.getmtime(paths['tiny'])
+        assert harness.make_cases(str(tmp_path), ['tiny']) == paths
+        assert os.path.getmtime(paths['tiny']) == mtime
+    finally:
+        del harness.CASES['tiny']
+
+    dataset = pydicom.dcmread(paths['tiny'])
+    assert dataset.PhotometricInterpretation == 'MONOCHROME1'
+    assert dataset.pixel_array.shape == (3, 40, 30)
+    # Frames are shifted copies, not identical
+    assert not np.array_equal(dataset.pixel_array[0], dataset.pixel_array[1])
+    assert dataset.pixel_array.max() <= 4095
+
+def test_synthetic_chest_is_deterministic():
+    a = harness.synthetic_chest(50, 40, seed=1)
+    assert a.dtype == np.uint16 and a.shape == (50, 40)
+    assert np.array_equal(a, harness.synthetic_chest(50, 40, seed=1))
+    assert not np.array_equal(a, harness.synthetic_chest(50, 40, seed=2))
@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from src.dicom import catalog
+from src.dicom.catalog import StudyCatalog, normalize_date, read_study_header
+
+@pytest.fixture
+def studies(tmp_path):
+    return StudyCatalog(str(tmp_path / 'catalog.db'))
+
+def result(study_uid, urgencies, date='20240101', modality='CR', patient_id='P1'):
+    return {
+        'study_instance_uid': study_uid,
+        'dicom_metadata': {'patient_id': patient_id, 'study_date': date, 'modality': modality,
+                           'rows': 64, 'columns': 64},
+        'detections': [{'urgency': urgency} for urgency in urgencies]
+    }
+
+def test_normalize_date():
+    assert normalize_date('2024-03-01') == '20240301'
+    assert normalize_date('20240301') == '20240301'
+    assert normalize_date('') is None
+    assert normalize_date(None) is None
+
+def test_read_study_header(dicom_file, tmp_path):
+    path = dicom_file(StudyInstanceUID='1.2.3', StudyDate='20230405')
+    header = read_study_header(path)
+    assert header['study_uid'] == '1.2.3'
+    assert header['study_date'] == '20230405'
+    assert header['modality'] == 'CR'
+    assert header['path'] == path
+
+    junk = tmp_path / 'junk.dcm'
+    junk.write_bytes(b'not a dicom file')
+    assert read_study_header(str(junk)) is None
+
+def test_scan_counts_instances_and_unreadable(studies, dicom_file, tmp_path):
+    dicom_file('a1.dcm', StudyInstanceUID='1.1')
+    dicom_file('a2.dcm', StudyInstanceUID='1.1')
+    dicom_file('b.dcm', StudyInstanceUID='1.2', Modality='DX')
+    (tmp_path / 'broken.dcm').write_bytes(b'garbage')
+    (tmp_path / 'notes.txt').write_text('ignored')
+
+    summary = catalog.scan(str(tmp_path), studies, workers=1)
+    assert (summary['files'], summary['unreadable'], summary['studies']) == (4, 1, 2)
+    assert studies.get('1.1')['instances'] == 2
+    assert studies.get('1.2')['modality'] == 'DX'
+    assert studies.get('1.1')['source_path'] == os.path.abspath(str(tmp_path))
+
+def test_worklist_orders_by_urgency_then_date(studies):
+    studies.record_result(result('old-high', ['low', 'high'], date='20230101'), job_id='j1')
+    studies.record_result(result('new-high', ['high'], date='20240101'), job_id='j2')
+    studies.record_result(result('moderate', ['moderate'], date='20250101'), job_id='j3')
+    studies.record_result(result('clear', [], date='20250101'), job_id='j4')
+    studies.add_headers([{
+        'study_uid': 'unread', 'patient_id': 'P1', 'patient_name': 'X', 'patient_age': None,
+        'patient_sex': 'O', 'study_date': '2026-01-01', 'modality': 'CR', 'rows': 64,
+        'columns': 64, 'path': '/data/unread/1.dcm'
+    }])
+
+    total, rows = studies.query()
+    assert total == 5
+    assert [row['study_uid'] for row in rows] == ['new-high', 'old-high', 'moderate', 'clear', 'unread']
+    assert rows[1]['urgency'] == 'high' and rows[1]['findings'] == 2
+    assert rows[4]['study_date'] == '20260101' and rows[4]['urgency'] is None
+
+    assert studies.query(urgency=['high'])[0] == 2
+    assert studies.query(analyzed=False)[1][0]['study_uid'] == 'unread'
+    assert studies.query(date_from='2024-01-01', date_to='20241231')[1][0]['study_uid'] == 'new-high'
+    assert studies.query(limit=2, offset=2)[1][0]['study_uid'] == 'moderate'
+
+def test_rescan_keeps_analysis(studies, dicom_file, tmp_path):
+    dicom_file(StudyInstanceUID='9.9', Modality='CR')
+    studies.record_result(result('9.9', ['high']), job_id='job')
+    catalog.scan(str(tmp_path), studies, workers=1)
+
+    row = studies.get('9.9')
+    assert row['urgency'] == 'high'
+    assert row['job_id'] == 'job'
+    assert row['instances'] == 1
+
+def test_image_results_are_not_recorded(studies):
+    studies.record_result({'detections': [{'urgency': 'high'}]}, job_id='image-job')
+    assert studies.query()[0] == 0
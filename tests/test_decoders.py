@@ -0,0 +1,101 @@
+import io
+
+import numpy as np
+import pydicom
+import pytest
+from PIL import Image
+from pydicom.encaps import encapsulate, get_frame
+from pydicom.uid import JPEG2000Lossless, JPEGBaseline8Bit
+
+from src.dicom.decoders import DecodePool, FrameDecoder, j2k_decomposition_levels, syntax_family
+from src.dicom.dicom_handler import DICOMHandler
+
+def test_syntax_families():
+    assert syntax_family('1.2.840.10008.1.2.1') == 'native'
+    assert syntax_family(JPEGBaseline8Bit) == 'jpeg'
+    assert syntax_family(JPEG2000Lossless) == 'jpeg2000'
+    assert syntax_family('1.2.3') == 'other'
+
+def test_native_frames_match_pixel_array(dicom_file):
+    decoder = FrameDecoder()
+    single = pydicom.dcmread(dicom_file(rows=40, columns=30), defer_size='64 KB')
+    assert np.array_equal(decoder.decode(single), single.pixel_array)
+    assert decoder.route(single) in ('native', 'pydicom-default')
+
+    path = dicom_file(rows=40, columns=30, frames=4)
+    multi = pydicom.dcmread(path, defer_size='64 KB')
+    expected = pydicom.dcmread(path).pixel_array
+    for index in range(4):
+        # From the file (only that frame is read) and from the parsed dataset
+        assert np.array_equal(decoder.decode(multi, index, path=path), expected[index])
+        assert np.array_equal(decoder.decode(multi, index), expected[index])
+
+def test_handler_iterates_frames(dicom_file):
+    handler = DICOMHandler()
+    path = dicom_file(rows=32, columns=32, frames=3)
+    dcm = handler.read_header(path)
+    frames = list(handler.iter_frames(path, dcm))
+    assert [index for index, _ in frames] == [0, 1, 2]
+    assert all(frame.dtype == np.uint8 and frame.shape == (32, 32) for _, frame in frames)
+    assert handler.get_frame_count(dcm) == 3
+
+def compressed_dicom(path: str, image: np.ndarray, transfer_syntax: str, fmt: str, **save_options) -> str:
+    buffer = io.BytesIO()
+    Image.fromarray(image).save(buffer, fmt, **save_options)
+    rows, columns = image.shape
+    from tests.conftest import write_dicom
+    write_dicom(path, rows=4, columns=4)
+    dataset = pydicom.dcmread(path)
+    dataset.file_meta.TransferSyntaxUID = transfer_syntax
+    dataset.Rows, dataset.Columns = rows, columns
+    dataset.BitsAllocated, dataset.BitsStored, dataset.HighBit = 8, 8, 7
+    del dataset.WindowCenter, dataset.WindowWidth
+    dataset.PixelData = encapsulate([buffer.getvalue()])
+    dataset['PixelData'].VR = 'OB'
+    dataset.save_as(path, enforce_file_format=True)
+    return path
+
+@pytest.fixture
+def gradient():
+    y, x = np.mgrid[0:1280, 0:1024]
+    return ((x + y) % 256).astype(np.uint8)
+
+def test_reduced_jpeg_decode(tmp_path, gradient):
+    path = compressed_dicom(str(tmp_path / 'jpeg.dcm'), gradient, JPEGBaseline8Bit, 'JPEG', quality=95)
+    decoder = FrameDecoder()
+    dcm = pydicom.dcmread(path)
+
+    reduced = decoder.decode(dcm, max_size=256)
+    assert decoder.route(dcm, 256) == 'pillow-reduced (jpeg)'
+    # DCT scaling by the largest power of two keeping the short side >= 256
+    assert reduced.shape == (320, 256)
+    # Too small to reduce: full size
+    assert decoder.decode(dcm, max_size=600).shape == (1280, 1024)
+
+def test_reduced_jpeg2000_decode(tmp_path, gradient):
+    path = compressed_dicom(str(tmp_path / 'j2k.dcm'), gradient, JPEG2000Lossless, 'JPEG2000',
+                            irreversible=False, no_jp2=True, num_resolutions=6)
+    dcm = pydicom.dcmread(path)
+    assert j2k_decomposition_levels(get_frame(dcm.PixelData, 0, number_of_frames=1)) == 5
+
+    reduced = FrameDecoder().decode(dcm, max_size=256)
+    assert reduced.shape == (320, 256)
+    # Lossless codestream: the full decode reproduces the pixels
+    assert np.array_equal(FrameDecoder().decode(dcm, max_size=0), gradient)
+
+def test_decomposition_levels_from_cod_marker():
+    # SOC, COD (Lcod, Scod, progression, layers(2), MCT, levels), SOT
+    codestream = b'\xff\x4f' + b'\xff\x52' + b'\x00\x0c' + b'\x00' + b'\x00\x00\x01\x00' + b'\x04' + b'\xff\x90'
+    assert j2k_decomposition_levels(codestream) == 4
+    assert j2k_decomposition_levels(b'\xff\x4f\xff\x90') == 0
+
+def test_decode_pool_matches_inline_decode(dicom_file):
+    handler = DICOMHandler()
+    path = dicom_file(rows=48, columns=40, frames=3)
+    dcm = handler.read_header(path)
+    with DecodePool(handler, workers=2) as pool:
+        futures = [pool.submit(path, dcm, index) for index in range(3)]
+        for index, future in enumerate(futures):
+            assert np.array_equal(future.result(), handler.decode_frame(path, dcm, index))
+    with pytest.raises(ValueError):
+        DecodePool(handler, mode='fiber')
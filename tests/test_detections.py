@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from src.detection.detections import Detections, urgency_codes
+
+def sample() -> Detections:
+    return Detections([[0, 0, 10, 10], [5, 5, 20, 20], [1, 2, 3, 4]], [0.2, 0.95, 0.55], [0, 1, 0])
+
+def test_urgency_thresholds_are_exclusive():
+    confidences = np.array([0.0, 0.4, 0.41, 0.7, 0.71, 1.0])
+    assert urgency_codes(confidences).tolist() == [0, 0, 1, 1, 2, 2]
+    # A float32 score of 0.4 is just above 0.4, as it was for determine_urgency(float(score))
+    assert urgency_codes(np.float32([0.4])).tolist() == [1]
+
+def test_columns_and_empty_detections():
+    detections = Detections()
+    assert len(detections) == 0
+    assert detections.boxes.shape == (0, 4)
+    assert detections.max_urgency() == 'none'
+    assert detections.to_dicts() == []
+    assert len(Detections.from_dicts([])) == 0
+
+def test_to_dicts_round_trip():
+    detections = sample()
+    dicts = detections.to_dicts()
+    assert dicts[1] == {
+        'finding': 'abnormality',
+        'confidence': pytest.approx(0.95),
+        'bbox': {'x1': 5.0, 'y1': 5.0, 'x2': 20.0, 'y2': 20.0},
+        'urgency': 'high'
+    }
+    assert [d['urgency'] for d in dicts] == ['low', 'high', 'moderate']
+
+    restored = Detections.from_dicts(dicts)
+    assert np.array_equal(restored.boxes, detections.boxes)
+    assert np.array_equal(restored.urgency, detections.urgency)
+
+def test_subsets_and_thresholds():
+    detections = sample()
+    kept = detections.above(0.55)
+    assert kept.confidences.tolist() == pytest.approx([0.95, 0.55])
+    assert kept.classes.tolist() == [1, 0]
+    assert kept.max_urgency() == 'high'
+    assert len(detections[np.array([2])]) == 1
+    assert detections[np.array([2])].max_urgency() == 'moderate'
+
+def test_shift_and_scale_keep_scores():
+    detections = sample()
+    shifted = detections.shifted(100, 50)
+    assert shifted.boxes[0].tolist() == [100, 50, 110, 60]
+    scaled = detections.scaled(2, 0.5)
+    assert scaled.boxes[1].tolist() == [10, 2.5, 40, 10]
+    for moved in (shifted, scaled):
+        assert np.array_equal(moved.confidences, detections.confidences)
+        assert np.array_equal(moved.urgency, detections.urgency)
+    # The original is untouched
+    assert detections.boxes[0].tolist() == [0, 0, 10, 10]
+
+def test_concatenate():
+    a, b = sample(), sample().above(0.9)
+    joined = Detections.concatenate([a, b])
+    assert len(joined) == 4
+    assert joined.urgency.tolist() == [0, 2, 1, 2]
+    assert Detections.concatenate([a]) is a
+    assert len(Detections.concatenate([])) == 0
@@ -0,0 +1,71 @@
+import os
+import shutil
+
+import numpy as np
+import pydicom
+import pytest
+
+from src.dicom.dicom_handler import DICOMHandler
+from src.dicom.frame_store import FrameStore
+
+@pytest.fixture
+def store(tmp_path):
+    return FrameStore(str(tmp_path / 'frames'))
+
+def test_put_get_and_index(store):
+    frames = [np.full((4, 5), i, dtype=np.uint8) for i in range(3)]
+    path = store.put('abcd', frames, metadata={'modality': 'CR'}, sop_instance_uid='1.2.3',
+                     native_shape=(8, 10), max_size=4)
+
+    stored = store.get('abcd')
+    assert isinstance(stored, np.memmap)
+    assert not stored.flags.writeable
+    assert stored.shape == (3, 4, 5)
+    assert stored[2, 0, 0] == 2
+    assert path.endswith('ab/abcd.npy')
+
+    entry = store.metadata('abcd')
+    assert entry['metadata'] == {'modality': 'CR'}
+    assert (entry['native_rows'], entry['native_columns'], entry['max_size']) == (8, 10, 4)
+    assert store.summary() == {'entries': 1, 'frames': 3, 'bytes': 60}
+    assert store.get('missing') is None
+    assert store.stats() == {'hits': 1, 'misses': 1, 'writes': 1}
+
+def test_aborted_write_leaves_nothing(store):
+    writer = store.writer('ef01', 2, (3, 3))
+    writer.write(0, np.zeros((3, 3), dtype=np.uint8))
+    writer.abort()
+    assert store.get('ef01') is None
+    assert os.listdir(os.path.dirname(writer.path)) == []
+    assert store.metadata('ef01') is None
+
+def test_key_follows_the_instance_not_the_path(store, dicom_file, tmp_path):
+    handler = DICOMHandler()
+    path = dicom_file('a.dcm')
+    moved = str(tmp_path / 'moved.dcm')
+    shutil.copy(path, moved)
+    dcm = handler.read_header(path)
+
+    key = handler.store_key(path, dcm, store)
+    assert key == handler.store_key(moved, handler.read_header(moved), store)
+    assert key != handler.store_key(path, dcm, store, max_size=256)
+
+    other = dicom_file('b.dcm', WindowWidth=100)
+    assert handler.store_key(other, handler.read_header(other), store) != key
+
+def test_stored_frames_equal_decoded_frames(store, dicom_file):
+    handler = DICOMHandler()
+    path = dicom_file(rows=24, columns=20, frames=3)
+    dcm = handler.read_header(path)
+    assert handler.load_frames(path, dcm, store) is None
+
+    stored = handler.store_frames(path, dcm, store)
+    loaded = handler.load_frames(path, dcm, store)
+    for index, frame in handler.iter_frames(path, dcm):
+        assert np.array_equal(stored[index], frame)
+        assert np.array_equal(loaded[index], frame)
+
+    entry = store.metadata(handler.store_key(path, dcm, store))
+    assert entry['sop_instance_uid'] == str(pydicom.dcmread(path).SOPInstanceUID)
+    assert entry['source_path'] == os.path.abspath(path)
+    assert entry['metadata']['rows'] == 24
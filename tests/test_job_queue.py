@@ -0,0 +1,203 @@
+import types
+
+import pytest
+
+import src.api.job_queue as job_queue_module
+from src.api.job_queue import DEFAULT_AGING, JobQueue, QueueFullError, WorkersUnavailableError
+from src.api.job_store import MemoryJobStore
+
+class Clock:
+    """Controllable time.monotonic for the queue module"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(job_queue_module, 'time', types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+@pytest.fixture
+def make_queue(monkeypatch):
+    """JobQueue without worker processes; jobs are popped by hand"""
+    def make(**kwargs) -> JobQueue:
+        store = MemoryJobStore()
+        queue = JobQueue(store, **kwargs)
+        monkeypatch.setattr(queue, 'alive_workers', lambda: 1)
+        return queue
+    return make
+
+def submit(queue: JobQueue, job_id: str, priority: str = 'routine', kind: str = 'dicom'):
+    queue.store.create({'job_id': job_id, 'status': 'uploaded', 'created_at': job_id})
+    queue.submit(job_id, kind, f"/uploads/{job_id}.dcm", f"/outputs/{job_id}", priority=priority)
+
+def drain(queue: JobQueue):
+    order = []
+    with queue._lock:
+        while queue._entries:
+            task = queue._pop()
+            order.append(f"triage:{task['job_id']}" if task['kind'] == 'triage' else task['job_id'])
+    return order
+
+def test_jobs_run_by_priority_then_arrival(make_queue, clock):
+    queue = make_queue()
+    for job_id, priority in [('r1', 'routine'), ('u1', 'urgent'), ('s1', 'stat'), ('r2', 'routine'), ('s2', 'stat')]:
+        submit(queue, job_id, priority)
+        clock.now += 1
+
+    assert queue.queue_position('s1') == 1
+    assert queue.queue_position('r2') == 5
+    assert drain(queue) == ['s1', 's2', 'u1', 'r1', 'r2']
+
+def test_waiting_routine_job_is_not_overtaken_forever(make_queue, clock):
+    queue = make_queue()
+    submit(queue, 'old-routine', 'routine')
+
+    # Less than routine - urgent aging later, a new urgent job still goes first
+    clock.now += DEFAULT_AGING['routine'] - DEFAULT_AGING['urgent'] - 1
+    submit(queue, 'urgent-early', 'urgent')
+    # After it, the routine job's deadline is the earlier one
+    clock.now += 2
+    submit(queue, 'urgent-late', 'urgent')
+    # A stat job overtakes until the full routine allowance has passed
+    submit(queue, 'stat', 'stat')
+
+    assert drain(queue) == ['stat', 'urgent-early', 'old-routine', 'urgent-late']
+
+def test_custom_aging_overrides_defaults(make_queue, clock):
+    queue = make_queue(aging={'routine': 10.0})
+    submit(queue, 'routine', 'routine')
+    clock.now += 11
+    submit(queue, 'stat', 'stat')
+    assert drain(queue) == ['routine', 'stat']
+
+def test_submit_marks_job_queued_and_counts_by_priority(make_queue, clock):
+    queue = make_queue()
+    submit(queue, 'a', 'urgent')
+    submit(queue, 'b', 'routine')
+
+    assert queue.store.get('a')['status'] == 'queued'
+    stats = queue.stats()
+    assert stats['queued'] == 2
+    assert stats['queued_by_priority'] == {'stat': 0, 'urgent': 1, 'routine': 1}
+
+def test_unknown_priority_is_rejected_before_queueing(make_queue, clock):
+    queue = make_queue()
+    with pytest.raises(ValueError):
+        submit(queue, 'a', 'whenever')
+    assert queue.stats()['queued'] == 0
+
+def test_submit_many_is_all_or_nothing(make_queue, clock):
+    queue = make_queue()
+    tasks = [
+        {'job_id': 'a', 'kind': 'dicom', 'file_path': 'a.dcm', 'output_dir': 'out/a', 'priority': 'stat'},
+        {'job_id': 'b', 'kind': 'dicom', 'file_path': 'b.dcm', 'output_dir': 'out/b', 'priority': 'bogus'}
+    ]
+    for task in tasks:
+        queue.store.create({'job_id': task['job_id'], 'status': 'uploaded', 'created_at': task['job_id']})
+
+    with pytest.raises(ValueError):
+        queue.submit_many(tasks)
+    assert queue.stats()['queued'] == 0
+    assert queue.store.get('a')['status'] == 'uploaded'
+
+    tasks[1]['priority'] = None
+    queue.submit_many(tasks)
+    assert [queue.store.get(job_id)['status'] for job_id in 'ab'] == ['queued', 'queued']
+    assert drain(queue) == ['a', 'b']
+
+def test_full_queue_raises(make_queue, clock):
+    queue = make_queue(max_queue_size=2)
+    submit(queue, 'a')
+    submit(queue, 'b')
+    with pytest.raises(QueueFullError):
+        submit(queue, 'c')
+    with pytest.raises(QueueFullError):
+        queue.submit_many([{'job_id': 'd', 'kind': 'dicom', 'file_path': 'd', 'output_dir': 'd'}])
+
+def test_submit_without_workers_raises():
+    queue = JobQueue(MemoryJobStore())
+    with pytest.raises(WorkersUnavailableError):
+        queue.submit('a', 'dicom', 'a.dcm', 'out')
+
+def test_triage_is_queued_only_behind_a_backlog(make_queue, clock):
+    queue = make_queue(triage_size=320, triage_min_queue=2)
+    submit(queue, 'r1')
+    submit(queue, 'r2')
+    submit(queue, 'r3')
+    submit(queue, 's1', 'stat')
+
+    # Only r3 arrived behind two pending jobs; stat jobs are never triaged
+    assert queue.stats()['triage']['pending'] == 1
+    # The triage pass runs at stat level, ahead of every full job
+    assert drain(queue) == ['triage:r3', 's1', 'r1', 'r2', 'r3']
+
+def test_triage_promotes_a_likely_urgent_job(make_queue, clock):
+    queue = make_queue(triage_size=320, triage_min_queue=0)
+    for job_id in ('r1', 'r2', 'r3'):
+        submit(queue, job_id)
+        clock.now += 1
+
+    with queue._lock:
+        triage = [queue._pop() for _ in range(3)]
+    assert [task['kind'] for task in triage] == ['triage'] * 3
+    assert triage[0]['image_size'] == 320 and triage[0]['job_kind'] == 'dicom'
+
+    queue._apply_triage('r3', {'urgency': 'high'})
+    queue._apply_triage('r2', {'urgency': 'moderate'})
+    queue._apply_triage('r1', {'urgency': 'low'})
+
+    assert queue.store.get('r3')['priority'] == 'stat'
+    assert queue.store.get('r2')['priority'] == 'urgent'
+    assert queue.triage_counts == {'triaged': 3, 'promoted': 2, 'skipped': 0}
+    assert queue.queue_position('r3') == 1
+    assert drain(queue) == ['r3', 'r2', 'r1']
+
+def test_triage_never_demotes(make_queue, clock):
+    queue = make_queue(triage_size=320, triage_min_queue=0)
+    submit(queue, 'u1', 'urgent')
+    queue._apply_triage('u1', {'urgency': 'moderate'})
+    assert queue.triage_counts['promoted'] == 0
+    assert queue.store.get('u1').get('priority') is None
+
+def test_job_reached_before_its_triage_skips_it(make_queue, clock):
+    # Without aging differences the queue is FIFO, so a job precedes its own triage pass
+    queue = make_queue(triage_size=320, triage_min_queue=0, aging={'urgent': 0.0, 'routine': 0.0})
+    submit(queue, 'r1')
+    submit(queue, 'r2')
+
+    assert drain(queue) == ['r1', 'r2']
+    assert queue.triage_counts['skipped'] == 2
+    assert queue.stats()['triage']['pending'] == 0
+
+def test_time_to_result_by_priority_and_urgency(make_queue, clock):
+    queue = make_queue()
+    submit(queue, 'a', 'urgent')
+    task = queue._tasks['a']
+    clock.now += 30
+
+    queue.observe_result(task, {'detections': [{'urgency': 'low'}, {'urgency': 'moderate'}]})
+    latency = queue.latency_stats()['time_to_result_seconds']
+    assert latency['by_priority']['urgent']['count'] == 1
+    assert latency['by_urgency']['moderate']['count'] == 1
+
+    queue.observe_result(task, {'detections': []})
+    assert queue.time_to_result_by_urgency['none'].snapshot()['count'] == 1
+
+def test_subscribers_get_stage_events_and_late_replay(make_queue):
+    queue = make_queue()
+    received = []
+    stage = {'type': 'stage', 'job_id': 'a', 'phase': 'start', 'stage': 'decode'}
+    queue._publish('a', stage)
+
+    assert queue.subscribe('a', received.append) == [stage]
+    queue._publish('a', {'type': 'completed', 'job_id': 'a'})
+    assert received == [{'type': 'completed', 'job_id': 'a'}]
+
+    queue.unsubscribe('a', received.append)
+    queue._publish('a', {'type': 'stage', 'job_id': 'a'})
+    assert len(received) == 1
@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.api.job_store import JobStore, MemoryJobStore, SQLiteJobStore, create_job_store
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path) -> JobStore:
+    return create_job_store(request.param, str(tmp_path / 'jobs.db'))
+
+def make_job(job_id: str, minutes_ago: float = 0, **fields):
+    job = {
+        'job_id': job_id,
+        'filename': f"{job_id}.dcm",
+        'kind': 'dicom',
+        'status': 'queued',
+        'created_at': (datetime.now() - timedelta(minutes=minutes_ago)).isoformat()
+    }
+    job.update(fields)
+    return job
+
+def test_create_get_update_delete(store):
+    store.create(make_job('a'))
+    store.update('a', status='completed', result={'detections': [{'urgency': 'high'}]}, priority='stat')
+
+    job = store.get('a')
+    assert job['status'] == 'completed'
+    assert job['priority'] == 'stat'
+    assert job['result'] == {'detections': [{'urgency': 'high'}]}
+
+    store.delete('a')
+    assert store.get('a') is None
+
+def test_list_filters_pages_and_omits_results(store):
+    store.create_many([make_job(f"j{i}", minutes_ago=10 - i, status='completed' if i % 2 else 'queued',
+                                result={'i': i}) for i in range(6)])
+
+    total, page = store.list(limit=2, offset=1)
+    assert total == 6
+    assert [job['job_id'] for job in page] == ['j4', 'j3']
+    assert all('result' not in job for job in page)
+
+    total, page = store.list(status='completed')
+    assert total == 3
+    assert [job['job_id'] for job in page] == ['j5', 'j3', 'j1']
+
+def test_batches_and_bulk_updates(store):
+    store.create_many([make_job(job_id, minutes_ago=minutes, batch_id='b1', result={'x': 1})
+                       for job_id, minutes in (('late', 1), ('early', 2))])
+    store.create(make_job('other', batch_id='b2'))
+    store.update_many(['late', 'early'], status='processing')
+
+    jobs = store.list_batch('b1')
+    assert [job['job_id'] for job in jobs] == ['early', 'late']
+    assert {job['status'] for job in jobs} == {'processing'}
+    assert 'result' not in jobs[0]
+    assert store.list_batch('b1', include_results=True)[0]['result'] == {'x': 1}
+
+def test_queue_position_counts_older_queued_jobs(store):
+    store.create_many([make_job('a', 3), make_job('b', 2, status='processing'), make_job('c', 1)])
+    assert store.queue_position('a') == 1
+    assert store.queue_position('c') == 2
+    assert store.queue_position('b') is None
+    assert store.queue_position('missing') is None
+
+def test_only_finished_jobs_expire(store):
+    old = (datetime.now() - timedelta(hours=5)).isoformat()
+    store.create_many([
+        make_job('done-old', 600, status='completed', completed_at=old),
+        make_job('failed-old', 600, status='failed'),
+        # Created long ago but finished recently
+        make_job('done-recent', 600, status='completed', completed_at=datetime.now().isoformat()),
+        make_job('queued-old', 600, status='queued'),
+        make_job('processing-old', 600, status='processing')
+    ])
+
+    expired = store.evict_expired(3600)
+
+    assert sorted(job['job_id'] for job in expired) == ['done-old', 'failed-old']
+    assert store.get('done-old') is None
+    for job_id in ('done-recent', 'queued-old', 'processing-old'):
+        assert store.get(job_id) is not None
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    SQLiteJobStore(path).create(make_job('a'))
+    assert SQLiteJobStore(path).get('a')['filename'] == 'a.dcm'
+
+def test_sqlite_rejects_unknown_fields(tmp_path):
+    store = SQLiteJobStore(str(tmp_path / 'jobs.db'))
+    store.create(make_job('a'))
+    with pytest.raises(ValueError):
+        store.update('a', colour='blue')
+
+def test_incomplete_backend_fails_at_construction():
+    class PartialStore(JobStore):
+        def create(self, job):
+            pass
+
+    with pytest.raises(TypeError):
+        PartialStore()
+    assert isinstance(MemoryJobStore(), JobStore)
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        create_job_store('redis')
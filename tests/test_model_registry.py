@@ -0,0 +1,85 @@
+import json
+import os
+
+import pytest
+
+from src.detection.model_registry import ModelRegistry
+from src.detection.simple_detector import SimpleDetector
+from tests.conftest import FakeDetector
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    registry = ModelRegistry(default_weights='default.pt', models_dir=str(tmp_path / 'models'),
+                             warmup=False, check_interval=0.0)
+    registry.loaded = []
+
+    def load(weights):
+        registry.loaded.append(weights)
+        return FakeDetector(model_version=SimpleDetector.describe_weights(weights))
+    monkeypatch.setattr(registry, 'load', load)
+    return registry
+
+def weights_file(tmp_path, name: str, content: bytes = b'weights') -> str:
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+def test_detector_is_loaded_once(registry):
+    assert registry.get() is registry.get()
+    assert registry.loaded == ['default.pt']
+
+def test_activation_swaps_and_evicts(registry, tmp_path):
+    old = registry.get()
+    new_weights = weights_file(tmp_path, 'new.pt')
+    registry.activate(new_weights)
+
+    with open(registry.active_model_file) as f:
+        assert json.load(f)['weights'] == new_weights
+    detector = registry.get()
+    assert detector is not old
+    assert detector.model_version.startswith('new.pt:')
+    assert list(registry._detectors) == [new_weights]
+
+    # Back to the default, which need not exist locally
+    registry.activate('default.pt')
+    registry.get()
+    assert registry.loaded == ['default.pt', new_weights, 'default.pt']
+
+def test_other_workers_follow_the_active_model_file(registry, tmp_path):
+    other = ModelRegistry(default_weights='default.pt', models_dir=registry.models_dir, check_interval=0.0)
+    new_weights = weights_file(tmp_path, 'new.pt')
+    registry.get()
+    other.activate(new_weights)
+    assert registry.active_weights() == new_weights
+    assert registry.get().model_version.startswith('new.pt:')
+
+def test_missing_weights_are_rejected(registry, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        registry.activate(str(tmp_path / 'missing.pt'))
+    assert not os.path.exists(registry.active_model_file)
+    assert registry.active_weights() == 'default.pt'
+
+def test_weights_replaced_in_place_are_reloaded(registry, tmp_path):
+    path = weights_file(tmp_path, 'model.pt', b'v1')
+    registry.activate(path)
+    first = registry.get()
+    weights_file(tmp_path, 'model.pt', b'version two')
+
+    assert registry.get() is not first
+    assert registry.loaded == [path, path]
+
+def test_explicit_weights_do_not_evict_the_active_model(registry, tmp_path):
+    active = registry.get()
+    registry.get(weights_file(tmp_path, 'other.pt'))
+    assert registry.get() is active
+    registry.evict(keep='default.pt')
+    assert list(registry._detectors) == ['default.pt']
+
+def test_describe_weights(tmp_path):
+    path = weights_file(tmp_path, 'w.pt', b'12345')
+    name, size, mtime = SimpleDetector.describe_weights(path).split(':')
+    assert (name, size) == ('w.pt', '5')
+    assert int(mtime) == int(os.path.getmtime(path))
+    # Names ultralytics resolves itself are used as given
+    missing = str(tmp_path / 'yolov8n.pt')
+    assert SimpleDetector.describe_weights(missing) == missing
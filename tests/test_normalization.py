@@ -0,0 +1,101 @@
+import numpy as np
+import pydicom
+import pytest
+
+from benchmarks import bench_normalize
+from src.dicom.dicom_handler import DICOMHandler
+
+WINDOWS = [None, (2048.0, 4096.0, 'LINEAR'), (1500.0, 800.0, 'LINEAR'),
+           (1500.0, 800.0, 'LINEAR_EXACT'), (1500.0, 800.0, 'SIGMOID')]
+
+@pytest.fixture
+def handler():
+    return DICOMHandler()
+
+def reference(image: np.ndarray, slope: float, intercept: float, window, invert: bool) -> np.ndarray:
+    """Straight float64 transcription of PS3.3 C.11.2.1.2 (and the min/max stretch)"""
+    values = image.astype(np.float64) * slope + intercept
+    if window is None:
+        values = (values - values.min()) / (values.max() - values.min()) * 255.0
+    else:
+        center, width, function = window
+        if function == 'SIGMOID':
+            values = 255.0 / (1.0 + np.exp(-4.0 * (values - center) / width))
+        elif function == 'LINEAR_EXACT':
+            values = ((values - center) / width + 0.5) * 255.0
+        else:
+            values = ((values - (center - 0.5)) / (width - 1.0) + 0.5) * 255.0
+    out = np.clip(values, 0, 255).astype(np.uint8)
+    return 255 - out if invert else out
+
+def max_diff(a: np.ndarray, b: np.ndarray) -> int:
+    return int(np.abs(a.astype(np.int16) - b.astype(np.int16)).max())
+
+@pytest.mark.parametrize('window', WINDOWS)
+@pytest.mark.parametrize('invert', [False, True])
+def test_lut_matches_float_path(handler, window, invert):
+    rng = np.random.default_rng(1)
+    image = rng.integers(0, 4096, size=(96, 80), dtype=np.uint16)
+
+    lut = handler.normalize_image(image, window=window, invert=invert)
+    # int32 frames skip the lookup table and take the float32 path
+    float_path = handler.normalize_image(image.astype(np.int32), window=window, invert=invert)
+
+    assert lut.dtype == np.uint8 and lut.shape == image.shape
+    assert max_diff(lut, float_path) <= 1
+    assert max_diff(lut, reference(image, 1.0, 0.0, window, invert)) <= 1
+
+@pytest.mark.parametrize('window', [None, (40.0, 400.0, 'LINEAR')])
+def test_signed_frames_with_rescale(handler, window):
+    rng = np.random.default_rng(2)
+    image = rng.integers(-1024, 3000, size=(64, 64), dtype=np.int16)
+
+    lut = handler.normalize_image(image, slope=1.0, intercept=-1024.0, window=window)
+    expected = reference(image, 1.0, -1024.0, window, False)
+    assert max_diff(lut, expected) <= 1
+
+    scaled = handler.normalize_image(image, slope=0.5, intercept=10.0, window=window)
+    assert max_diff(scaled, reference(image, 0.5, 10.0, window, False)) <= 1
+
+def test_eight_bit_and_float_frames(handler):
+    rng = np.random.default_rng(3)
+    image = rng.integers(0, 256, size=(32, 32), dtype=np.uint8)
+    assert max_diff(handler.normalize_image(image), reference(image, 1.0, 0.0, None, False)) <= 1
+
+    floats = rng.normal(size=(32, 32)).astype(np.float32)
+    assert max_diff(handler.normalize_image(floats), reference(floats, 1.0, 0.0, None, False)) <= 1
+
+def test_constant_frame_is_black(handler):
+    image = np.full((8, 8), 700, dtype=np.uint16)
+    assert not handler.normalize_image(image).any()
+    assert (handler.normalize_image(image, invert=True) == 255).all()
+
+def test_matches_the_pre_lut_extraction(handler):
+    rng = np.random.default_rng(4)
+    image = rng.integers(0, 4096, size=(128, 128), dtype=np.uint16)
+    for invert in (False, True):
+        legacy = bench_normalize.legacy_extract(image, invert)
+        assert max_diff(legacy, handler.normalize_image(image, invert=invert)) <= 1
+
+def test_voi_window_from_header(handler, dicom_file):
+    dataset = pydicom.dcmread(dicom_file(WindowCenter=[40, 300], WindowWidth=[400, 1500],
+                                         VOILUTFunction='SIGMOID'))
+    assert handler.get_voi_window(dataset) == (40.0, 400.0, 'SIGMOID')
+
+    dataset.WindowWidth = 0
+    assert handler.get_voi_window(dataset) is None
+    del dataset.WindowCenter
+    assert handler.get_voi_window(dataset) is None
+
+def test_monochrome1_is_inverted(handler, dicom_file):
+    mono2 = pydicom.dcmread(dicom_file(seed=5))
+    mono1 = pydicom.dcmread(dicom_file(seed=5, photometric='MONOCHROME1'))
+    # make_dicom stores 4095 - value for MONOCHROME1, so both display alike
+    assert max_diff(handler.extract_image(mono2), handler.extract_image(mono1)) <= 1
+
+def test_benchmark_reports_savings():
+    for invert in (False, True):
+        result = bench_normalize.run(512, 512, repeats=1, invert=invert)
+        assert result['max_abs_pixel_difference'] <= 1
+        assert result['memory_saved_mb_per_megapixel'] > 0
+        assert result['fused_lut']['peak_mb_per_megapixel'] < result['legacy']['peak_mb_per_megapixel']
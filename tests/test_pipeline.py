@@ -0,0 +1,170 @@
+import json
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from tests.conftest import FakeDetector, FakeRegistry
+from src.detection.detections import Detections
+from src.detection.tiling import TileConfig
+from src.dicom.frame_store import FrameStore
+from src.pipeline.result_cache import ResultCache
+from src.pipeline.simple_pipeline import (
+    SimplePipeline, compact_report, format_report_text, render_visualization, rescale_detections
+)
+
+@pytest.fixture
+def make_pipeline(fake_detector):
+    def make(**kwargs):
+        return SimplePipeline(model_registry=FakeRegistry(kwargs.pop('detector', fake_detector)), **kwargs)
+    return make
+
+def files_in(directory):
+    return sorted(os.listdir(directory))
+
+@pytest.mark.parametrize('policy, written', [
+    ('full', ['complete_result.json', 'detections_visualized.png', 'report.txt']),
+    ('lazy', ['complete_result.json', 'frame.npy', 'report.txt']),
+    ('results', [])
+])
+def test_output_policies(make_pipeline, dicom_file, tmp_path, policy, written):
+    out = tmp_path / 'out'
+    result = make_pipeline().process_dicom(dicom_file(), str(out), output_policy=policy)
+
+    assert result['success']
+    assert result['output_policy'] == policy
+    assert files_in(out) == written
+    assert {name for name, path in result['output_files'].items() if path} == {
+        'full': {'detection_visualization', 'report_json', 'report_text'},
+        'lazy': {'frame', 'report_json', 'report_text'},
+        'results': set()
+    }[policy]
+    assert {'read', 'validate', 'decode', 'detect', 'report', 'total'} <= set(result['timings'])
+    assert len(result['detections']) == 1
+    assert 'full_text' not in result['report'] and 'detections_used' not in result['report']
+
+def test_saved_result_and_report_text(make_pipeline, dicom_file, tmp_path):
+    result = make_pipeline().process_dicom(dicom_file(PatientID='P42'), str(tmp_path), output_policy='lazy')
+    with open(tmp_path / 'complete_result.json') as f:
+        saved = json.load(f)
+    assert saved['detections'] == result['detections']
+    report_text = (tmp_path / 'report.txt').read_text()
+    assert report_text == format_report_text(saved)
+    assert 'Patient ID: P42' in report_text
+
+def test_invalid_and_unreadable_inputs(make_pipeline, dicom_file, tmp_path):
+    pipeline = make_pipeline()
+    junk = tmp_path / 'junk.dcm'
+    junk.write_bytes(b'not dicom')
+    assert not pipeline.process_dicom(str(junk), str(tmp_path / 'a'))['success']
+    with pytest.raises(ValueError, match='Unknown output policy'):
+        pipeline.process_dicom(dicom_file(), str(tmp_path / 'b'), output_policy='everything')
+    with pytest.raises(ValueError, match='Could not read image'):
+        pipeline.process_image(str(junk), str(tmp_path / 'c'))
+
+def test_result_cache_skips_detection(make_pipeline, fake_detector, dicom_file, tmp_path):
+    pipeline = make_pipeline(result_cache=ResultCache(cache_dir=str(tmp_path / 'cache')))
+    path = dicom_file()
+    first = pipeline.process_dicom(path, str(tmp_path / 'first'), output_policy='full')
+    second = pipeline.process_dicom(path, str(tmp_path / 'second'), output_policy='full')
+
+    assert first['cache']['hit'] is False and second['cache']['hit'] is True
+    assert len(fake_detector.calls) == 1
+    assert second['detections'] == first['detections']
+    assert 'detect' not in second['timings']
+    assert os.path.exists(tmp_path / 'second' / 'detections_visualized.png')
+
+    # A different threshold is a different cache entry
+    pipeline.process_dicom(path, str(tmp_path / 'third'), conf_threshold=0.5, output_policy='results')
+    assert len(fake_detector.calls) == 2
+
+def test_process_image(make_pipeline, fake_detector, tmp_path):
+    image_path = str(tmp_path / 'chest.png')
+    cv2.imwrite(image_path, np.full((40, 50, 3), 128, dtype=np.uint8))
+
+    result = make_pipeline().process_image(image_path, str(tmp_path / 'out'), conf_threshold=0.5)
+    assert fake_detector.calls[0][2] == 0.5
+    assert result['detections'][0]['bbox'] == {'x1': 5.0, 'y1': 8.0, 'x2': 15.0, 'y2': 20.0}
+    assert os.path.exists(result['output_files']['visualization'])
+    assert os.path.exists(result['output_files']['report'])
+
+    lazy = make_pipeline().process_image(image_path, str(tmp_path / 'lazy'), output_policy='results')
+    assert lazy['output_files'] == {'visualization': None, 'report': None}
+
+def test_multi_frame_file_runs_as_series_with_threshold(make_pipeline, fake_detector, dicom_file, tmp_path):
+    result = make_pipeline().process_dicom(dicom_file(frames=3), str(tmp_path), conf_threshold=0.6,
+                                           output_policy='lazy')
+    assert result['success']
+    assert [call[2] for call in fake_detector.calls] == [0.6]
+    assert [(det['slice_index'], det['frame_index']) for det in result['detections']] == [(0, 0), (0, 1), (0, 2)]
+    assert result['series'][0]['num_frames'] == 3
+    assert len(result['output_files']['key_images']) == 3
+
+def test_series_key_images_follow_policy(make_pipeline, dicom_file, tmp_path):
+    study = tmp_path / 'study'
+    study.mkdir()
+    for number in (2, 1):
+        dicom_file(f"study/{number}.dcm", StudyInstanceUID='1.2', SeriesInstanceUID='1.2.1', InstanceNumber=number)
+
+    result = make_pipeline().process_series(str(study), str(tmp_path / 'out'), output_policy='results')
+    assert result['success'] and result['study_instance_uid'] == '1.2'
+    assert result['output_files']['key_images'] == []
+    assert [det['instance_number'] for det in result['detections']] == [1, 2]
+    assert not os.path.exists(tmp_path / 'out' / 'complete_result.json')
+
+def test_series_rejects_mixed_studies(make_pipeline, dicom_file, tmp_path):
+    paths = [dicom_file(StudyInstanceUID='1.1'), dicom_file(StudyInstanceUID='1.2')]
+    result = make_pipeline().process_series(paths, str(tmp_path / 'out'))
+    assert not result['success']
+    assert '2 different studies' in result['error']
+
+def test_frame_store_reuse(make_pipeline, dicom_file, tmp_path):
+    store = FrameStore(str(tmp_path / 'frames'))
+    pipeline = make_pipeline(frame_store=store)
+    single, multi = dicom_file(), dicom_file(frames=2)
+
+    first = [pipeline.process_dicom(path, str(tmp_path / 'a'), output_policy='results') for path in (single, multi)]
+    assert store.summary()['entries'] == 2
+    second = [pipeline.process_dicom(path, str(tmp_path / 'b'), output_policy='results') for path in (single, multi)]
+    assert store.stats()['hits'] == 2
+    assert [r['detections'] for r in second] == [r['detections'] for r in first]
+
+def test_tiled_series_frames(dicom_file, tmp_path):
+    detector = FakeDetector()
+    pipeline = SimplePipeline(model_registry=FakeRegistry(detector), tile_config=TileConfig(32, 0.25))
+    result = pipeline.process_dicom(dicom_file(frames=2), str(tmp_path), output_policy='results')
+    assert result['success']
+    # Frames larger than a tile go one at a time through detect_tiled: its tiles plus the whole frame
+    assert [call[0] for call in detector.calls] == ['detect_batch', 'detect_batch']
+    for call in detector.calls:
+        assert [shape[:2] for shape in call[1]] == [(32, 32)] * 9 + [(64, 64)]
+
+def test_triage(make_pipeline, fake_detector, dicom_file, tmp_path):
+    result = make_pipeline().triage(dicom_file(frames=3), image_size=256)
+    assert result['urgency'] == 'high'
+    assert result['findings'] == 1 and result['image_size'] == 256
+    assert fake_detector.calls[0][3] == 256
+
+    with pytest.raises(ValueError):
+        make_pipeline().triage(str(tmp_path / 'missing.png'), kind='image')
+
+def test_rescale_and_lazy_render(dicom_file, tmp_path):
+    detections = Detections([[10, 20, 30, 40]], [0.9])
+    scaled = rescale_detections(detections, (50, 100), (100, 200))
+    assert scaled.to_dicts()[0]['bbox'] == {'x1': 20.0, 'y1': 40.0, 'x2': 60.0, 'y2': 80.0}
+    assert rescale_detections(detections, (50, 100), (0, 0)) is detections
+
+    frame_path = str(tmp_path / 'frame.npy')
+    np.save(frame_path, np.zeros((50, 100), dtype=np.uint8))
+    output = render_visualization('unused.dcm', scaled.to_dicts(), str(tmp_path / 'viz.png'),
+                                  frame_path=frame_path, native_shape=(100, 200))
+    rendered = cv2.imread(output)
+    assert rendered.shape[:2] == (50, 100)
+    # The box is drawn back at its decoded-frame position
+    assert rendered[20:41, 10].any() and not rendered[45:, 60:].any()
+    assert files_in(tmp_path) == ['frame.npy', 'viz.png']
+
+def test_compact_report():
+    report = {'findings': 'f', 'impression': 'i', 'full_text': 'f i', 'detections_used': [1]}
+    assert compact_report(report) == {'findings': 'f', 'impression': 'i'}
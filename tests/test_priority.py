@@ -0,0 +1,91 @@
+import os
+
+import pydicom
+from pydicom.dataset import Dataset
+from pydicom.sequence import Sequence
+
+from src.api.priority import dicom_priority, normalize_priority, read_priority, resolve_priority
+from src.api.uploads import group_studies
+
+def sequence_item(**attributes) -> Sequence:
+    item = Dataset()
+    for keyword, value in attributes.items():
+        setattr(item, keyword, value)
+    return Sequence([item])
+
+def test_normalize_priority_aliases():
+    assert normalize_priority(' STAT ') == 'stat'
+    assert normalize_priority('HIGH') == 'urgent'
+    assert normalize_priority('Medium') == 'routine'
+    assert normalize_priority('whenever') is None
+    assert normalize_priority(None) is None
+
+def test_priority_from_nested_request_attributes(dicom_file):
+    path = dicom_file(RequestAttributesSequence=sequence_item(RequestedProcedurePriority='STAT'))
+    assert dicom_priority(pydicom.dcmread(path)) == 'stat'
+    assert read_priority([path]) == 'stat'
+
+def test_priority_from_scheduled_procedure_step(dicom_file):
+    path = dicom_file(ScheduledProcedureStepSequence=sequence_item(ScheduledProcedureStepPriority='HIGH'))
+    assert read_priority([path]) == 'urgent'
+
+def test_top_level_priority_wins_over_sequences(dicom_file):
+    path = dicom_file(
+        ReportingPriority='ROUTINE',
+        RequestAttributesSequence=sequence_item(RequestedProcedurePriority='STAT')
+    )
+    assert read_priority([path]) == 'routine'
+
+def test_first_sequence_item_is_used():
+    dataset = Dataset()
+    first, second = Dataset(), Dataset()
+    first.RequestedProcedurePriority = 'LOW'
+    second.RequestedProcedurePriority = 'STAT'
+    dataset.RequestAttributesSequence = Sequence([first, second])
+    assert dicom_priority(dataset) == 'routine'
+
+def test_read_priority_skips_unreadable_and_unprioritised_files(dicom_file, tmp_path):
+    broken = tmp_path / 'broken.dcm'
+    broken.write_bytes(b'not dicom')
+    plain = dicom_file()
+    urgent = dicom_file(ReportingPriority='HIGH')
+    assert read_priority([str(broken), plain, urgent]) == 'urgent'
+    assert read_priority([plain]) is None
+
+def test_header_wins_then_dicom_then_routine(dicom_file):
+    path = dicom_file(RequestAttributesSequence=sequence_item(RequestedProcedurePriority='STAT'))
+    assert resolve_priority('low', 'dicom', path) == 'routine'
+    assert resolve_priority(None, 'dicom', path) == 'stat'
+    assert resolve_priority('nonsense', 'dicom', path) == 'stat'
+    assert resolve_priority(None, 'dicom', dicom_file()) == 'routine'
+    assert resolve_priority(None, 'image', 'chest.png') == 'routine'
+
+def test_series_reads_only_its_first_file(dicom_file, tmp_path):
+    series = tmp_path / 'series'
+    series.mkdir()
+    dicom_file('series/001.dcm')
+    dicom_file('series/002.dcm', ReportingPriority='STAT')
+    assert resolve_priority(None, 'series', str(series)) == 'routine'
+
+    os.rename(series / '002.dcm', series / '000.dcm')
+    assert resolve_priority(None, 'series', str(series)) == 'stat'
+
+def test_batch_studies_carry_the_dicom_priority(dicom_file, tmp_path):
+    study_uid = pydicom.uid.generate_uid()
+    a = dicom_file('a.dcm', StudyInstanceUID=study_uid)
+    b = dicom_file('b.dcm', StudyInstanceUID=study_uid,
+                   RequestAttributesSequence=sequence_item(RequestedProcedurePriority='STAT'))
+    single = dicom_file('c.dcm')
+    png = tmp_path / 'd.png'
+    png.write_bytes(b'')
+    junk = tmp_path / 'e.dcm'
+    junk.write_bytes(b'junk')
+
+    studies, skipped = group_studies([single, b, str(png), a, str(junk)])
+
+    assert [skip['filename'] for skip in skipped] == ['e.dcm']
+    by_name = {study['name']: study for study in studies}
+    assert by_name['a.dcm (+1 files)'] == {'kind': 'series', 'name': 'a.dcm (+1 files)',
+                                           'paths': [a, b], 'priority': 'stat'}
+    assert by_name['c.dcm']['kind'] == 'dicom' and by_name['c.dcm']['priority'] is None
+    assert by_name['d.png']['kind'] == 'image'
@@ -0,0 +1,72 @@
+import pytest
+
+from src.utils.metrics import Histogram, PrometheusText
+from src.utils.profiling import SlowRequestProfiler, StageTimer
+
+def test_stage_timer_accumulates_and_notifies():
+    events = []
+    timer = StageTimer(listener=lambda phase, stage, seconds: events.append((phase, stage, seconds)))
+    with timer.stage('decode'):
+        pass
+    with timer.stage('decode'):
+        pass
+    timer.add('detect', 0.25)
+
+    summary = timer.summary()
+    assert set(summary) == {'decode', 'detect', 'total'}
+    assert summary['detect'] == 0.25
+    assert summary['total'] >= summary['decode']
+    assert [(phase, stage) for phase, stage, _ in events] == [
+        ('start', 'decode'), ('end', 'decode'), ('start', 'decode'), ('end', 'decode')
+    ]
+    assert events[0][2] is None and events[1][2] >= 0
+
+def test_stage_timer_records_failed_stage():
+    timer = StageTimer()
+    with pytest.raises(RuntimeError):
+        with timer.stage('detect'):
+            raise RuntimeError('boom')
+    assert 'detect' in timer.timings
+
+def test_histogram_quantiles_and_snapshot():
+    histogram = Histogram(buckets=(1, 2, 4))
+    for value in (0.5, 1.5, 1.5, 3, 10):
+        histogram.observe(value)
+
+    assert histogram.quantile(0.5) == pytest.approx(1.75)
+    # The +Inf bucket reports the last finite bound
+    assert histogram.quantile(1.0) == 4
+
+    snapshot = histogram.snapshot()
+    assert snapshot['buckets'] == [[1, 1], [2, 3], [4, 4]]
+    assert snapshot['count'] == 5
+    assert snapshot['sum'] == pytest.approx(16.5)
+    assert snapshot['mean'] == pytest.approx(3.3)
+    assert Histogram().snapshot()['p99'] == 0.0
+
+def test_prometheus_text():
+    histogram = Histogram(buckets=(0.1, 1))
+    histogram.observe(0.05)
+    text = PrometheusText()
+    text.metric('jobs_total', 'counter', 'Jobs', [({'status': 'done'}, 3), ({'path': 'a"b\\c'}, 1)])
+    text.histogram('latency_seconds', 'Latency', [({'stage': 'detect'}, histogram.snapshot())])
+    lines = text.render().splitlines()
+
+    assert lines[:4] == [
+        '# HELP jobs_total Jobs', '# TYPE jobs_total counter',
+        'jobs_total{status="done"} 3', 'jobs_total{path="a\\"b\\\\c"} 1'
+    ]
+    assert 'latency_seconds_bucket{stage="detect",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{stage="detect",le="+Inf"} 1' in lines
+    assert 'latency_seconds_count{stage="detect"} 1' in lines
+
+def test_slow_request_profiler(tmp_path):
+    profiler = SlowRequestProfiler(threshold_seconds=0.0, interval_ms=1, output_dir=str(tmp_path))
+    with profiler.track('job'):
+        sum(i * i for i in range(200_000))
+    assert [path.suffix for path in tmp_path.iterdir()] == ['.folded']
+
+    fast = SlowRequestProfiler(threshold_seconds=60, output_dir=str(tmp_path / 'fast'))
+    with fast.track('job'):
+        pass
+    assert not (tmp_path / 'fast').exists()
@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.pipeline.result_cache import ResultCache
+
+def entry(n: int):
+    return {'detections': [{'confidence': n}], 'report': f"report {n}", 'validation': {'is_valid': True}}
+
+def test_key_depends_on_pixels_model_threshold_and_settings():
+    pixels = np.arange(16, dtype=np.uint16).reshape(4, 4)
+    key = ResultCache.make_key(pixels, 'yolo:1', 0.25)
+
+    assert key == ResultCache.make_key(pixels.copy(), 'yolo:1', 0.25)
+    assert key != ResultCache.make_key(pixels[::-1].copy(), 'yolo:1', 0.25)
+    assert key != ResultCache.make_key(pixels, 'yolo:2', 0.25)
+    assert key != ResultCache.make_key(pixels, 'yolo:1', 0.3)
+    assert key != ResultCache.make_key(pixels, 'yolo:1', 0.25, ['tiles:640'])
+    assert key == ResultCache.make_key(pixels.tobytes(), 'yolo:1', 0.25)
+
+def test_memory_tier_is_lru():
+    cache = ResultCache(max_entries=2, cache_dir=None)
+    cache.put('a', entry(1))
+    cache.put('b', entry(2))
+    assert cache.get('a')['report'] == 'report 1'
+    cache.put('c', entry(3))
+
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    stats = cache.stats()
+    assert (stats['memory_hits'], stats['misses'], stats['entries_in_memory']) == (3, 1, 2)
+    assert stats['hit_rate'] == 0.75
+
+def test_disk_tier_is_shared_between_instances(tmp_path):
+    viz = tmp_path / 'viz.png'
+    viz.write_bytes(b'png')
+    writer = ResultCache(cache_dir=str(tmp_path / 'cache'))
+    writer.put('ab12', entry(1), str(viz))
+
+    reader = ResultCache(max_entries=1, cache_dir=str(tmp_path / 'cache'))
+    cached = reader.get('ab12')
+    assert cached['report'] == 'report 1'
+    assert cached['visualization'] == f"{tmp_path}/cache/ab/ab12/visualization.png"
+    with open(cached['visualization'], 'rb') as f:
+        assert f.read() == b'png'
+    # Now in memory as well
+    reader.get('ab12')
+    assert (reader.stats()['disk_hits'], reader.stats()['memory_hits']) == (1, 1)
+
+    # No temporary files are left behind
+    assert sorted(os.listdir(tmp_path / 'cache' / 'ab' / 'ab12')) == ['result.json', 'visualization.png']
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache = ResultCache(cache_dir=str(tmp_path))
+    os.makedirs(tmp_path / 'cd' / 'cdef')
+    (tmp_path / 'cd' / 'cdef' / 'result.json').write_text('{not json')
+    assert cache.get('cdef') is None
+
+def test_failed_write_removes_its_temporary_file(tmp_path):
+    target = str(tmp_path / 'result.json')
+
+    def fail(tmp_path_name):
+        with open(tmp_path_name, 'w') as f:
+            f.write('partial')
+        raise OSError('disk full')
+
+    with pytest.raises(OSError):
+        ResultCache._write_atomic(target, fail)
+    assert os.listdir(tmp_path) == []
+
+def test_concurrent_writers_use_distinct_temporary_files(tmp_path):
+    seen = []
+    for _ in range(2):
+        ResultCache._write_atomic(str(tmp_path / 'x'), lambda name: (seen.append(name), open(name, 'w').close()))
+    assert seen[0] != seen[1]
+    assert os.listdir(tmp_path) == ['x']
@@ -0,0 +1,112 @@
+import json
+import os
+
+import pytest
+
+from src.rag.retrieval import HashingEmbedder, ReportIndex, load_corpus, parse_report_text
+from src.rag.simple_rag import SimpleRAG
+
+SEED_CORPUS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'corpus',
+                           'seed_reports.jsonl')
+
+@pytest.fixture
+def index(tmp_path):
+    index = ReportIndex(str(tmp_path / 'index'), HashingEmbedder(), store='numpy')
+    index.add_corpus(SEED_CORPUS)
+    return index
+
+def detection(confidence: float, urgency: str, location: str = 'right upper zone'):
+    return {'finding': 'abnormality', 'confidence': confidence, 'urgency': urgency, 'location': location,
+            'bbox': {'x1': 100, 'y1': 100, 'x2': 200, 'y2': 200}}
+
+def test_parse_report_text():
+    text = "FINDINGS:\nOpacity in the\nright upper zone.\n\nIMPRESSION:\nPneumonia.\nRECOMMENDATION: Follow up.\n"
+    assert parse_report_text(text) == {
+        'findings': 'Opacity in the right upper zone.',
+        'impression': 'Pneumonia.',
+        'recommendations': 'Follow up.'
+    }
+
+def test_load_corpus_labels_sections(tmp_path):
+    (tmp_path / 'reports.jsonl').write_text('\n'.join(json.dumps(record) for record in [
+        {'finding': 'nodule', 'urgency': 'low', 'findings': 'A nodule.', 'impression': 'Nodule.'},
+        {'section': 'impression', 'text': 'Several nodules.', 'multiple': True, 'report': 'r1'}
+    ]))
+    (tmp_path / 'nested').mkdir()
+    (tmp_path / 'nested' / 'old.txt').write_text("FINDINGS:\nClear.\nIMPRESSION:\nNormal.\n")
+
+    docs = load_corpus(str(tmp_path))
+
+    assert [(doc['text'], doc['section'], doc['multiple']) for doc in docs] == [
+        ('A nodule.', 'findings', 'false'), ('Nodule.', 'impression', 'false'),
+        ('Several nodules.', 'impression', 'true'),
+        ('Clear.', 'findings', 'false'), ('Normal.', 'impression', 'false')
+    ]
+    by_text = {doc['text']: doc for doc in docs}
+    assert by_text['A nodule.']['finding'] == 'nodule'
+    assert by_text['A nodule.']['report'] == by_text['Nodule.']['report']
+    assert by_text['Several nodules.']['report'] == 'r1'
+    assert by_text['Clear.']['source'].endswith('old.txt')
+
+def test_index_is_incremental_and_persistent(tmp_path):
+    directory = str(tmp_path / 'index')
+    index = ReportIndex(directory, HashingEmbedder(), store='numpy')
+    added = index.add_corpus(SEED_CORPUS)
+    assert added == len(index) > 0
+    version = index.version()
+
+    assert index.add_corpus(SEED_CORPUS) == 0
+    reopened = ReportIndex(directory, HashingEmbedder(), store='numpy')
+    assert len(reopened) == added
+    assert reopened.version() == version
+
+    reopened.add_documents([{'section': 'findings', 'text': 'A new prior report.', 'finding': 'nodule'}])
+    assert reopened.version() != version
+    assert index.add_corpus(str(tmp_path / 'missing')) == 0
+
+def test_search_respects_metadata_filters(index):
+    hits = index.search('pneumothorax upper zone high', k=3, where={'section': 'findings'})
+    assert hits and all(hit['metadata']['section'] == 'findings' for hit in hits)
+    assert hits[0]['metadata']['finding'] == 'pneumothorax'
+    assert [hit['score'] for hit in hits] == sorted((hit['score'] for hit in hits), reverse=True)
+    assert index.search('anything', where={'section': 'findings', 'finding': 'unicorn'}) == []
+
+def test_single_finding_never_uses_a_multiple_findings_report(index):
+    rag = SimpleRAG(index=index)
+    report = rag.generate_report([detection(0.9, 'high')], {})
+
+    assert report['sources']
+    documents = {doc['id']: doc for doc in index.store.documents}
+    assert all(documents[source]['metadata']['multiple'] == 'false' for source in report['sources'])
+    assert 'right upper zone' in report['findings']
+    assert '{location}' not in report['full_text']
+
+def test_multiple_findings_use_the_multiple_report(index):
+    rag = SimpleRAG(index=index)
+    report = rag.generate_report([detection(0.9, 'high'), detection(0.8, 'high', 'left lower zone')], {})
+    documents = {doc['id']: doc for doc in index.store.documents}
+    assert documents[report['sources'][0]]['metadata']['multiple'] == 'true'
+
+def test_templates_without_an_index():
+    rag = SimpleRAG(index=None)
+    rag.index = None
+    assert rag.version() == 'rag:templates'
+    normal = rag.generate_report([], {})
+    assert normal['impression'] == 'No acute cardiopulmonary abnormality.'
+
+    dets = [dict(detection(0.9, 'high'), bbox={'x1': 150, 'y1': 100, 'x2': 300, 'y2': 250})]
+    report = rag.generate_report(dets, {}, (1000, 1000))
+    assert 'right upper zone' in report['findings']
+    assert report['locations']['laterality'] == 'right'
+
+def test_detection_signature():
+    signature = SimpleRAG.detection_signature([
+        detection(0.5, 'moderate'), detection(0.9, 'high'), detection(0.6, 'moderate'), detection(0.3, 'low', 'x'),
+        detection(0.2, 'low', 'y')
+    ])
+    assert signature == (
+        ('abnormality', 'right upper zone', 'high'),
+        ('abnormality', 'right upper zone', 'moderate'),
+        ('abnormality', 'x', 'low')
+    )
+    assert SimpleRAG.detection_signature([]) == (('none', 'none', 'none'),)
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from src.detection.detections import Detections
+from src.detection.tiling import TileConfig, detect_tiled, foreground_fractions, nms, tile_grid
+
+def test_tile_grid_covers_the_image_with_overlap():
+    tiles = tile_grid(1000, 1500, 640, 0.2)
+    assert (tiles[:, 2] - tiles[:, 0] == 640).all()
+    assert (tiles[:, 3] - tiles[:, 1] == 640).all()
+    # Edge tiles are moved inwards rather than running past the image
+    assert tiles[:, 2].max() == 1500 and tiles[:, 3].max() == 1000
+    assert sorted(set(tiles[:, 0].tolist())) == [0, 512, 860]
+    assert sorted(set(tiles[:, 1].tolist())) == [0, 360]
+
+    covered = np.zeros((1000, 1500), dtype=bool)
+    for x0, y0, x1, y1 in tiles:
+        covered[y0:y1, x0:x1] = True
+    assert covered.all()
+
+def test_small_image_is_one_tile():
+    assert tile_grid(300, 200, 640, 0.2).tolist() == [[0, 0, 200, 300]]
+
+def test_foreground_fractions():
+    image = np.zeros((256, 256), dtype=np.uint8)
+    image[:, 128:] = 128
+    image[:64, 128:] = 255
+    tiles = np.array([[0, 0, 128, 256], [128, 0, 256, 256], [128, 128, 256, 256]])
+    assert foreground_fractions(image, tiles, 10, 245).tolist() == pytest.approx([0.0, 0.75, 1.0])
+
+def test_nms_keeps_best_of_overlapping_boxes():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 11, 11], [50, 50, 60, 60], [0, 0, 10, 9]], dtype=np.float32)
+    scores = np.array([0.5, 0.9, 0.3, 0.6], dtype=np.float32)
+    assert nms(boxes, scores, 0.5).tolist() == [1, 2]
+    assert nms(boxes, scores, 0.95).tolist() == [1, 3, 0, 2]
+    assert nms(np.empty((0, 4)), np.empty(0), 0.5).tolist() == []
+
+class TileDetector:
+    """Finds one fixed image-space box in whichever inputs contain it"""
+
+    def __init__(self, box):
+        self.box = np.array(box, dtype=np.float32)
+        self.batches = []
+
+    def detect_batch(self, images, conf_threshold):
+        self.batches.append(len(images))
+        results = []
+        for image in images:
+            # Tiles are views into the full image, so their offset is recoverable
+            base = image.__array_interface__['data'][0] - self.full.__array_interface__['data'][0]
+            dy, dx = divmod(base // self.full.itemsize, self.full.shape[1])
+            x1, y1, x2, y2 = self.box - [dx, dy, dx, dy]
+            if x1 >= 0 and y1 >= 0 and x2 <= image.shape[1] and y2 <= image.shape[0]:
+                results.append(Detections([[x1, y1, x2, y2]], [0.8 if image is self.full else 0.9]))
+            else:
+                results.append(Detections())
+        return results
+
+def test_detect_tiled_maps_tiles_back_and_merges_duplicates():
+    image = np.full((1000, 1500), 128, dtype=np.uint8)
+    image[:, :300] = 0
+    detector = TileDetector([900, 400, 960, 460])
+    detector.full = image
+    config = TileConfig(tile_size=640, overlap=0.2, max_tiles_per_batch=2)
+
+    detections = detect_tiled(detector, image, 0.25, config)
+
+    # Every tile holding the box and the whole-image pass agree after NMS
+    assert len(detections) == 1
+    assert detections.boxes[0].tolist() == [900, 400, 960, 460]
+    assert detections.confidences[0] == pytest.approx(0.9)
+    # Six tiles, all with foreground, plus the whole image, in batches of two
+    assert detector.batches == [2, 2, 2, 1]
+
+def test_background_tiles_are_skipped():
+    image = np.zeros((1000, 1500), dtype=np.uint8)
+    image[:500, :500] = 128
+    detector = TileDetector([10, 10, 20, 20])
+    detector.full = image
+    config = TileConfig(tile_size=640, min_foreground=0.1, include_full_image=False)
+
+    detections = detect_tiled(detector, image, 0.25, config)
+    # Only the two left-hand tiles reach into the exposed corner
+    assert detector.batches == [2]
+    assert detections.boxes.tolist() == [[10, 10, 20, 20]]
+
+def test_tile_config():
+    config = TileConfig(tile_size=640)
+    assert config.applies_to((1000, 600))
+    assert not config.applies_to((640, 480, 3))
+    assert config.signature() != TileConfig(tile_size=640, overlap=0.3).signature()
+    assert TileConfig(tile_size=8, overlap=2).tile_size == 32
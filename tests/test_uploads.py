@@ -0,0 +1,83 @@
+import asyncio
+import hashlib
+import struct
+
+import pytest
+
+from src.api.uploads import DicomPrefixChecker, UploadRejected, save_upload_stream
+
+def chunked(data: bytes, size: int, consumed: list = None):
+    async def chunks():
+        for start in range(0, len(data), size):
+            if consumed is not None:
+                consumed.append(start)
+            yield data[start:start + size]
+    return chunks()
+
+def save(data: bytes, path, max_bytes: int = 1 << 20, is_dicom: bool = True, size: int = 64, consumed=None):
+    return asyncio.run(save_upload_stream(chunked(data, size, consumed), str(path), max_bytes, is_dicom))
+
+@pytest.fixture
+def dicom_bytes(dicom_file):
+    with open(dicom_file(), 'rb') as f:
+        return f.read()
+
+def test_valid_dicom_is_written_and_hashed(dicom_bytes, tmp_path):
+    target = tmp_path / 'upload.dcm'
+    result = save(dicom_bytes, target, size=7)
+
+    assert result == {'path': str(target), 'size_bytes': len(dicom_bytes),
+                      'sha256': hashlib.sha256(dicom_bytes).hexdigest()}
+    assert target.read_bytes() == dicom_bytes
+
+def reason(data: bytes) -> str:
+    checker = DicomPrefixChecker()
+    with pytest.raises(UploadRejected) as error:
+        checker.feed(data)
+        checker.finish()
+    assert error.value.status_code == 400
+    return error.value.detail
+
+@pytest.mark.filterwarnings('ignore::UserWarning')
+def test_prefix_rejections(dicom_bytes):
+    assert 'too short' in reason(dicom_bytes[:100])
+    assert 'DICM' in reason(b'\0' * 128 + b'NOPE' + dicom_bytes[132:])
+    malformed = bytearray(dicom_bytes)
+    malformed[132:134] = struct.pack('<H', 0x0008)
+    assert 'Malformed' in reason(bytes(malformed))
+    assert 'Truncated' in reason(dicom_bytes[:160])
+
+    # A complete meta group of garbage fails to parse
+    meta_length = struct.unpack('<I', dicom_bytes[140:144])[0]
+    garbage = dicom_bytes[:144] + b'\xff' * (meta_length + 16)
+    assert 'Invalid' in reason(garbage)
+
+def test_missing_transfer_syntax(dicom_bytes):
+    import io
+    import pydicom
+
+    dataset = pydicom.dcmread(io.BytesIO(dicom_bytes))
+    del dataset.file_meta.TransferSyntaxUID
+    buffer = io.BytesIO()
+    dataset.save_as(buffer, implicit_vr=False, little_endian=True)
+    assert 'TransferSyntaxUID' in reason(buffer.getvalue())
+
+def test_rejection_stops_reading_and_removes_the_file(dicom_bytes, tmp_path):
+    target = tmp_path / 'bad.dcm'
+    consumed = []
+    bad = b'\0' * 128 + b'NOPE' + dicom_bytes[132:]
+
+    with pytest.raises(UploadRejected):
+        save(bad, target, size=256, consumed=consumed)
+    assert consumed == [0]
+    assert not target.exists()
+
+def test_size_limit(tmp_path):
+    target = tmp_path / 'big.png'
+    with pytest.raises(UploadRejected) as error:
+        save(b'x' * 1000, target, max_bytes=500, is_dicom=False, size=100)
+    assert error.value.status_code == 413
+    assert not target.exists()
+
+def test_images_are_not_prefix_checked(tmp_path):
+    assert save(b'not a dicom', tmp_path / 'image.png', is_dicom=False)['size_bytes'] == 11